@@ -0,0 +1,176 @@
+"""
+Module de contrôle d'admission autour du modèle
+File d'attente FIFO bornée et limite de concurrence partagées par toutes les
+sessions : au-delà de la capacité, les demandes sont refusées immédiatement
+plutôt que d'allonger la latence de tout le monde
+"""
+
+import time
+import logging
+import threading
+import statistics
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+class AdmissionRejected(Exception):
+    """Demande refusée car la file d'attente est pleine"""
+    pass
+
+class Ticket:
+    """Place d'une demande dans la file d'attente"""
+
+    __slots__ = ('enqueued_at', 'admitted_at', 'abandoned')
+
+    def __init__(self):
+        self.enqueued_at = time.monotonic()
+        self.admitted_at: Optional[float] = None
+        self.abandoned = False
+
+class AdmissionController:
+    """Limite le nombre d'inférences simultanées et la longueur de la file
+
+    Les demandes sont servies dans l'ordre d'arrivée. La durée moyenne des
+    dernières inférences sert à estimer le temps d'attente restant.
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 32,
+                 default_service_seconds: float = 2.0, window: int = 500):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.default_service_seconds = default_service_seconds
+        self._cond = threading.Condition()
+        self._waiting: "deque[Ticket]" = deque()
+        self._active = 0
+        self._wait_times: "deque[float]" = deque(maxlen=window)
+        self._service_times: "deque[float]" = deque(maxlen=window)
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.peak_queue_depth = 0
+
+    def enter(self, block: bool = False, max_depth: int = None) -> Ticket:
+        """Réserve une place dans la file
+
+        Sans blocage, une file pleine lève AdmissionRejected ; avec blocage
+        (traitements par lot), l'appelant attend qu'une place se libère.
+        `max_depth` permet de réserver la fin de la file aux demandes
+        prioritaires.
+        """
+        limit = self.max_queue if max_depth is None else min(max_depth, self.max_queue)
+        with self._cond:
+            if len(self._waiting) >= limit:
+                if not block:
+                    self.rejected += 1
+                    logger.warning(f"Inference request rejected (queue depth {len(self._waiting)})")
+                    raise AdmissionRejected(
+                        "Le service d'analyse est très sollicité, veuillez réessayer "
+                        "dans quelques instants"
+                    )
+                self._cond.wait_for(lambda: len(self._waiting) < limit)
+            ticket = Ticket()
+            self._waiting.append(ticket)
+            self.peak_queue_depth = max(self.peak_queue_depth, len(self._waiting))
+            return ticket
+
+    def wait(self, ticket: Ticket) -> bool:
+        """Attend le tour du ticket puis occupe un emplacement d'exécution
+
+        Retourne False si le ticket a été abandonné entre-temps.
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: ticket.abandoned or (
+                    self._waiting[0] is ticket and self._active < self.max_concurrency
+                )
+            )
+            if ticket.abandoned:
+                return False
+            self._waiting.popleft()
+            self._active += 1
+            self.admitted += 1
+            ticket.admitted_at = time.monotonic()
+            self._wait_times.append(ticket.admitted_at - ticket.enqueued_at)
+            self._cond.notify_all()
+            return True
+
+    def leave(self, ticket: Ticket):
+        """Libère l'emplacement d'exécution occupé par le ticket"""
+        with self._cond:
+            self._active -= 1
+            self.completed += 1
+            self._service_times.append(time.monotonic() - ticket.admitted_at)
+            self._cond.notify_all()
+
+    def abandon(self, ticket: Ticket) -> bool:
+        """Retire de la file un ticket qui n'a pas encore été admis"""
+        with self._cond:
+            if ticket.admitted_at is not None or ticket.abandoned:
+                return False
+            ticket.abandoned = True
+            self._waiting.remove(ticket)
+            self._cond.notify_all()
+            return True
+
+    @contextmanager
+    def slot(self, block: bool = False) -> Iterator[Ticket]:
+        """Entrée dans la file, attente du tour puis exécution"""
+        ticket = self.enter(block=block)
+        self.wait(ticket)
+        try:
+            yield ticket
+        finally:
+            self.leave(ticket)
+
+    def service_seconds(self) -> float:
+        """Durée moyenne des dernières inférences"""
+        with self._cond:
+            if not self._service_times:
+                return self.default_service_seconds
+            return statistics.fmean(self._service_times)
+
+    def position(self, ticket: Ticket) -> int:
+        """Nombre de demandes devant le ticket (0 : prochain ou en cours)"""
+        with self._cond:
+            if ticket.admitted_at is not None or ticket.abandoned:
+                return 0
+            try:
+                return self._waiting.index(ticket)
+            except ValueError:
+                return 0
+
+    def eta(self, ticket: Ticket) -> float:
+        """Estimation du temps restant avant le résultat, en secondes"""
+        service = self.service_seconds()
+        if ticket.admitted_at is not None:
+            return max(0.0, service - (time.monotonic() - ticket.admitted_at))
+        with self._cond:
+            # Tours d'exécution à attendre avant le début de l'inférence
+            rounds = self.position(ticket) // self.max_concurrency
+            if self._active >= self.max_concurrency:
+                rounds += 1
+        return rounds * service + service
+
+    def metrics(self) -> Dict[str, Any]:
+        """Profondeur de file, occupation et temps d'attente récents"""
+        with self._cond:
+            waits = sorted(self._wait_times)
+            services = list(self._service_times)
+            metrics = {
+                'queue_depth': len(self._waiting),
+                'peak_queue_depth': self.peak_queue_depth,
+                'active': self._active,
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'completed': self.completed
+            }
+        metrics['wait_p50'] = waits[len(waits) // 2] if waits else 0.0
+        metrics['wait_p95'] = waits[int(len(waits) * 0.95)] if waits else 0.0
+        metrics['wait_max'] = waits[-1] if waits else 0.0
+        metrics['service_mean'] = (statistics.fmean(services) if services
+                                   else self.default_service_seconds)
+        return metrics
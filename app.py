@@ -1,496 +1,87 @@
 import streamlit as st
-import numpy as np
 from PIL import Image
 import io
-import base64
 import time
 import os
-import tempfile
-import hashlib
-import tensorflow as tf
-from tensorflow import keras
-import gc
+import secrets
 from datetime import datetime
-import json
+import csv
+import zipfile
+import logging
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
+from session_storage import SessionStorageManager, SecureFileManager
+from medical_ai import MedicalAIModel
+from pipeline import InferencePipeline
+from inference_jobs import InferenceJobManager, content_key
+from admission import AdmissionController, AdmissionRejected
+from static_assets import inline_css, static_url
+from thumbnails import ThumbnailCache
+from explanations import ExplanationManager
+from history import AnalysisHistory, HistoryAggregates
+from history_store import get_history_store
 
 # Import du module PWA
 try:
-    from pwa_integration import setup_pwa, get_pwa_installation_guide
+    from pwa_integration import setup_pwa, image_uploader
     PWA_AVAILABLE = True
 except ImportError:
     PWA_AVAILABLE = False
     print("Module PWA non disponible")
 
+logger = logging.getLogger(__name__)
+
+# Analyse lancée dès la validation de l'image, avant le clic sur « Analyser »
+SPECULATIVE_INFERENCE = os.environ.get('MEDICAL_SPECULATIVE_INFERENCE', '1') != '0'
+
+# Capacité du service d'inférence partagée par toutes les sessions
+MAX_CONCURRENT_INFERENCES = int(os.environ.get('MEDICAL_MAX_CONCURRENT_INFERENCES', '2'))
+MAX_QUEUED_INFERENCES = int(os.environ.get('MEDICAL_MAX_QUEUED_INFERENCES', '32'))
+
+# Réduction des images dans le navigateur avant l'envoi (plus grand côté, en pixels)
+CLIENT_DOWNSCALE = PWA_AVAILABLE and os.environ.get('MEDICAL_CLIENT_DOWNSCALE', '1') != '0'
+UPLOAD_MAX_SIDE = int(os.environ.get('MEDICAL_UPLOAD_MAX_SIDE', '1024'))
+
+# Intervalle de vérification du fichier du modèle pour le remplacement à chaud (0 : désactivé)
+MODEL_RELOAD_INTERVAL = float(os.environ.get('MEDICAL_MODEL_RELOAD_INTERVAL', '30'))
+
+# Cartes Grad-CAM à la demande (conservation des cartes de caractéristiques)
+EXPLANATIONS = os.environ.get('MEDICAL_EXPLANATIONS', '1') != '0'
+
 # Configuration de la page
-st.set_page_config(
-    page_title="SamaSanté  - DIA",
-    page_icon="🏥",
-    layout="wide",
-    initial_sidebar_state="collapsed"
-)
-
-# Configuration de sécurité
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
-
-# CSS personnalisé pour le design médical responsive
-st.markdown("""
-<style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    
-    /* Variables CSS */
-    :root {
-        --primary-blue: #4F46E5;
-        --secondary-blue: #3B82F6;
-        --accent-teal: #14B8A6;
-        --light-bg: #F8FAFC;
-        --white: #FFFFFF;
-        --text-dark: #1E293B;
-        --text-gray: #64748B;
-        --border-light: #E2E8F0;
-        --success-green: #10B981;
-        --warning-orange: #F59E0B;
-        --danger-red: #EF4444;
-    }
-    
-    /* Reset et base */
-    .stApp {
-        font-family: 'Inter', sans-serif;
-        /* background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); */
-        background-color: #E6F0FA; 
-        /* background: linear-gradient(135deg, #E6F0FA, #E6FAF0); */
-        /* background: linear-gradient(135deg, #667eea 0%, #87CEEB, #E6F0FA); */
-        min-height: 100vh;
-    }
-    
-    /* Header personnalisé */
-    .custom-header {
-        background: var(--white);
-        padding: 1rem 2rem;
-        border-radius: 12px;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
-        margin-bottom: 2rem;
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-    }
-    
-    .logo-section {
-        display: flex;
-        align-items: center;
-        gap: 12px;
-    }
-    
-    .logo-icon {
-        width: 40px;
-        height: 40px;
-        background: var(--primary-blue);
-        border-radius: 8px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        color: white;
-        font-size: 20px;
-        font-weight: bold;
-    }
-    
-    .logo-text {
-        font-size: 24px;
-        font-weight: 700;
-        color: var(--text-dark);
-    }
-    
-    .nav-links {
-        display: flex;
-        gap: 2rem;
-        align-items: center;
-    }
-    
-    .nav-link {
-        color: var(--text-gray);
-        text-decoration: none;
-        font-weight: 500;
-        transition: color 0.3s ease;
-        cursor: pointer;
-    }
-    
-    .nav-link:hover {
-        color: var(--primary-blue);
-    }
-    
-    /* Hero section */
-    .hero-section {
-        background: var(--white);
-        border-radius: 16px;
-        padding: 3rem;
-        margin-bottom: 2rem;
-        box-shadow: 0 10px 25px -5px rgba(0, 0, 0, 0.1);
-        display: grid;
-        grid-template-columns: 1fr 1fr;
-        gap: 3rem;
-        align-items: center;
-    }
-    
-    .hero-content h1 {
-        font-size: 3rem;
-        font-weight: 700;
-        color: var(--primary-blue);
-        line-height: 1.2;
-        margin-bottom: 1rem;
-    }
-    
-    .hero-content p {
-        font-size: 1.1rem;
-        color: var(--text-gray);
-        line-height: 1.6;
-        margin-bottom: 2rem;
-    }
-    
-    /* Cards */
-    .feature-card {
-        background: var(--white);
-        border-radius: 12px;
-        padding: 2rem;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-        margin-bottom: 1rem;
-    }
-    
-    .feature-card:hover {
-        transform: translateY(-4px);
-        box-shadow: 0 10px 25px -5px rgba(0, 0, 0, 0.2);
-    }
-    
-    /* Upload area */
-    .upload-area {
-        border: 2px dashed var(--border-light);
-        border-radius: 12px;
-        padding: 3rem;
-        text-align: center;
-        background: var(--light-bg);
-        transition: all 0.3s ease;
-        margin: 1rem 0;
-    }
-    
-    .upload-area:hover {
-        border-color: var(--primary-blue);
-        background: rgba(79, 70, 229, 0.05);
-    }
-    
-    /* Résultats */
-    .result-card {
-        background: var(--white);
-        border-radius: 12px;
-        padding: 2rem;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
-        margin-top: 2rem;
-    }
-    
-    /* Jauge de diagnostic */
-    .diagnostic-gauge {
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        margin: 2rem 0;
-    }
-    
-    .gauge-container {
-        position: relative;
-        width: 200px;
-        height: 200px;
-    }
-    
-    .gauge-bg {
-        width: 100%;
-        height: 100%;
-        border-radius: 50%;
-        background: conic-gradient(
-            var(--success-green) 0deg 120deg,
-            var(--warning-orange) 120deg 240deg,
-            var(--danger-red) 240deg 360deg
-        );
-        display: flex;
-        align-items: center;
-        justify-content: center;
-    }
-    
-    .gauge-inner {
-        width: 80%;
-        height: 80%;
-        background: white;
-        border-radius: 50%;
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        justify-content: center;
-        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.1);
-    }
-    
-    .gauge-value {
-        font-size: 2rem;
-        font-weight: bold;
-        color: var(--text-dark);
-    }
-    
-    .gauge-label {
-        font-size: 0.9rem;
-        color: var(--text-gray);
-        margin-top: 0.5rem;
-    }
-    
-    /* Boutons */
-    .custom-button {
-        background: var(--accent-teal);
-        color: white;
-        padding: 12px 24px;
-        border: none;
-        border-radius: 8px;
-        font-weight: 600;
-        font-size: 16px;
-        cursor: pointer;
-        transition: all 0.3s ease;
-        text-decoration: none;
-        display: inline-block;
-        margin: 0.5rem;
-    }
-    
-    .custom-button:hover {
-        background: #0F766E;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 12px rgba(20, 184, 166, 0.4);
-    }
-    
-    .custom-button.secondary {
-        background: var(--primary-blue);
-    }
-    
-    .custom-button.secondary:hover {
-        background: #3730A3;
-    }
-    
-    /* Messages de sécurité */
-    .security-notice {
-        background: linear-gradient(135deg, #FEF3C7, #FDE68A);
-        border: 1px solid #F59E0B;
-        border-radius: 8px;
-        padding: 1rem;
-        margin: 1rem 0;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
-    
-    .privacy-notice {
-        background: linear-gradient(135deg, #DBEAFE, #BFDBFE);
-        border: 1px solid #3B82F6;
-        border-radius: 8px;
-        padding: 1rem;
-        margin: 1rem 0;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
-    
-    /* Responsive */
-    @media (max-width: 768px) {
-        .hero-section {
-            grid-template-columns: 1fr;
-            padding: 2rem;
-            gap: 2rem;
-        }
-        
-        .hero-content h1 {
-            font-size: 2rem;
-        }
-        
-        .custom-header {
-            padding: 1rem;
-            flex-direction: column;
-            gap: 1rem;
-        }
-        
-        .nav-links {
-            gap: 1rem;
-            flex-wrap: wrap;
-            justify-content: center;
-        }
-        
-        .gauge-container {
-            width: 150px;
-            height: 150px;
-        }
-        
-        .gauge-value {
-            font-size: 1.5rem;
-        }
-    }
-    
-    /* Masquer les éléments Streamlit par défaut */
-    .stDeployButton {
-        display: none;
-    }
-    
-    #MainMenu {
-        visibility: hidden;
-    }
-    
-    footer {
-        visibility: hidden;
-    }
-    
-    header {
-        visibility: hidden;
-    }
-    
-    /* Animations */
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(20px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    .fade-in {
-        animation: fadeIn 0.6s ease-out;
-    }
-    
-    @keyframes pulse {
-        0%, 100% { transform: scale(1); }
-        50% { transform: scale(1.05); }
-    }
-    
-    .pulse {
-        animation: pulse 2s infinite;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# Classe pour la gestion sécurisée des fichiers
-class SecureFileManager:
-    def __init__(self):
-        self.temp_dir = tempfile.mkdtemp()
-        self.allowed_extensions = {'.png', '.jpg', '.jpeg', '.bmp'}
-        self.max_file_size = 10 * 1024 * 1024  # 10MB
-    
-    def validate_file(self, uploaded_file):
-        """Valide le fichier uploadé"""
-        if uploaded_file is None:
-            return False, "Aucun fichier sélectionné"
-        
-        # Vérifier l'extension
-        file_ext = os.path.splitext(uploaded_file.name)[1].lower()
-        if file_ext not in self.allowed_extensions:
-            return False, f"Extension non autorisée. Extensions acceptées: {', '.join(self.allowed_extensions)}"
-        
-        # Vérifier la taille
-        if len(uploaded_file.getvalue()) > self.max_file_size:
-            return False, f"Fichier trop volumineux. Taille maximale: {self.max_file_size // (1024*1024)}MB"
-        
-        return True, "Fichier valide"
-    
-    def save_temp_file(self, uploaded_file):
-        """Sauvegarde temporaire sécurisée"""
-        file_hash = hashlib.md5(uploaded_file.getvalue()).hexdigest()
-        file_ext = os.path.splitext(uploaded_file.name)[1].lower()
-        temp_filename = f"{file_hash}{file_ext}"
-        temp_path = os.path.join(self.temp_dir, temp_filename)
-        
-        with open(temp_path, 'wb') as f:
-            f.write(uploaded_file.getvalue())
-        
-        return temp_path
-    
-    def cleanup(self):
-        """Nettoyage des fichiers temporaires"""
-        try:
-            import shutil
-            shutil.rmtree(self.temp_dir, ignore_errors=True)
-        except:
-            pass
+def configure_page():
+    """Configure la page Streamlit"""
+    st.set_page_config(
+        page_title="SamaSanté  - DIA",
+        page_icon="🏥",
+        layout="wide",
+        initial_sidebar_state="collapsed"
+    )
 
-# Classe pour le modèle de prédiction
-class MedicalAIModel:
-    def __init__(self):
-        self.model = None
-        self.classes = ["Normal", "Précancéreux", "Cancéreux"]
-        self.model_path = "R50_Herlev_7class.keras"
-        self.load_model()
-    
-    def load_model(self):
-        """Charge le modèle de prédiction"""
-        try:
-            if os.path.exists(self.model_path):
-                self.model = keras.models.load_model(self.model_path)
-                st.success("✅ Modèle IA chargé avec succès")
-            else:
-                st.warning("⚠️ Modèle non trouvé, utilisation du mode démonstration")
-                self.model = None
-        except Exception as e:
-            st.error(f"❌ Erreur lors du chargement du modèle: {e}")
-            self.model = None
-    
-    def preprocess_image(self, image):
-        """Prétraite l'image pour le modèle"""
-        # Redimensionne l'image à 224x224
-        image = image.resize((224, 224))
-        
-        # Convertit en RGB si nécessaire
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Convertit en array numpy
-        image_array = np.array(image)
-        
-        # Normalise les valeurs des pixels
-        image_array = image_array / 255.0
-        
-        # Ajoute une dimension batch
-        image_array = np.expand_dims(image_array, axis=0)
-        
-        return image_array
+def inject_styles():
+    """Injecte le CSS personnalisé pour le design médical responsive"""
+    # Feuilles de style servies en fichiers statiques (mises en cache par le
+    # navigateur) : seule cette balise est renvoyée à chaque réexécution
+    st.html(
+        f'<style>@import url("{static_url("css/critical.css")}");'
+        f'@import url("{static_url("css/app.css")}");</style>'
+    )
     
-    def predict(self, image):
-        """Fait une prédiction sur l'image"""
-        try:
-            processed_image = self.preprocess_image(image)
-            
-            if self.model is not None:
-                # Prédiction réelle avec le modèle
-                predictions = self.model.predict(processed_image, verbose=0)
-                probabilities = predictions[0]
-                
-                # Mappage des 7 classes du modèle vers 3 classes simplifiées
-                # Supposons que les classes sont: [Normal, ASCUS, LSIL, HSIL, SCC, AGC, AIS]
-                normal_prob = probabilities[0]  # Normal
-                precancer_prob = probabilities[1] + probabilities[2]  # ASCUS + LSIL
-                cancer_prob = probabilities[3] + probabilities[4] + probabilities[5] + probabilities[6]  # HSIL + SCC + AGC + AIS
-                
-                # Normalisation
-                total = normal_prob + precancer_prob + cancer_prob
-                if total > 0:
-                    final_probs = [normal_prob/total, precancer_prob/total, cancer_prob/total]
-                else:
-                    final_probs = [0.33, 0.33, 0.34]
-            else:
-                # Mode démonstration avec prédictions aléatoires
-                time.sleep(2)  # Simule le temps de traitement
-                final_probs = np.random.dirichlet([2, 1, 1])  # Biais vers normal
-            
-            return final_probs, self.classes
-            
-        except Exception as e:
-            st.error(f"Erreur lors de la prédiction: {e}")
-            return [0.33, 0.33, 0.34], self.classes
-        finally:
-            # Nettoyage mémoire
-            gc.collect()
+    # Premier affichage de la session : les styles de l'en-tête et de la section
+    # hero sont aussi inclus dans la page, sans attendre les feuilles de style
+    if not st.session_state.get('styles_loaded'):
+        st.session_state.styles_loaded = True
+        st.html(f'<style>{inline_css("css/critical.css")}</style>')
+
 
 # Fonction pour générer un PDF du diagnostic
-def generate_pdf_report(image, prediction_result, confidence, timestamp):
-    """Génère un rapport PDF du diagnostic"""
+def generate_pdf_report(thumbnail, prediction_result, confidence, timestamp, explanation=None,
+                        model_version=None):
+    """Génère un rapport PDF du diagnostic (`thumbnail` : aperçu JPEG de l'image,
+    `explanation` : aperçu avec la carte Grad-CAM superposée, facultatif)"""
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
     styles = getSampleStyleSheet()
@@ -512,8 +103,29 @@ def generate_pdf_report(image, prediction_result, confidence, timestamp):
     story.append(Paragraph(f"<b>Date et heure:</b> {timestamp}", info_style))
     story.append(Paragraph(f"<b>Résultat:</b> {prediction_result}", info_style))
     story.append(Paragraph(f"<b>Niveau de confiance:</b> {confidence:.1f}%", info_style))
+    if model_version:
+        story.append(Paragraph(f"<b>Version du modèle:</b> {model_version}", info_style))
     story.append(Spacer(1, 20))
     
+    # Aperçu de l'image analysée (miniature déjà encodée, non réencodée)
+    if thumbnail:
+        preview = RLImage(io.BytesIO(thumbnail))
+        width = 3 * inch
+        preview.drawHeight = preview.imageHeight * width / preview.imageWidth
+        preview.drawWidth = width
+        story.append(preview)
+        story.append(Spacer(1, 20))
+    
+    if explanation:
+        story.append(Paragraph("<b>Zones déterminantes (Grad-CAM):</b>", info_style))
+        story.append(Spacer(1, 6))
+        heatmap = RLImage(io.BytesIO(explanation))
+        width = 3 * inch
+        heatmap.drawHeight = heatmap.imageHeight * width / heatmap.imageWidth
+        heatmap.drawWidth = width
+        story.append(heatmap)
+        story.append(Spacer(1, 20))
+    
     # Avertissement médical
     warning_style = ParagraphStyle(
         'Warning',
@@ -562,11 +174,47 @@ def generate_pdf_report(image, prediction_result, confidence, timestamp):
 @st.cache_resource
 def init_components():
     """Initialise les composants de l'application"""
-    file_manager = SecureFileManager()
+    storage = SessionStorageManager()
+    storage.start_janitor()
     ai_model = MedicalAIModel()
-    return file_manager, ai_model
+    # Une nouvelle version du fichier remplace le modèle sans redémarrage
+    ai_model.start_watcher(MODEL_RELOAD_INTERVAL)
+    admission = AdmissionController(max_concurrency=MAX_CONCURRENT_INFERENCES,
+                                    max_queue=MAX_QUEUED_INFERENCES)
+    explanations = ExplanationManager(ai_model, admission) if EXPLANATIONS else None
+    # Les résultats déjà enregistrés évitent de réanalyser une même image
+    inference_jobs = InferenceJobManager(ai_model, admission=admission,
+                                         store=get_history_store(),
+                                         explanations=explanations)
+    thumbnails = ThumbnailCache()
+    return storage, ai_model, inference_jobs, thumbnails
+
+@st.cache_resource
+def get_aggregates():
+    """Agrégats des analyses de toutes les sessions pour l'équipe en cours"""
+    return HistoryAggregates()
+
+def get_file_manager(storage):
+    """Retourne le gestionnaire de fichiers propre à la session"""
+    file_manager = st.session_state.get('file_manager')
+    if file_manager is None or file_manager.storage is not storage:
+        file_manager = SecureFileManager(storage, secrets.token_urlsafe(16))
+        st.session_state.file_manager = file_manager
+    
+    # Simple mise à jour en mémoire de l'activité de la session
+    storage.touch(file_manager.session_id)
+    return file_manager
 
 # Interface utilisateur
+def display_model_status(ai_model):
+    """Affiche l'état de chargement du modèle"""
+    if ai_model.status == 'loaded':
+        st.success(ai_model.status_message)
+    elif ai_model.status == 'demo':
+        st.warning(ai_model.status_message)
+    else:
+        st.error(ai_model.status_message)
+
 def display_header():
     """Affiche l'en-tête de l'application"""
     st.markdown("""
@@ -591,11 +239,11 @@ def display_hero():
                 <span><strong>Confidentialité garantie:</strong> Aucune donnée n'est stockée. Traitement local et suppression automatique.</span>
             </div>
         </div>
-        <div style="display: flex; justify-content: center; align-items: center; background: linear-gradient(135deg, var(--accent-teal), var(--secondary-blue)); border-radius: 16px; padding: 2rem; min-height: 300px;">
-            <div style="text-align: center; color: white;">
-                <div style="font-size: 4rem; margin-bottom: 1rem;">🔬</div>
-                <div style="font-size: 1.5rem; font-weight: 600;">IA Médicale</div>
-                <div style="font-size: 1rem; opacity: 0.9;">Précision • Rapidité • Sécurité</div>
+        <div class="hero-visual">
+            <div class="hero-visual-content">
+                <div class="hero-visual-icon">🔬</div>
+                <div class="hero-visual-title">IA Médicale</div>
+                <div class="hero-visual-subtitle">Précision • Rapidité • Sécurité</div>
             </div>
         </div>
     </div>
@@ -635,300 +283,727 @@ def display_diagnostic_gauge(prediction, confidence):
     </div>
     """, unsafe_allow_html=True)
 
-def main():
-    """Fonction principale de l'application"""
-    # Configuration PWA
-    if PWA_AVAILABLE:
-        setup_pwa()
+def is_batch_member(info):
+    """Indique si un membre d'archive ZIP doit être analysé"""
+    return not (info.is_dir() or info.filename.startswith('__MACOSX/')
+                or os.path.basename(info.filename).startswith('.'))
+
+def iter_batch_files(uploaded_files, file_manager):
+    """Parcourt les fichiers et archives ZIP, un membre à la fois
+
+    Renvoie des tuples (nom, données, erreur). Les archives ne sont jamais
+    extraites en entier : chaque membre est validé sur ses métadonnées puis
+    lu individuellement.
+    """
+    for uploaded_file in uploaded_files:
+        if uploaded_file.name.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(uploaded_file)
+            except zipfile.BadZipFile:
+                yield uploaded_file.name, None, "Archive ZIP invalide"
+                continue
+            
+            with archive:
+                for info in archive.infolist():
+                    if not is_batch_member(info):
+                        continue
+                    
+                    # Validation sur la taille déclarée avant toute décompression
+                    is_valid, message = file_manager.validate_bytes(info.filename, info.file_size)
+                    if not is_valid:
+                        yield info.filename, None, message
+                        continue
+                    
+                    with archive.open(info) as member:
+                        data = member.read(file_manager.max_file_size + 1)
+                    is_valid, message = file_manager.validate_bytes(info.filename, len(data))
+                    yield info.filename, (data if is_valid else None), (None if is_valid else message)
+        else:
+            data = uploaded_file.getvalue()
+            is_valid, message = file_manager.validate_bytes(uploaded_file.name, len(data))
+            yield uploaded_file.name, (data if is_valid else None), (None if is_valid else message)
+
+def count_batch_files(uploaded_files):
+    """Nombre d'entrées à traiter (lecture du seul répertoire des archives)"""
+    total = 0
+    for uploaded_file in uploaded_files:
+        if uploaded_file.name.lower().endswith('.zip'):
+            try:
+                with zipfile.ZipFile(uploaded_file) as archive:
+                    total += sum(1 for info in archive.infolist() if is_batch_member(info))
+            except zipfile.BadZipFile:
+                total += 1
+            uploaded_file.seek(0)
+        else:
+            total += 1
+    return max(total, 1)
+
+def display_batch_analysis(file_manager, ai_model, admission, batch_size=16):
+    """Analyse par lot de plusieurs images ou d'une archive ZIP"""
+    uploaded_files = st.file_uploader(
+        "Choisissez plusieurs images ou une archive ZIP",
+        type=['png', 'jpg', 'jpeg', 'bmp', 'zip'],
+        accept_multiple_files=True,
+        help="Formats acceptés: PNG, JPG, JPEG, BMP ou ZIP. Taille maximale par image: 10MB"
+    )
     
-    # Initialisation
-    file_manager, ai_model = init_components()
+    if not uploaded_files:
+        st.session_state.pop('batch_results', None)
+        st.session_state.pop('batch_summary', None)
+        return
+    
+    if st.button("🔬 Analyser le lot", type="primary", use_container_width=True):
+        total = count_batch_files(uploaded_files)
+        progress = st.progress(0.0, text="🔄 Analyse du lot en cours...")
+        table = st.empty()
+        rows = []
+        processed = 0
+        start = time.time()
+        last_refresh = 0.0
+        
+        history = get_history()
+        saved_history = get_saved_history()
+        aggregates = get_aggregates()
+        
+        # Lecture, décodage, prétraitement et inférence se chevauchent
+        pipeline = InferencePipeline(ai_model, batch_size=batch_size, read_workers=1,
+                                     admission=admission)
+        for result in pipeline.run(iter_batch_files(uploaded_files, file_manager)):
+            if result['error']:
+                rows.append({'Image': result['key'], 'Diagnostic': None,
+                             'Confiance (%)': None, 'Statut': f"❌ {result['error']}"})
+            else:
+                rows.append({
+                    'Image': result['key'],
+                    'Diagnostic': result['diagnosis'],
+                    'Confiance (%)': round(result['confidence'], 1),
+                    'Statut': "✅"
+                })
+                history.append(result['diagnosis'], result['confidence'], result['key'])
+                aggregates.add(result['diagnosis'], result['confidence'])
+                if saved_history is not None:
+                    saved_history.add(result, result['key'], model_version=result['model_version'])
+            
+            processed += 1
+            now = time.time()
+            if now - last_refresh >= 0.5:
+                rate = processed / max(now - start, 1e-6)
+                progress.progress(min(processed / total, 1.0),
+                                  text=f"🔄 {processed}/{total} images — {rate:.1f} images/s")
+                table.dataframe(rows, use_container_width=True, hide_index=True)
+                last_refresh = now
+        
+        table.empty()
+        st.session_state.batch_results = rows
+        st.session_state.batch_summary = f"✅ {processed} images traitées en {time.time() - start:.1f} s"
+        
+        # L'historique est affiché par un autre fragment : réexécution complète
+        st.rerun(scope="app")
+    
+    rows = st.session_state.get('batch_results')
+    if rows:
+        st.success(st.session_state.get('batch_summary', ''))
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+        csv_buffer = io.StringIO()
+        writer = csv.DictWriter(csv_buffer, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+        st.download_button(
+            label="📥 Télécharger les résultats (CSV)",
+            data=csv_buffer.getvalue().encode('utf-8'),
+            file_name=f"analyse_lot_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+
+def clear_analysis_result():
+    """Efface le dernier résultat affiché"""
+    st.session_state.pop('analysis_result', None)
+
+def get_history():
+    """Historique borné des analyses de la session"""
+    if 'history' not in st.session_state:
+        st.session_state.history = AnalysisHistory()
+    return st.session_state.history
+
+def get_saved_history():
+    """Analyses du poste dans l'historique persistant, ou None s'il n'est pas activé"""
+    history_store = get_history_store()
+    if history_store is None:
+        return None
+    return history_store.view()
+
+def clear_history():
+    """Efface l'historique des analyses de la session"""
+    get_history().clear()
+    saved_history = get_saved_history()
+    if saved_history is not None:
+        saved_history.clear()
+    st.session_state.pop('history_page', None)
+    clear_analysis_result()
+
+def follow_analysis(inference_jobs, owner, key=None):
+    """Change l'analyse suivie par la session et annule la précédente"""
+    previous = st.session_state.get('analysis_key')
+    if previous is not None and previous != key:
+        inference_jobs.cancel(previous, owner)
+    st.session_state.analysis_key = key
+
+def uploaded_job_id(uploaded_file):
+    """Empreinte du fichier chargé, calculée une seule fois par fichier"""
+    cached = st.session_state.get('upload_job_id')
+    if cached is None or cached[0] != uploaded_file.file_id:
+        cached = (uploaded_file.file_id, content_key(uploaded_file.getvalue()))
+        st.session_state.upload_job_id = cached
+    return cached[1]
+
+def record_analysis(prediction, job_id, thumbnail, image_name):
+    """Enregistre le résultat d'une analyse terminée (une seule fois par tâche)"""
+    st.session_state.pop('analysis_job', None)
     
-    # Affichage de l'interface
-    display_header()
-    display_hero()
+    # Sauvegarde dans l'historique (et dans l'historique persistant s'il est activé)
+    record = get_history().append(
+        prediction['diagnosis'], prediction['confidence'], image_name, thumbnail_key=job_id
+    )
+    get_aggregates().add(prediction['diagnosis'], prediction['confidence'])
+    # Version des poids ayant produit ce résultat
+    model_version = prediction.get('model_version')
+    saved_history = get_saved_history()
+    if saved_history is not None:
+        saved_history.add(prediction, image_name, image_hash=job_id, model_version=model_version)
+    result = record.to_dict()
+    
+    # Génération du PDF une seule fois par analyse
+    pdf_buffer = generate_pdf_report(
+        thumbnail, result['diagnosis'], result['confidence'], result['timestamp'],
+        model_version=model_version
+    )
+    st.session_state.analysis_result = dict(
+        result, job_id=job_id, model_version=model_version, pdf=pdf_buffer.getvalue()
+    )
+
+def display_analysis_result(analysis):
+    """Affiche le résultat conservé en session et ses actions"""
+    # Affichage de la jauge
+    display_diagnostic_gauge(analysis['diagnosis'], analysis['confidence'])
+    
+    # Boutons d'action
+    col_btn1, col_btn2, col_btn3 = st.columns(3)
+    
+    with col_btn1:
+        st.download_button(
+            label="📄 Télécharger PDF",
+            data=(analysis.get('pdf_explanation') if st.session_state.get('explanation_in_pdf')
+                  else None) or analysis['pdf'],
+            file_name=f"diagnostic_{analysis['timestamp'].replace(':', '-')}.pdf",
+            mime="application/pdf",
+            use_container_width=True
+        )
     
-    # Navigation par onglets
-    tab1, tab2, tab3, tab4 = st.tabs(["🔬 Analyse", "📋 Historique", "ℹ️ À propos", "📞 Contact"])
+    with col_btn2:
+        if st.button("💾 Sauvegarder", use_container_width=True):
+            st.success("✅ Résultat sauvegardé dans l'historique!")
     
-    with tab1:
-        st.markdown("## 📸 Analyse d'Image Médicale")
-        
-        # Messages de sécurité
-        st.markdown("""
-        <div class="security-notice">
-            <span>🛡️</span>
-            <span><strong>Sécurité:</strong> Toutes les images sont traitées localement et supprimées automatiquement après analyse.</span>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Zone d'upload
+    with col_btn3:
+        st.button("🔄 Nouvelle analyse", use_container_width=True,
+                  on_click=clear_analysis_result)
+
+@st.fragment(run_every=1.0)
+def display_job_progress(inference_jobs, job_id):
+    """Suivi d'une analyse en cours, interrogée chaque seconde"""
+    state = inference_jobs.poll(job_id)
+    if state['status'] == 'queued':
+        ahead = state['position']
+        waiting = f"{ahead} analyse(s) avant la vôtre" if ahead else "prochaine analyse"
+        st.info(f"⏳ En file d'attente : {waiting} — résultat estimé dans ~{state['eta']:.0f} s")
+    elif state['status'] == 'running':
+        st.info(f"🔄 Analyse en cours... (~{state['eta']:.0f} s restantes)")
+    else:
+        # Analyse terminée : le résultat est enregistré par l'onglet d'analyse
+        st.rerun(scope="app")
+
+@st.fragment(run_every=1.0)
+def display_explanation_progress(explanations, job_id):
+    """Suivi du calcul d'une explication, interrogé chaque seconde"""
+    if explanations.poll(job_id)['status'] == 'pending':
+        st.info("🔄 Calcul de l'explication...")
+    else:
+        st.rerun(scope="app")
+
+def display_explanation(preview, explanations, analysis, data, thumbnail):
+    """Carte Grad-CAM superposée à l'aperçu, calculée seulement si elle est demandée"""
+    if not explanations.available:
+        return
+    if not st.toggle("🔍 Zones déterminantes (Grad-CAM)", key='show_explanation'):
+        return
+    
+    if analysis['model_version'] != explanations.model.version:
+        st.caption("Modèle mis à jour depuis cette analyse : relancez l'analyse pour obtenir l'explication")
+        return
+    
+    job_id = analysis['job_id']
+    explanations.request(job_id, data, analysis['diagnosis'], thumbnail)
+    state = explanations.poll(job_id)
+    if state['status'] == 'pending':
+        display_explanation_progress(explanations, job_id)
+        return
+    if state['error']:
+        st.warning(f"⚠️ {state['error']}")
+        return
+    
+    overlay = state['result']['overlay']
+    preview.image(overlay, caption=f"Zones déterminantes pour « {analysis['diagnosis']} »",
+                  use_container_width=True)
+    # Rapport avec la carte, généré une seule fois à la demande
+    if st.checkbox("Inclure la carte dans le rapport PDF", key='explanation_in_pdf'):
+        if 'pdf_explanation' not in analysis:
+            analysis['pdf_explanation'] = generate_pdf_report(
+                thumbnail, analysis['diagnosis'], analysis['confidence'], analysis['timestamp'],
+                explanation=overlay, model_version=analysis['model_version']
+            ).getvalue()
+
+def display_service_load(admission):
+    """Indicateur de charge du service d'inférence"""
+    metrics = admission.metrics()
+    if metrics['queue_depth'] or metrics['active'] >= metrics['max_concurrency']:
+        st.caption(
+            f"📈 Service chargé : {metrics['queue_depth']} analyse(s) en attente, "
+            f"attente médiane {metrics['wait_p50']:.0f} s"
+        )
+
+def display_single_analysis(file_manager, inference_jobs, thumbnails):
+    """Analyse d'une image unique ; le dernier résultat est conservé en session"""
+    # Zone d'upload : l'image est réduite dans le navigateur lorsque c'est possible,
+    # ce qui évite d'envoyer jusqu'à 10MB pour une analyse en 224x224
+    if CLIENT_DOWNSCALE:
+        uploaded_file = image_uploader(
+            "Choisissez une image cytologique du col de l'utérus",
+            max_side=UPLOAD_MAX_SIDE,
+            extensions=file_manager.allowed_extensions,
+            help=f"Formats acceptés: PNG, JPG, JPEG, BMP. Image réduite à {UPLOAD_MAX_SIDE}px avant l'envoi",
+            key="image_upload"
+        )
+    else:
         uploaded_file = st.file_uploader(
             "Choisissez une image cytologique du col de l'utérus",
             type=['png', 'jpg', 'jpeg', 'bmp'],
             help="Formats acceptés: PNG, JPG, JPEG, BMP. Taille maximale: 10MB"
         )
+    
+    if uploaded_file is None:
+        follow_analysis(inference_jobs, file_manager.session_id)
+        return
+    
+    # Validation du fichier
+    is_valid, message = file_manager.validate_file(uploaded_file)
+    
+    if not is_valid:
+        follow_analysis(inference_jobs, file_manager.session_id)
+        st.error(f"❌ {message}")
+        return
+    
+    # La tâche d'analyse est identifiée par l'empreinte du contenu de l'image
+    data = uploaded_file.getvalue()
+    job_id = uploaded_job_id(uploaded_file)
+    
+    # Analyse spéculative : lancée pendant que l'utilisateur consulte l'aperçu
+    if SPECULATIVE_INFERENCE and st.session_state.get('analysis_key') != job_id:
+        try:
+            inference_jobs.submit(data, file_manager.session_id, job_id, speculative=True)
+            follow_analysis(inference_jobs, file_manager.session_id, job_id)
+        except AdmissionRejected:
+            # Service chargé : l'analyse attendra le clic sur « Analyser »
+            pass
+    
+    # Aperçu réduit généré une fois par contenu : l'image pleine résolution
+    # n'est jamais renvoyée au navigateur
+    try:
+        thumbnail = thumbnails.get_or_create(job_id, data)
+        image = Image.open(uploaded_file)
+    except Exception as e:
+        logger.warning(f"Unreadable image {uploaded_file.name}: {e}")
+        st.error("❌ Image illisible ou corrompue")
+        return
+    
+    # Affichage de l'image
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        preview = st.empty()
+        preview.image(thumbnail, caption="Image chargée", use_container_width=True)
         
-        if uploaded_file is not None:
-            # Validation du fichier
-            is_valid, message = file_manager.validate_file(uploaded_file)
-            
-            if not is_valid:
-                st.error(f"❌ {message}")
-                return
+        analysis = st.session_state.get('analysis_result')
+        if (inference_jobs.explanations is not None and analysis is not None
+                and analysis['job_id'] == job_id):
+            display_explanation(preview, inference_jobs.explanations, analysis, data, thumbnail)
+        
+        # Informations sur l'image
+        st.markdown("### 📊 Informations")
+        st.write(f"**Nom:** {uploaded_file.name}")
+        st.write(f"**Taille:** {image.size}")
+        st.write(f"**Mode:** {image.mode}")
+        st.write(f"**Taille fichier:** {len(data)} bytes")
+        saved = getattr(uploaded_file, 'saved_bytes', 0)
+        if saved:
+            st.write(f"**Réduit dans le navigateur:** {uploaded_file.original_size} → "
+                     f"{len(data)} bytes ({saved} bytes économisés, "
+                     f"{100 * saved / uploaded_file.original_size:.0f}%)")
+    
+    with col2:
+        analysis = st.session_state.get('analysis_result')
+        if analysis is not None and analysis['job_id'] == job_id:
+            display_analysis_result(analysis)
+        else:
+            requested = st.session_state.get('analysis_job') == job_id
             
-            # Affichage de l'image
-            col1, col2 = st.columns([1, 1])
+            # Bouton d'analyse : réutilise la tâche spéculative ou en cours
+            if st.button("🔬 Analyser l'image", type="primary", use_container_width=True,
+                         disabled=requested):
+                try:
+                    inference_jobs.submit(data, file_manager.session_id, job_id)
+                    follow_analysis(inference_jobs, file_manager.session_id, job_id)
+                    st.session_state.analysis_job = job_id
+                    requested = True
+                except AdmissionRejected as e:
+                    st.warning(f"⏳ {e}")
             
+            if requested:
+                state = inference_jobs.poll(job_id)
+                if state['status'] == 'done':
+                    record_analysis(state['result'], job_id, thumbnail, uploaded_file.name)
+                    # L'historique est affiché par un autre fragment : réexécution complète
+                    st.rerun(scope="app")
+                elif state['error']:
+                    st.session_state.pop('analysis_job', None)
+                    st.error(f"❌ {state['error']}")
+                else:
+                    display_job_progress(inference_jobs, job_id)
+        
+        # Message de prévention
+        st.markdown("---")
+        st.warning("""
+        ⚠️ **Important**: Ce diagnostic automatisé est un outil d'aide à la décision. 
+        Il ne remplace pas l'avis d'un professionnel de santé qualifié. 
+        Consultez toujours un médecin pour un diagnostic définitif.
+        """)
+
+@st.fragment
+def display_analysis_tab(file_manager, ai_model, inference_jobs, thumbnails):
+    """Onglet d'analyse (fragment)"""
+    st.markdown("## 📸 Analyse d'Image Médicale")
+    
+    # Messages de sécurité
+    st.markdown("""
+    <div class="security-notice">
+        <span>🛡️</span>
+        <span><strong>Sécurité:</strong> Toutes les images sont traitées localement et supprimées automatiquement après analyse.</span>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    display_service_load(inference_jobs.admission)
+    
+    mode = st.radio(
+        "Mode d'analyse",
+        ["🖼️ Image unique", "🗂️ Analyse par lot"],
+        horizontal=True
+    )
+    
+    if mode == "🗂️ Analyse par lot":
+        display_batch_analysis(file_manager, ai_model, inference_jobs.admission)
+    else:
+        display_single_analysis(file_manager, inference_jobs, thumbnails)
+
+def display_history_summary(aggregates):
+    """Synthèse de l'activité de l'équipe en cours (agrégats déjà calculés)"""
+    summary = aggregates.snapshot()
+    if not summary['total']:
+        return
+    
+    started = datetime.fromtimestamp(summary['started_at']).strftime("%d/%m/%Y %H:%M")
+    with st.expander(f"📊 Synthèse de l'équipe — {summary['total']} analyse(s) depuis le {started}"):
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            if summary['ends_at'] != float('inf'):
+                ends = datetime.fromtimestamp(summary['ends_at']).strftime("%d/%m/%Y %H:%M")
+                st.caption(f"Remise à zéro automatique à la relève du {ends}")
+        with col2:
+            if st.button("🔄 Nouvelle équipe", key='aggregates_reset',
+                         help="Remettre la synthèse à zéro (toutes les sessions)"):
+                aggregates.reset()
+                st.rerun(scope="fragment")
+        
+        columns = st.columns(max(len(summary['counts']), 1))
+        for column, (diagnosis, count) in zip(columns, sorted(summary['counts'].items())):
+            with column:
+                st.metric(diagnosis, f"{count} ({100 * count / summary['total']:.0f}%)",
+                          help=f"Confiance moyenne : {summary['mean_confidence'][diagnosis]:.1f}%")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.caption("Distribution de la confiance")
+            bins = aggregates.bins
+            chart = {'Confiance (%)': [f"{100 * i // bins}-{100 * (i + 1) // bins}" for i in range(bins)]}
+            chart.update(summary['histograms'])
+            st.bar_chart(chart, x='Confiance (%)', stack=True)
+        with col2:
+            st.caption("Analyses par heure (équipe en cours)")
+            st.bar_chart({
+                'Heure': [datetime.fromtimestamp(hour) for hour, _ in summary['hourly']],
+                'Analyses': [count for _, count in summary['hourly']]
+            }, x='Heure')
+
+@st.fragment
+def display_history_tab(thumbnails):
+    """Onglet d'historique (fragment) : une page d'analyses à la fois"""
+    st.markdown("## 📋 Historique des Analyses")
+    
+    display_history_summary(get_aggregates())
+    
+    # Historique persistant (requêtes indexées) s'il est activé, sinon celui de la session
+    saved_history = get_saved_history()
+    history = saved_history if saved_history is not None else get_history()
+    if not len(history):
+        st.info("📝 Aucune analyse dans l'historique")
+        return
+    
+    # Filtres
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        diagnosis = st.selectbox("Diagnostic", ["Tous"] + history.diagnoses(),
+                                 key='history_diagnosis')
+    with col2:
+        period = st.date_input("Période", value=(), format="DD/MM/YYYY",
+                               key='history_period')
+    with col3:
+        page_size = st.selectbox("Par page", [10, 25, 50], key='history_page_size')
+    
+    start = period[0] if len(period) > 0 else None
+    end = period[1] if len(period) > 1 else start
+    # La page demandée peut dépasser le nombre de pages après un changement de filtre
+    page = st.session_state.get('history_page', 1)
+    records, total = history.query(
+        diagnosis=None if diagnosis == "Tous" else diagnosis,
+        start=start, end=end, page=page, page_size=page_size
+    )
+    pages = max(1, -(-total // page_size))
+    if page > pages:
+        page = st.session_state.history_page = pages
+        records, total = history.query(
+            diagnosis=None if diagnosis == "Tous" else diagnosis,
+            start=start, end=end, page=page, page_size=page_size
+        )
+    
+    if saved_history is not None:
+        st.caption(f"Analyses conservées {saved_history.retention_days} jours")
+    elif history.evicted:
+        st.caption(f"Seules les {history.max_entries} analyses les plus récentes sont conservées")
+    
+    if not records:
+        st.info("🔍 Aucune analyse ne correspond aux filtres")
+    for record in records:
+        with st.expander(f"Analyse {record.number} - {record.timestamp}"):
+            # Miniature partagée avec l'onglet d'analyse, tant qu'elle est en cache
+            thumbnail = thumbnails.get(record.thumbnail_key)
+            if thumbnail is not None:
+                st.image(thumbnail, width=160)
+            col1, col2, col3 = st.columns(3)
             with col1:
-                image = Image.open(uploaded_file)
-                st.image(image, caption="Image chargée", use_container_width=True)
-                
-                # Informations sur l'image
-                st.markdown("### 📊 Informations")
-                st.write(f"**Nom:** {uploaded_file.name}")
-                st.write(f"**Taille:** {image.size}")
-                st.write(f"**Mode:** {image.mode}")
-                st.write(f"**Taille fichier:** {len(uploaded_file.getvalue())} bytes")
-            
+                st.write(f"**Image:** {record.image_name}")
             with col2:
-                # Bouton d'analyse
-                if st.button("🔬 Analyser l'image", type="primary", use_container_width=True):
-                    with st.spinner("🔄 Analyse en cours... Veuillez patienter."):
-                        # Analyse avec le modèle IA
-                        probabilities, classes = ai_model.predict(image)
-                        
-                        # Résultats
-                        max_prob_idx = np.argmax(probabilities)
-                        predicted_class = classes[max_prob_idx]
-                        confidence = probabilities[max_prob_idx] * 100
-                        
-                        # Affichage de la jauge
-                        display_diagnostic_gauge(predicted_class, confidence)
-                        
-                        # Détails des probabilités
-                        #st.markdown("### 📊 Détail des probabilités")
-                        #for i, (class_name, prob) in enumerate(zip(classes, probabilities)):
-                        #    prob_percent = prob * 100
-                        #    if i == max_prob_idx:
-                        #        st.markdown(f"**{class_name}**: {prob_percent:.1f}% 🎯")
-                        #    else:
-                        #        st.markdown(f"{class_name}: {prob_percent:.1f}%")
-                        
-                        # Sauvegarde dans l'historique
-                        if 'history' not in st.session_state:
-                            st.session_state.history = []
-                        
-                        result = {
-                            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            'diagnosis': predicted_class,
-                            'confidence': confidence,
-                            'image_name': uploaded_file.name
-                        }
-                        st.session_state.history.append(result)
-                        
-                        # Boutons d'action
-                        col_btn1, col_btn2, col_btn3 = st.columns(3)
-                        
-                        with col_btn1:
-                            # Génération du PDF
-                            pdf_buffer = generate_pdf_report(
-                                image, predicted_class, confidence, result['timestamp']
-                            )
-                            st.download_button(
-                                label="📄 Télécharger PDF",
-                                data=pdf_buffer.getvalue(),
-                                file_name=f"diagnostic_{result['timestamp'].replace(':', '-')}.pdf",
-                                mime="application/pdf",
-                                use_container_width=True
-                            )
-                        
-                        with col_btn2:
-                            if st.button("💾 Sauvegarder", use_container_width=True):
-                                st.success("✅ Résultat sauvegardé dans l'historique!")
-                        
-                        with col_btn3:
-                            if st.button("🔄 Nouvelle analyse", use_container_width=True):
-                                st.rerun()
-                
-                # Message de prévention
-                st.markdown("---")
-                st.warning("""
-                ⚠️ **Important**: Ce diagnostic automatisé est un outil d'aide à la décision. 
-                Il ne remplace pas l'avis d'un professionnel de santé qualifié. 
-                Consultez toujours un médecin pour un diagnostic définitif.
-                """)
+                st.write(f"**Diagnostic:** {record.diagnosis}")
+            with col3:
+                st.write(f"**Confiance:** {record.confidence:.1f}%")
+    
+    # Pagination
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        st.number_input("Page", min_value=1, max_value=pages, step=1, key='history_page')
+    with col2:
+        st.caption(f"{total} analyse(s) — page {page}/{pages}")
+    
+    # Le rappel s'exécute avant la réexécution du fragment
+    st.button("🗑️ Effacer l'historique", on_click=clear_history)
+
+def display_about_tab():
+    """Onglet à propos (contenu statique)"""
+    st.markdown('<div id="about-section"></div>', unsafe_allow_html=True)
+    st.markdown("## ℹ️ À propos de l'application")
     
-    with tab2:
-        st.markdown("## 📋 Historique des Analyses")
-        
-        if 'history' in st.session_state and st.session_state.history:
-            for i, result in enumerate(reversed(st.session_state.history)):
-                with st.expander(f"Analyse {len(st.session_state.history) - i} - {result['timestamp']}"):
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.write(f"**Image:** {result['image_name']}")
-                    with col2:
-                        st.write(f"**Diagnostic:** {result['diagnosis']}")
-                    with col3:
-                        st.write(f"**Confiance:** {result['confidence']:.1f}%")
-            
-            if st.button("🗑️ Effacer l'historique"):
-                st.session_state.history = []
-                st.success("Historique effacé")
-                st.rerun()
-        else:
-            st.info("📝 Aucune analyse dans l'historique")
+    col1, col2 = st.columns([2, 1])
     
-    with tab3:
-        st.markdown('<div id="about-section"></div>', unsafe_allow_html=True)
-        st.markdown("## ℹ️ À propos de l'application")
+    with col1:
+        st.markdown("""
+        ### 🎯 Objectif
+        Cette application utilise l'intelligence artificielle pour aider au dépistage 
+        du cancer du col de l'utérus à partir d'images cytologiques. Elle est conçue 
+        pour être utilisée par des professionnels de santé dans des contextes à ressources limitées.
         
-        col1, col2 = st.columns([2, 1])
+        ### 🔬 Fonctionnement de l'IA
+        Notre modèle d'intelligence artificielle est basé sur un réseau de neurones convolutionnel 
+        (CNN) entraîné sur des milliers d'images cytologiques cervicales. Le modèle analyse:
         
-        with col1:
-            st.markdown("""
-            ### 🎯 Objectif
-            Cette application utilise l'intelligence artificielle pour aider au dépistage 
-            du cancer du col de l'utérus à partir d'images cytologiques. Elle est conçue 
-            pour être utilisée par des professionnels de santé dans des contextes à ressources limitées.
-            
-            ### 🔬 Fonctionnement de l'IA
-            Notre modèle d'intelligence artificielle est basé sur un réseau de neurones convolutionnel 
-            (CNN) entraîné sur des milliers d'images cytologiques cervicales. Le modèle analyse:
-            
-            - **Morphologie cellulaire**: Forme et taille des cellules
-            - **Caractéristiques nucléaires**: Aspect des noyaux cellulaires  
-            - **Patterns tissulaires**: Organisation des tissus
-            - **Anomalies cytologiques**: Détection d'irrégularités
-            
-            ### ⚠️ Limites médicales
-            **Important**: Cette application est un outil d'aide au diagnostic uniquement:
+        - **Morphologie cellulaire**: Forme et taille des cellules
+        - **Caractéristiques nucléaires**: Aspect des noyaux cellulaires  
+        - **Patterns tissulaires**: Organisation des tissus
+        - **Anomalies cytologiques**: Détection d'irrégularités
+        
+        ### ⚠️ Limites médicales
+        **Important**: Cette application est un outil d'aide au diagnostic uniquement:
+        
+        - ❌ Ne remplace **jamais** l'expertise d'un professionnel de santé
+        - ❌ Ne constitue **pas** un diagnostic médical définitif
+        - ❌ Ne doit **pas** être utilisée comme seul critère de décision
+        - ✅ Doit être complétée par un examen médical approfondi
+        - ✅ Résultats à interpréter par un spécialiste qualifié
+        
+        ### 🛡️ Sécurité et Confidentialité
+        Nous prenons la protection de vos données très au sérieux:
+        
+        - **🔒 Traitement local**: Toutes les analyses sont effectuées localement
+        - **🚫 Aucun stockage**: Les images ne sont jamais sauvegardées sur nos serveurs
+        - **⏱️ Suppression automatique**: Fichiers supprimés immédiatement après traitement
+        - **🔐 Chiffrement**: Communications sécurisées par HTTPS
+        - **📝 Aucune collecte**: Aucune donnée personnelle n'est collectée
+        """)
+    
+    with col2:
+        st.markdown("""
+        ### 🚀 Fonctionnalités
+        
+        **📸 Analyse d'images**
+        - Support formats: PNG, JPG, JPEG, BMP
+        - Traitement en temps réel
+        - Interface responsive
+        
+        **📊 Résultats détaillés**
+        - Jauge de diagnostic visuelle
+        - Scores de confiance
+        - Probabilités détaillées
+        
+        **📄 Rapports PDF**
+        - Génération automatique
+        - Informations complètes
+        - Téléchargement sécurisé
+        
+        **📱 Progressive Web App**
+        - Installation sur mobile
+        - Fonctionnement hors ligne
+        - Interface native
+        
+        **🔧 Technologies**
+        - **Frontend**: Streamlit
+        - **IA**: TensorFlow/Keras
+        - **Images**: PIL/Pillow
+        - **PDF**: ReportLab
+        - **Sécurité**: Chiffrement TLS
+        """)
+
+@st.fragment
+def display_contact_tab():
+    """Onglet de contact (fragment)"""
+    st.markdown('<div id="contact-section"></div>', unsafe_allow_html=True)
+    st.markdown("## 📞 Contact")
+    
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        st.markdown("### 📧 Formulaire de Contact")
+        
+        with st.form("contact_form"):
+            name = st.text_input("Nom complet *")
+            email = st.text_input("Email *")
+            subject = st.selectbox(
+                "Sujet *",
+                ["Question générale", "Support technique", "Signalement de bug", "Autre"]
+            )
+            message = st.text_area("Message *", height=150)
             
-            - ❌ Ne remplace **jamais** l'expertise d'un professionnel de santé
-            - ❌ Ne constitue **pas** un diagnostic médical définitif
-            - ❌ Ne doit **pas** être utilisée comme seul critère de décision
-            - ✅ Doit être complétée par un examen médical approfondi
-            - ✅ Résultats à interpréter par un spécialiste qualifié
+            submitted = st.form_submit_button("📤 Envoyer le message")
             
-            ### 🛡️ Sécurité et Confidentialité
-            Nous prenons la protection de vos données très au sérieux:
+            if submitted:
+                if name and email and message:
+                    # Ici, vous pourriez intégrer un service d'email ou webhook
+                    st.success("✅ Message envoyé avec succès! Nous vous répondrons dans les plus brefs délais.")
+                    st.balloons()
+                else:
+                    st.error("❌ Veuillez remplir tous les champs obligatoires.")
+    
+    with col2:
+        with st.expander("📍 Informations de Contact", expanded=False):
+            st.markdown("### 📍 Informations de Contact")
             
-            - **🔒 Traitement local**: Toutes les analyses sont effectuées localement
-            - **🚫 Aucun stockage**: Les images ne sont jamais sauvegardées sur nos serveurs
-            - **⏱️ Suppression automatique**: Fichiers supprimés immédiatement après traitement
-            - **🔐 Chiffrement**: Communications sécurisées par HTTPS
-            - **📝 Aucune collecte**: Aucune donnée personnelle n'est collectée
-            """)
-        
-        with col2:
             st.markdown("""
-            ### 🚀 Fonctionnalités
+            **🏥 SamaSanté - Équipe IA**
             
-            **📸 Analyse d'images**
-            - Support formats: PNG, JPG, JPEG, BMP
-            - Traitement en temps réel
-            - Interface responsive
+            📧 **Email**: support@samasante-ai.com  
+            📱 **Téléphone**: +221 77 000 00 00  
+            🌐 **Site web**: www.samasante-ai.com  
             
-            **📊 Résultats détaillés**
-            - Jauge de diagnostic visuelle
-            - Scores de confiance
-            - Probabilités détaillées
+            **🕒 Heures de support**
+            - Lundi - Vendredi: 9h00 - 18h00
+            - Weekend: Support d'urgence uniquement
             
-            **📄 Rapports PDF**
-            - Génération automatique
-            - Informations complètes
-            - Téléchargement sécurisé
+            **🚨 Support d'urgence**
+            - Email: urgence@samasante-ai.com
+            - Téléphone: +221 77 000 00 00
             
-            **📱 Progressive Web App**
-            - Installation sur mobile
-            - Fonctionnement hors ligne
-            - Interface native
+            **👥 Équipe de développement**
+            - Dr. Beatrice THIONE - Directrice Médicale
+            - Ursule - Lead Developer IA
+            - Salla - UX/UI Designer
+            - BeaSalla - DevOps Engineer
             
-            **🔧 Technologies**
-            - **Frontend**: Streamlit
-            - **IA**: TensorFlow/Keras
-            - **Images**: PIL/Pillow
-            - **PDF**: ReportLab
-            - **Sécurité**: Chiffrement TLS
+            **🔗 Réseaux sociaux**
+            - LinkedIn: /company/samasante-ai
+            - Twitter: @SAMASANTEAI_FR
+            - GitHub: /samasante-ai-team
             """)
-    
-    with tab4:
-        st.markdown('<div id="contact-section"></div>', unsafe_allow_html=True)
-        st.markdown("## 📞 Contact")
-        
-        col1, col2 = st.columns([1, 1])
-        
-        with col1:
-            st.markdown("### 📧 Formulaire de Contact")
-            
-            with st.form("contact_form"):
-                name = st.text_input("Nom complet *")
-                email = st.text_input("Email *")
-                subject = st.selectbox(
-                    "Sujet *",
-                    ["Question générale", "Support technique", "Signalement de bug", "Autre"]
-                )
-                message = st.text_area("Message *", height=150)
-                
-                submitted = st.form_submit_button("📤 Envoyer le message")
-                
-                if submitted:
-                    if name and email and message:
-                        # Ici, vous pourriez intégrer un service d'email ou webhook
-                        st.success("✅ Message envoyé avec succès! Nous vous répondrons dans les plus brefs délais.")
-                        st.balloons()
-                    else:
-                        st.error("❌ Veuillez remplir tous les champs obligatoires.")
-        
-        with col2:
-            with st.expander("📍 Informations de Contact", expanded=False):
-                st.markdown("### 📍 Informations de Contact")
-                
-                st.markdown("""
-                **🏥 SamaSanté - Équipe IA**
-                
-                📧 **Email**: support@samasante-ai.com  
-                📱 **Téléphone**: +221 77 000 00 00  
-                🌐 **Site web**: www.samasante-ai.com  
-                
-                **🕒 Heures de support**
-                - Lundi - Vendredi: 9h00 - 18h00
-                - Weekend: Support d'urgence uniquement
-                
-                **🚨 Support d'urgence**
-                - Email: urgence@samasante-ai.com
-                - Téléphone: +221 77 000 00 00
-                
-                **👥 Équipe de développement**
-                - Dr. Beatrice THIONE - Directrice Médicale
-                - Ursule - Lead Developer IA
-                - Salla - UX/UI Designer
-                - BeaSalla - DevOps Engineer
-                
-                **🔗 Réseaux sociaux**
-                - LinkedIn: /company/samasante-ai
-                - Twitter: @SAMASANTEAI_FR
-                - GitHub: /samasante-ai-team
-                """)
-            
-            # Carte de contact stylisée
-            st.markdown("""
-            <div class="feature-card" style="text-align: center; margin-top: 2rem;">
-                <h4 style="color: var(--primary-blue); margin-bottom: 1rem;">🤝 Collaboration</h4>
-                <p>Intéressé par une collaboration ou un partenariat?</p>
-                <a href="mailto:partenariat@samasante-ai.com" class="custom-button">
-                    📧 Contactez-nous
-                </a>
-            </div>
-            """, unsafe_allow_html=True)
         
+        # Carte de contact stylisée
+        st.markdown("""
+        <div class="feature-card" style="text-align: center; margin-top: 2rem;">
+            <h4 style="color: var(--primary-blue); margin-bottom: 1rem;">🤝 Collaboration</h4>
+            <p>Intéressé par une collaboration ou un partenariat?</p>
+            <a href="mailto:partenariat@samasante-ai.com" class="custom-button">
+                📧 Contactez-nous
+            </a>
+        </div>
+        """, unsafe_allow_html=True)
+
+def main():
+    """Fonction principale de l'application"""
+    configure_page()
+    inject_styles()
     
-    # Nettoyage automatique à la fin
-    try:
-        file_manager.cleanup()
-    except:
-        pass
+    # Configuration PWA
+    if PWA_AVAILABLE:
+        setup_pwa()
+    
+    # Initialisation
+    storage, ai_model, inference_jobs, thumbnails = init_components()
+    display_model_status(ai_model)
+    file_manager = get_file_manager(storage)
+    
+    # Affichage de l'interface
+    display_header()
+    display_hero()
+    
+    # Navigation par onglets : chaque onglet interactif est un fragment,
+    # réexécuté seul lors de ses propres interactions
+    tab1, tab2, tab3, tab4 = st.tabs(["🔬 Analyse", "📋 Historique", "ℹ️ À propos", "📞 Contact"])
+    
+    with tab1:
+        display_analysis_tab(file_manager, ai_model, inference_jobs, thumbnails)
+    
+    with tab2:
+        display_history_tab(thumbnails)
+    
+    with tab3:
+        display_about_tab()
+    
+    with tab4:
+        display_contact_tab()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,413 @@
+"""
+Module d'audit pour l'application médicale
+Journalisation asynchrone des accès dans un fichier JSONL avec rotation
+et stockage indexé SQLite pour les requêtes de conformité
+"""
+
+import os
+import sys
+import json
+import hashlib
+import sqlite3
+import argparse
+import tempfile
+import threading
+import time
+import atexit
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+class AuditLogWriter:
+    """Écriture asynchrone du journal d'audit
+
+    Les entrées sont déposées dans un tampon circulaire de taille fixe puis
+    écrites par lots dans un fichier JSONL en ajout seul par un thread dédié,
+    et dans le stockage indexé s'il est fourni.
+    Lorsque le tampon est plein, les entrées les plus anciennes non encore
+    écrites sont écrasées et comptabilisées dans les métriques.
+    Chaque entrée reçoit un numéro de séquence qui, avec l'horodatage, la
+    session et l'action, l'identifie dans le stockage indexé.
+    """
+
+    def __init__(self, path: str = None, capacity: int = 10000,
+                 batch_size: int = 256, flush_interval: float = 1.0,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                 store: 'AuditStore' = None):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'medical_audit', 'audit.jsonl')
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.store = store
+
+        self._pending = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._flush_requested = False
+        self._thread: Optional[threading.Thread] = None
+        self._exit_registered = False
+        self._file = None
+        self._file_size = 0
+
+        # Métriques de contre-pression
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.batches = 0
+        self.rotations = 0
+        self.write_errors = 0
+        self.store_errors = 0
+        self.last_batch_seconds = 0.0
+
+    def enqueue(self, entry: Dict[str, Any]):
+        """Dépose une entrée dans le tampon (aucune E/S)"""
+        with self._cond:
+            if len(self._pending) == self.capacity:
+                self.dropped += 1
+            self.enqueued += 1
+            entry.setdefault('seq', self.enqueued)
+            self._pending.append(entry)
+            depth = len(self._pending)
+            if depth > self.max_depth:
+                self.max_depth = depth
+            if depth >= self.batch_size:
+                self._cond.notify()
+
+        if self._thread is None:
+            self.start()
+
+    def start(self):
+        """Démarre le thread d'écriture"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name='audit-writer', daemon=True
+            )
+            self._thread.start()
+            register_exit = not self._exit_registered
+            self._exit_registered = True
+        if register_exit:
+            atexit.register(self.close)
+
+    def close(self):
+        """Vide le tampon et arrête le thread d'écriture"""
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout=10)
+        with self._cond:
+            self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attend que toutes les entrées déposées soient écrites"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify()
+        while time.monotonic() < deadline:
+            with self._cond:
+                if self.written + self.dropped + self.write_errors >= self.enqueued:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Attendre un lot complet, l'intervalle d'écriture ou un flush
+                self._cond.wait_for(
+                    lambda: (self._stopping or self._flush_requested
+                             or len(self._pending) >= self.batch_size),
+                    timeout=self.flush_interval
+                )
+                if not self._pending:
+                    self._flush_requested = False
+                    if self._stopping:
+                        return
+                    continue
+                batch = [self._pending.popleft()
+                         for _ in range(min(self.batch_size, len(self._pending)))]
+                if not self._pending:
+                    self._flush_requested = False
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        """Écrit un lot d'entrées dans le fichier JSONL"""
+        start = time.perf_counter()
+        try:
+            data = ''.join(
+                json.dumps(entry, default=str, ensure_ascii=False) + '\n'
+                for entry in batch
+            ).encode('utf-8')
+
+            if self._file is None:
+                self._open()
+            if self._file_size and self._file_size + len(data) > self.max_bytes:
+                self._rotate()
+
+            self._file.write(data)
+            self._file.flush()
+            self._file_size += len(data)
+
+            if self.store is not None:
+                try:
+                    self.store.insert_many(batch)
+                except Exception as e:
+                    logger.error(f"Audit store error: {e}")
+                    self.store_errors += len(batch)
+
+            for entry in batch:
+                logger.debug(f"Security log: {entry.get('action')}")
+
+            with self._cond:
+                self.written += len(batch)
+                self.batches += 1
+        except Exception as e:
+            logger.error(f"Audit write error: {e}")
+            with self._cond:
+                self.write_errors += len(batch)
+        finally:
+            self.last_batch_seconds = time.perf_counter() - start
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        self._file_size = self._file.tell()
+
+    def _rotate(self):
+        """Rotation par taille : audit.jsonl -> audit.jsonl.1 -> ..."""
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+        self._open()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métriques de débit et de contre-pression"""
+        with self._cond:
+            return {
+                'capacity': self.capacity,
+                'depth': len(self._pending),
+                'max_depth': self.max_depth,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'write_errors': self.write_errors,
+                'store_errors': self.store_errors,
+                'batches': self.batches,
+                'rotations': self.rotations,
+                'last_batch_seconds': self.last_batch_seconds
+            }
+
+class AuditStore:
+    """Stockage indexé des entrées d'audit (SQLite embarqué)
+
+    Les index composites (session_id, ts) et (action, ts) permettent de
+    répondre aux requêtes « session X entre 10h et 11h » par un simple
+    parcours de plage d'index, quel que soit le volume du journal.
+    Une clé unique par entrée (horodatage, session, action, séquence) rend
+    l'insertion idempotente : réimporter un fichier JSONL déjà reçu du
+    journal n'ajoute aucune ligne.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS audit_log (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            timestamp TEXT NOT NULL,
+            action TEXT NOT NULL,
+            session_id TEXT,
+            details TEXT,
+            entry_key TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit_log (ts);
+        CREATE INDEX IF NOT EXISTS idx_audit_action_ts ON audit_log (action, ts);
+        CREATE INDEX IF NOT EXISTS idx_audit_session_ts ON audit_log (session_id, ts);
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'medical_audit', 'audit.db')
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), mode=0o700, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(audit_log)')}
+        if 'entry_key' not in columns:
+            # Base créée avant la clé unique : les lignes existantes restent sans clé
+            self._conn.execute('ALTER TABLE audit_log ADD COLUMN entry_key TEXT')
+        self._conn.execute(
+            'CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_entry_key ON audit_log (entry_key)'
+        )
+
+    @staticmethod
+    def _entry_key(entry: Dict[str, Any], details: str) -> str:
+        """Identifiant d'une entrée ; sans numéro de séquence, empreinte des détails"""
+        seq = entry.get('seq')
+        if seq is None:
+            seq = hashlib.sha256(details.encode('utf-8')).hexdigest()[:16]
+        return f"{entry['timestamp']}|{entry.get('session_id') or ''}|{entry['action']}|{seq}"
+
+    @staticmethod
+    def _to_epoch(value: Union[datetime, str, float, None]) -> Optional[float]:
+        """Convertit une date (datetime, ISO 8601 ou epoch) en secondes epoch"""
+        if value is None:
+            return None
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value.timestamp()
+
+    def insert_many(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Insère un lot d'entrées dans une seule transaction
+
+        Les entrées déjà présentes sont ignorées ; retourne le nombre de
+        lignes ajoutées.
+        """
+        rows = []
+        for entry in entries:
+            details = json.dumps(entry.get('details') or {}, default=str, ensure_ascii=False)
+            rows.append((
+                self._to_epoch(entry['timestamp']),
+                entry['timestamp'],
+                entry['action'],
+                entry.get('session_id'),
+                details,
+                self._entry_key(entry, details)
+            ))
+        with self._lock, self._conn:
+            inserted = self._conn.executemany(
+                'INSERT OR IGNORE INTO audit_log (ts, timestamp, action, session_id, details, entry_key) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            ).rowcount
+        return inserted
+
+    def query(self, session_id: str = None, action: str = None,
+              start: Union[datetime, str, float] = None,
+              end: Union[datetime, str, float] = None,
+              limit: int = 1000) -> List[Dict[str, Any]]:
+        """Entrées filtrées par session, action et plage horaire [start, end)"""
+        clauses, params = [], []
+        if session_id is not None:
+            clauses.append('session_id = ?')
+            params.append(session_id)
+        if action is not None:
+            clauses.append('action = ?')
+            params.append(action)
+        if start is not None:
+            clauses.append('ts >= ?')
+            params.append(self._to_epoch(start))
+        if end is not None:
+            clauses.append('ts < ?')
+            params.append(self._to_epoch(end))
+
+        sql = 'SELECT timestamp, action, session_id, details FROM audit_log'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY ts LIMIT ?'
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                'timestamp': timestamp,
+                'action': action_name,
+                'session_id': sid,
+                'details': json.loads(details) if details else {}
+            }
+            for timestamp, action_name, sid, details in rows
+        ]
+
+    def import_jsonl(self, path: str, batch_size: int = 10000) -> int:
+        """Importe un fichier JSONL produit par AuditLogWriter (entrées absentes uniquement)"""
+        total = 0
+        batch = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    total += self.insert_many(batch)
+                    batch = []
+        if batch:
+            total += self.insert_many(batch)
+        return total
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_default_writer: Optional[AuditLogWriter] = None
+_default_writer_lock = threading.Lock()
+
+def get_audit_writer() -> AuditLogWriter:
+    """Retourne l'écrivain d'audit partagé par le processus"""
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = AuditLogWriter(
+                path=os.environ.get('MEDICAL_AUDIT_LOG'),
+                store=AuditStore(os.environ.get('MEDICAL_AUDIT_DB'))
+            )
+        return _default_writer
+
+def main(argv: List[str] = None) -> int:
+    """Interface en ligne de commande du journal d'audit"""
+    parser = argparse.ArgumentParser(description="Consultation du journal d'audit")
+    parser.add_argument('--db', default=os.environ.get('MEDICAL_AUDIT_DB'),
+                        help="Base SQLite d'audit")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query_parser = commands.add_parser('query', help='Rechercher des entrées')
+    query_parser.add_argument('--session', help='Identifiant de session')
+    query_parser.add_argument('--action', help="Type d'action")
+    query_parser.add_argument('--start', help='Début (ISO 8601, inclus)')
+    query_parser.add_argument('--end', help='Fin (ISO 8601, exclue)')
+    query_parser.add_argument('--limit', type=int, default=1000)
+
+    import_parser = commands.add_parser('import', help='Importer des fichiers JSONL')
+    import_parser.add_argument('files', nargs='+')
+
+    args = parser.parse_args(argv)
+    store = AuditStore(args.db)
+    start = time.perf_counter()
+
+    if args.command == 'query':
+        results = store.query(session_id=args.session, action=args.action,
+                              start=args.start, end=args.end, limit=args.limit)
+        for entry in results:
+            print(json.dumps(entry, ensure_ascii=False))
+        count = len(results)
+    else:
+        count = sum(store.import_jsonl(path) for path in args.files)
+
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{count} entrées en {elapsed:.1f} ms", file=sys.stderr)
+    store.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
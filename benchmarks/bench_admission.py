@@ -0,0 +1,114 @@
+"""
+Benchmark du contrôle d'admission en surcharge
+Des clients simultanés soumettent des analyses à un modèle simulé dont la
+durée d'inférence augmente avec le nombre d'inférences concurrentes
+Usage : python benchmarks/bench_admission.py [clients] [demandes_par_client]
+"""
+
+import io
+import os
+import sys
+import time
+import logging
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from admission import AdmissionController, AdmissionRejected
+from inference_jobs import InferenceJobManager
+
+class ContendedModel:
+    """Modèle simulé : chaque inférence concurrente ralentit les autres"""
+
+    classes = ["Normal", "Précancéreux", "Cancéreux"]
+    version = 'simulé'
+
+    def __init__(self, service_seconds: float = 0.05):
+        self.service_seconds = service_seconds
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def predict(self, image):
+        with self._lock:
+            self._active += 1
+            active = self._active
+        try:
+            time.sleep(self.service_seconds * active)
+        finally:
+            with self._lock:
+                self._active -= 1
+        return [0.6, 0.3, 0.1], self.classes
+
+    def predict_versioned(self, image, with_features: bool = False):
+        probabilities, classes = self.predict(image)
+        return probabilities, classes, None, self.version
+
+def image_bytes(index: int) -> bytes:
+    """Image distincte par demande (pas de réutilisation par contenu)"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), (index % 256, index // 256 % 256, 0)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    if not latencies:
+        return "aucune"
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+    return (f"p50 {pick(0.5) * 1000:7.0f} ms  p95 {pick(0.95) * 1000:7.0f} ms  "
+            f"p99 {pick(0.99) * 1000:7.0f} ms  max {latencies[-1] * 1000:7.0f} ms")
+
+def run_clients(clients: int, requests: int, analyze):
+    """Lance les clients et collecte latences et refus"""
+    latencies, rejected = [], [0]
+    lock = threading.Lock()
+
+    def client(client_id: int):
+        for i in range(requests):
+            data = image_bytes(client_id * requests + i)
+            start = time.perf_counter()
+            try:
+                analyze(data, f"client-{client_id}")
+            except AdmissionRejected:
+                with lock:
+                    rejected[0] += 1
+                time.sleep(0.05)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, rejected[0], time.perf_counter() - start
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    logging.getLogger('admission').setLevel(logging.ERROR)
+
+    model = ContendedModel()
+    latencies, _, elapsed = run_clients(clients, requests, lambda data, owner: model.predict(
+        Image.open(io.BytesIO(data))))
+    print(f"{'sans admission':<16} {percentiles(latencies)}  "
+          f"refus {0:4d}  {len(latencies) / elapsed:6.1f} analyses/s")
+
+    admission = AdmissionController(max_concurrency=2, max_queue=16)
+    manager = InferenceJobManager(ContendedModel(), admission=admission)
+    latencies, rejected, elapsed = run_clients(
+        clients, requests, lambda data, owner: manager.submit(data, owner).result())
+    print(f"{'avec admission':<16} {percentiles(latencies)}  "
+          f"refus {rejected:4d}  {len(latencies) / elapsed:6.1f} analyses/s")
+
+    metrics = admission.metrics()
+    print(f"file : pic {metrics['peak_queue_depth']}/{metrics['max_queue']}, "
+          f"attente p50 {metrics['wait_p50'] * 1000:.0f} ms, p95 {metrics['wait_p95'] * 1000:.0f} ms")
+    manager.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
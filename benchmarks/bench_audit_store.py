@@ -0,0 +1,64 @@
+"""
+Benchmark du stockage d'audit indexé sur un million d'entrées synthétiques
+Usage : python benchmarks/bench_audit_store.py [nombre_d_entrées]
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit import AuditStore
+
+ACTIONS = ['file_validated', 'file_saved', 'file_loaded', 'session_created',
+           'session_cleaned', 'temp_dir_cleaned', 'file_rejected_size']
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    store = AuditStore(os.path.join(tempfile.mkdtemp(), 'audit.db'))
+
+    sessions = [f"{random.getrandbits(64):016x}" for _ in range(5000)]
+    origin = datetime(2024, 1, 1)
+    batch_size = 10_000
+
+    start = time.perf_counter()
+    for offset in range(0, count, batch_size):
+        store.insert_many(
+            {
+                'timestamp': (origin + timedelta(seconds=(offset + i) * 0.5)).isoformat(),
+                'action': random.choice(ACTIONS),
+                'session_id': random.choice(sessions),
+                'details': {'size': random.randint(1, 10_000_000)}
+            }
+            for i in range(min(batch_size, count - offset))
+        )
+    elapsed = time.perf_counter() - start
+    print(f"insertion : {count:,} entrées en {elapsed:.1f} s ({count / elapsed:,.0f}/s)")
+
+    span = count * 0.5
+    queries = {
+        'session + 1h': lambda at: dict(session_id=random.choice(sessions),
+                                         start=at, end=at + timedelta(hours=1)),
+        'action + 1h': lambda at: dict(action=random.choice(ACTIONS),
+                                        start=at, end=at + timedelta(hours=1)),
+        'plage 10 min': lambda at: dict(start=at, end=at + timedelta(minutes=10)),
+        'session complète': lambda at: dict(session_id=random.choice(sessions)),
+    }
+    for label, build in queries.items():
+        timings = []
+        for _ in range(50):
+            at = origin + timedelta(seconds=random.uniform(0, span))
+            t0 = time.perf_counter()
+            store.query(**build(at))
+            timings.append((time.perf_counter() - t0) * 1000)
+        timings.sort()
+        print(f"{label:<18} médiane {timings[len(timings) // 2]:6.2f} ms   p95 {timings[int(len(timings) * 0.95)]:6.2f} ms")
+
+    store.close()
+
+if __name__ == "__main__":
+    main()
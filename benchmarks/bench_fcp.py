@@ -0,0 +1,190 @@
+"""
+Benchmark du premier affichage de l'application dans un navigateur
+Mesure le first contentful paint et le temps jusqu'à l'affichage de la
+section hero stylée, au premier chargement (cache vide) puis au chargement
+suivant, sur une connexion lente simulée
+Nécessite playwright (pip install playwright && playwright install chromium),
+ou un navigateur Chromium déjà lancé avec --remote-debugging-port, piloté par
+le protocole DevTools : MEDICAL_BENCH_CDP_URL=http://127.0.0.1:9222
+Usage : python benchmarks/bench_fcp.py [chargements] [script]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import statistics
+import subprocess
+import urllib.request
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Navigateur piloté directement par le protocole DevTools (sans playwright)
+CDP_URL = os.environ.get('MEDICAL_BENCH_CDP_URL')
+
+if not CDP_URL:
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        sys.exit("playwright requis : pip install playwright && playwright install chromium")
+
+# Connexion mobile lente (débits en octets/s, latence en ms)
+SLOW_NETWORK = {'offline': False, 'latency': 150,
+                'downloadThroughput': 1.6 * 1024 * 1024 / 8,
+                'uploadThroughput': 750 * 1024 / 8}
+
+# Section hero affichée avec ses styles (feuille critique appliquée)
+HERO_STYLED = """() => {
+    const hero = document.querySelector('.hero-section');
+    return hero !== null && getComputedStyle(hero).display === 'grid';
+}"""
+
+FCP = """() => {
+    const entry = performance.getEntriesByName('first-contentful-paint')[0];
+    return entry ? entry.startTime : null;
+}"""
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(script: str, port: int) -> subprocess.Popen:
+    """Lance Streamlit et attend qu'il réponde"""
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', script, '--server.port', str(port),
+         '--server.headless', 'true'],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.5)
+    server.kill()
+    raise RuntimeError("Le serveur Streamlit n'a pas démarré")
+
+class DevToolsPage:
+    """Onglet d'un navigateur Chromium piloté par le protocole DevTools
+
+    Même interface que la page de playwright pour load() ; le cache et les
+    données du site sont effacés avant chaque premier chargement.
+    """
+
+    def __init__(self, socket):
+        self._socket = socket
+        self._id = 0
+        self._events = []
+        self.send('Page.enable')
+        self.send('Network.enable')
+
+    def _receive(self) -> dict:
+        message = json.loads(self._socket.recv())
+        if 'method' in message:
+            self._events.append(message['method'])
+        return message
+
+    def send(self, method: str, **params):
+        self._id += 1
+        self._socket.send(json.dumps({'id': self._id, 'method': method, 'params': params}))
+        while True:
+            message = self._receive()
+            if message.get('id') == self._id:
+                if 'error' in message:
+                    raise RuntimeError(f"{method}: {message['error']}")
+                return message['result']
+
+    def reset(self, url: str):
+        """Équivalent d'un nouveau contexte : cache, cookies, stockage et service worker effacés"""
+        origin = '{0.scheme}://{0.netloc}'.format(urlsplit(url))
+        self.goto('about:blank')
+        self.send('Network.clearBrowserCache')
+        self.send('Network.clearBrowserCookies')
+        self.send('Storage.clearDataForOrigin', origin=origin, storageTypes='all')
+
+    def goto(self, url: str):
+        """Navigue et attend l'évènement load du nouveau document (comme playwright)"""
+        self._events.clear()
+        self.send('Page.navigate', url=url)
+        while 'Page.loadEventFired' not in self._events:
+            self._receive()
+
+    def evaluate(self, expression: str):
+        result = self.send('Runtime.evaluate', expression=f'({expression})()', returnByValue=True)
+        return result['result'].get('value')
+
+    def wait_for_function(self, expression: str, timeout: float):
+        deadline = time.monotonic() + timeout / 1000
+        while not self.evaluate(expression):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"wait_for_function: {timeout} ms")
+            time.sleep(0.02)
+
+def load(page, url: str):
+    """Charge la page ; retourne (FCP, hero stylé) en millisecondes"""
+    start = time.perf_counter()
+    page.goto(url)
+    page.wait_for_function(HERO_STYLED, timeout=60000)
+    hero = (time.perf_counter() - start) * 1000
+    return page.evaluate(FCP), hero
+
+def summary(label: str, samples):
+    fcp = [s[0] for s in samples if s[0] is not None]
+    hero = [s[1] for s in samples]
+    print(f"{label:<22} FCP {statistics.median(fcp) if fcp else float('nan'):8.0f} ms   "
+          f"hero stylé {statistics.median(hero):8.0f} ms")
+
+def measure_playwright(url: str, loads: int):
+    """Chargements dans un nouveau contexte de navigateur (cache vide) puis suivants"""
+    cold, warm = [], []
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch()
+        for _ in range(loads):
+            context = browser.new_context()
+            page = context.new_page()
+            cdp = context.new_cdp_session(page)
+            cdp.send('Network.enable')
+            cdp.send('Network.emulateNetworkConditions', SLOW_NETWORK)
+            cold.append(load(page, url))
+            warm.append(load(page, url))
+            context.close()
+        browser.close()
+    return cold, warm
+
+def measure_devtools(url: str, loads: int):
+    """Mêmes mesures dans le navigateur de MEDICAL_BENCH_CDP_URL"""
+    from websockets.sync.client import connect
+    targets = json.load(urllib.request.urlopen(f'{CDP_URL}/json/list', timeout=10))
+    target = next(target for target in targets if target['type'] == 'page')
+    cold, warm = [], []
+    with connect(target['webSocketDebuggerUrl'], max_size=None) as socket:
+        page = DevToolsPage(socket)
+        page.send('Network.emulateNetworkConditions', **SLOW_NETWORK)
+        for _ in range(loads):
+            page.reset(url)
+            cold.append(load(page, url))
+            warm.append(load(page, url))
+    return cold, warm
+
+def main():
+    loads = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    script = sys.argv[2] if len(sys.argv) > 2 else 'app.py'
+    port = free_port()
+    url = f'http://127.0.0.1:{port}/'
+    server = start_server(script, port)
+    try:
+        cold, warm = measure_devtools(url, loads) if CDP_URL else measure_playwright(url, loads)
+    finally:
+        server.terminate()
+        server.wait()
+
+    summary('premier chargement', cold)
+    summary('chargement suivant', warm)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Benchmark du démarrage du modèle : archive .keras contre format rapide
+Chaque mesure est faite dans un nouveau processus : temps de construction de
+MedicalAIModel (chargement et préchauffage) et mémoire résidente ajoutée
+Usage : python benchmarks/bench_model_load.py [modele.keras] [répétitions]
+"""
+
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Exécuté dans le processus mesuré, après l'import de TensorFlow
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+import tensorflow
+from medical_ai import MedicalAIModel
+
+def memory():
+    with open('/proc/self/status') as f:
+        fields = dict(line.split(':', 1) for line in f)
+    return {{key: int(fields[key].split()[0]) / 1024 for key in ('VmRSS', 'RssAnon', 'RssFile')}}
+
+before = memory()
+start = time.perf_counter()
+model = MedicalAIModel({path!r})
+elapsed = time.perf_counter() - start
+after = memory()
+print(json.dumps({{'status': model.status, 'seconds': elapsed,
+                  'rss': after['VmRSS'] - before['VmRSS'],
+                  'anon': after['RssAnon'] - before['RssAnon']}}))
+"""
+
+def measure(path: str, fast: bool) -> dict:
+    env = dict(os.environ, MEDICAL_MODEL_FAST_LOAD='1' if fast else '0', TF_CPP_MIN_LOG_LEVEL='3')
+    output = subprocess.run([sys.executable, '-c', CHILD.format(root=ROOT, path=path)],
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def summary(label: str, samples):
+    print(f"{label:<14} démarrage {statistics.median(s['seconds'] for s in samples):6.2f} s   "
+          f"RSS +{statistics.median(s['rss'] for s in samples):7.0f} Mo   "
+          f"dont anonyme +{statistics.median(s['anon'] for s in samples):7.0f} Mo")
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "R50_Herlev_7class.keras")
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    if not os.path.exists(path):
+        sys.exit(f"Modèle introuvable : {path}")
+
+    from model_format import convert_model, is_fast_model_current
+    if not is_fast_model_current(path):
+        convert_model(path)
+
+    for label, fast in (("archive .keras", False), ("format rapide", True)):
+        samples = [measure(path, fast) for _ in range(runs)]
+        if samples[0]['status'] != 'loaded':
+            sys.exit(f"Chargement impossible ({samples[0]['status']})")
+        summary(label, samples)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Benchmark du coût d'une réexécution Streamlit de app.py
+Mesure la durée et le volume des messages envoyés au navigateur, pour une
+réexécution complète puis pour la réexécution isolée de chaque fragment,
+sans puis avec une image analysée à l'écran
+Usage : python benchmarks/bench_rerun.py [nombre_de_reexecutions]
+"""
+
+import io
+import os
+import sys
+import time
+import dataclasses
+import statistics
+from collections import Counter
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# AppTest ne sait pas piloter le composant de chargement du navigateur
+os.environ.setdefault('MEDICAL_CLIENT_DOWNSCALE', '0')
+
+from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+from streamlit.runtime.scriptrunner.script_runner import ScriptRunner
+from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequests
+from streamlit.testing.v1 import AppTest
+
+_sent = []
+_fragment_ids = []
+_script_seconds = []
+
+_enqueue = ForwardMsgQueue.enqueue
+_request_rerun = ScriptRequests.request_rerun
+_run_script = ScriptRunner._run_script
+
+def _timed_run_script(self, rerun_data):
+    """Mesure l'exécution du script seule, hors surcoût d'AppTest"""
+    start = time.perf_counter()
+    try:
+        return _run_script(self, rerun_data)
+    finally:
+        _script_seconds.append(time.perf_counter() - start)
+
+def _recording_enqueue(self, msg):
+    """Capture chaque message envoyé au navigateur"""
+    _sent.append(msg)
+    return _enqueue(self, msg)
+
+def _scoped_request_rerun(self, rerun_data):
+    """Restreint la réexécution aux fragments demandés (AppTest exécute tout le script)"""
+    if _fragment_ids:
+        rerun_data = dataclasses.replace(rerun_data, fragment_id_queue=list(_fragment_ids),
+                                         is_fragment_scoped_rerun=True)
+    return _request_rerun(self, rerun_data)
+
+ForwardMsgQueue.enqueue = _recording_enqueue
+ScriptRequests.request_rerun = _scoped_request_rerun
+ScriptRunner._run_script = _timed_run_script
+
+def payload() -> Counter:
+    """Octets envoyés par type d'élément lors de la dernière exécution"""
+    sizes = Counter()
+    for msg in _sent:
+        if msg.WhichOneof('type') != 'delta':
+            continue
+        delta = msg.delta
+        kind = delta.WhichOneof('type')
+        if kind == 'new_element':
+            kind = delta.new_element.WhichOneof('type')
+        sizes[kind] += msg.ByteSize()
+    return sizes
+
+def fragments(at: AppTest) -> dict:
+    """Fragments enregistrés par app.py : nom de la fonction -> identifiant"""
+    found = {}
+    for fragment_id, wrapped in at._fragment_storage._fragments.items():
+        for cell in wrapped.__closure__ or ():
+            func = cell.cell_contents
+            if callable(func) and getattr(func, '__module__', None) == '__main__':
+                found[func.__name__] = fragment_id
+    return found
+
+def measure(at: AppTest, label: str, runs: int):
+    """Réexécute l'application et affiche durée et volume envoyé"""
+    durations = []
+    _script_seconds.clear()
+    for _ in range(runs):
+        _sent.clear()
+        start = time.perf_counter()
+        at.run()
+        durations.append(time.perf_counter() - start)
+    sizes = payload()
+    print(f"{label:<28} {statistics.median(durations) * 1000:8.1f} ms "
+          f"{statistics.median(_script_seconds) * 1000:8.1f} ms "
+          f"{sum(sizes.values()):10,d} octets")
+    return sizes
+
+def scenario(at: AppTest, runs: int):
+    """Réexécution complète puis réexécution de chaque fragment seul"""
+    sizes = measure(at, 'réexécution complète', runs)
+    for kind, size in sizes.most_common(5):
+        print(f"  {kind:<26} {size:38,d}")
+
+    for name, fragment_id in sorted(fragments(at).items()):
+        _fragment_ids[:] = [fragment_id]
+        measure(at, f"fragment {name}", runs)
+    # AppTest ne conserve que les éléments de la dernière exécution
+    _fragment_ids.clear()
+    at.run()
+
+def wait_for_analysis(at: AppTest, timeout: float = 120.0) -> bool:
+    """Réexécute l'application jusqu'à l'affichage du résultat de l'analyse"""
+    deadline = time.monotonic() + timeout
+    while 'analysis_result' not in at.session_state:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.2)
+        at.run()
+    return True
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=120)
+    start = time.perf_counter()
+    at.run()
+    print(f"{'première exécution':<28} {(time.perf_counter() - start) * 1000:8.1f} ms")
+    if at.exception:
+        print([e.value for e in at.exception])
+        return 1
+
+    print(f"{'médianes':<28} {'total':>11} {'script':>11} {'envoyés':>17}")
+    scenario(at, runs)
+
+    # Même mesure avec une image chargée et son résultat affiché
+    buffer = io.BytesIO()
+    Image.new('RGB', (1024, 1024), 'pink').save(buffer, 'PNG')
+    at.file_uploader[0].set_value(('bench.png', buffer.getvalue(), 'image/png')).run()
+    at.button[0].click().run()
+    # L'analyse est une tâche d'arrière-plan : mesurer le résultat affiché, pas l'attente
+    if not wait_for_analysis(at):
+        print("Analyse non terminée")
+        return 1
+    print("avec une image analysée")
+    scenario(at, runs)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
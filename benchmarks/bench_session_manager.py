@@ -0,0 +1,48 @@
+"""
+Benchmark du SessionManager sur 100 000 sessions synthétiques
+Usage : python benchmarks/bench_session_manager.py [nombre_de_sessions]
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from security import SecurityManager, SessionManager
+
+def timed(label: str, func, count: int):
+    """Exécute func et affiche le débit obtenu"""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed * 1000:10.1f} ms  {count / elapsed:12,.0f} ops/s")
+    return result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    logging.getLogger('security').setLevel(logging.WARNING)
+
+    security = SecurityManager()
+    manager = SessionManager(security, session_timeout=timedelta(seconds=2),
+                             max_sessions=count)
+
+    session_ids = timed("create_session", lambda: [manager.create_session() for _ in range(count)], count)
+
+    lookups = random.choices(session_ids, k=count)
+    timed("get_session (hit)", lambda: [manager.get_session(sid) for sid in lookups], count)
+
+    timed("cleanup_expired (none expired)", manager.cleanup_expired_sessions, 1)
+
+    # Capacité atteinte : chaque création évince la session la plus ancienne
+    timed("create_session (eviction)", lambda: [manager.create_session() for _ in range(count // 10)], count // 10)
+
+    time.sleep(2.1)
+    expired = timed("cleanup_expired (all expired)", manager.cleanup_expired_sessions, count)
+    print(f"{expired:,} sessions expirées, {len(manager.sessions):,} restantes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Interface en ligne de commande pour l'analyse d'images par lot
+Parcourt un répertoire, analyse les images et écrit les résultats en JSONL ou CSV
+
+Usage : python cli.py DOSSIER -o resultats.jsonl [--batch-size 32] [--workers 4]
+Sans modèle chargé, l'analyse est refusée sauf avec --demo (résultats aléatoires)
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import logging
+from typing import Dict, Iterable, Iterator, List, Set
+
+from medical_ai import MedicalAIModel
+from pipeline import InferencePipeline, PipelineError
+from session_storage import SecureFileManager
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = ['path', 'status', 'diagnosis', 'confidence',
+                 'normal', 'precancerous', 'cancerous', 'error']
+
+_validator = SecureFileManager()
+
+def read_image_file(path: str) -> bytes:
+    """Valide puis lit un fichier image"""
+    is_valid, message = _validator.validate_bytes(path, os.path.getsize(path))
+    if not is_valid:
+        raise PipelineError(message)
+    with open(path, 'rb') as f:
+        return f.read()
+
+def iter_image_paths(root: str, extensions: Iterable[str]) -> Iterator[str]:
+    """Parcourt l'arborescence dans un ordre stable"""
+    extensions = set(extensions)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in extensions:
+                yield os.path.join(dirpath, filename)
+
+class ResultWriter:
+    """Écriture en flux des résultats avec reprise sur point de contrôle
+
+    Le fichier de sortie sert de point de contrôle : chaque lot est écrit
+    puis synchronisé sur disque, et une reprise ignore les images déjà
+    analysées avec succès. Les images en erreur (lecture, lot) sont
+    retentées ; leur nouvelle ligne est ajoutée au fichier et, pour un même
+    chemin, c'est la dernière ligne qui fait foi.
+    """
+
+    def __init__(self, path: str, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self._file = None
+        self._csv = None
+
+    def results(self) -> Dict[str, dict]:
+        """Dernière ligne de chaque chemin dans le fichier existant"""
+        if not os.path.exists(self.path):
+            return {}
+
+        self._truncate_partial_line()
+        latest = {}
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            if self.fmt == 'csv':
+                for row in csv.DictReader(f):
+                    if row.get('status'):
+                        latest[row['path']] = row
+            else:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                        latest[row['path']] = row
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        return latest
+
+    def completed(self) -> Set[str]:
+        """Chemins analysés avec succès lors d'une exécution précédente"""
+        return {path for path, row in self.results().items() if row.get('status') == 'ok'}
+
+    def _truncate_partial_line(self):
+        """Supprime une dernière ligne incomplète (interruption pendant l'écriture)"""
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def open(self):
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', encoding='utf-8', newline='')
+        if self.fmt == 'csv':
+            self._csv = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+            if is_new:
+                self._csv.writeheader()
+
+    def write(self, rows: List[dict]):
+        """Écrit un lot de résultats et le rend durable"""
+        for row in rows:
+            if self._csv is not None:
+                self._csv.writerow(row)
+            else:
+                self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def result_row(path: str, result: dict) -> dict:
+    """Ligne de sortie pour un résultat du pipeline"""
+    if result['error']:
+        return error_row(path, result['error'])
+    probs = result['probabilities']
+    return {
+        'path': path,
+        'status': 'ok',
+        'diagnosis': result['diagnosis'],
+        'confidence': round(result['confidence'], 2),
+        'normal': round(probs[0], 4),
+        'precancerous': round(probs[1], 4),
+        'cancerous': round(probs[2], 4),
+        'error': None
+    }
+
+def error_row(path: str, error: str) -> dict:
+    row = dict.fromkeys(RESULT_FIELDS)
+    row.update(path=path, status='error', error=error)
+    return row
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyse par lot d'images cytologiques")
+    parser.add_argument('directory', help="Dossier contenant les images (parcours récursif)")
+    parser.add_argument('-o', '--output', default='resultats.jsonl', help="Fichier de résultats")
+    parser.add_argument('--format', choices=['jsonl', 'csv'],
+                        help="Format de sortie (déduit de l'extension par défaut)")
+    parser.add_argument('--model', default="R50_Herlev_7class.keras", help="Chemin du modèle")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--read-workers', type=int, default=2, help="Threads de lecture")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Workers de décodage")
+    parser.add_argument('--preprocess-workers', type=int, default=2,
+                        help="Threads de prétraitement")
+    parser.add_argument('--processes', action=argparse.BooleanOptionalAction, default=True,
+                        help="Décoder dans des processus (--no-processes : threads)")
+    parser.add_argument('--demo', action='store_true',
+                        help="Accepter le mode démonstration (prédictions aléatoires) sans modèle")
+    parser.add_argument('--no-resume', action='store_true',
+                        help="Ignorer les résultats existants et recommencer")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    fmt = args.format or ('csv' if args.output.lower().endswith('.csv') else 'jsonl')
+
+    if args.no_resume and os.path.exists(args.output):
+        os.remove(args.output)
+
+    writer = ResultWriter(args.output, fmt)
+    done = writer.completed()
+    paths = [
+        path for path in iter_image_paths(args.directory, _validator.allowed_extensions)
+        if os.path.relpath(path, args.directory) not in done
+    ]
+    logger.info(f"{len(paths)} images à traiter ({len(done)} déjà traitées)")
+
+    model = MedicalAIModel(args.model)
+    logger.info(model.status_message)
+    if model.status != 'loaded' and not (args.demo and model.status == 'demo'):
+        logger.error("Aucun modèle chargé : analyse interrompue (--demo pour le mode démonstration)")
+        return 2
+
+    pipeline = InferencePipeline(
+        model,
+        batch_size=args.batch_size,
+        read_workers=args.read_workers,
+        decode_workers=args.workers,
+        preprocess_workers=args.preprocess_workers,
+        decode_processes=args.processes,
+        reader=read_image_file
+    )
+
+    writer.open()
+    processed = 0
+    start = time.perf_counter()
+    last_report = start
+    rows: List[dict] = []
+
+    try:
+        for result in pipeline.run(paths):
+            rows.append(result_row(os.path.relpath(result['key'], args.directory), result))
+            processed += 1
+            if len(rows) >= args.batch_size:
+                writer.write(rows)
+                rows = []
+
+            now = time.perf_counter()
+            if now - last_report >= 10:
+                logger.info(f"{processed}/{len(paths)} images - "
+                            f"{processed / (now - start):.1f} images/s")
+                last_report = now
+    except KeyboardInterrupt:
+        logger.warning("Interruption : relancer la même commande pour reprendre")
+        return 130
+    finally:
+        if rows:
+            writer.write(rows)
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"{processed} images traitées en {elapsed:.1f} s "
+                f"({processed / max(elapsed, 1e-6):.1f} images/s)")
+    logger.info("Utilisation des étapes :\n" + pipeline.format_report())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
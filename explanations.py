@@ -0,0 +1,146 @@
+"""
+Module des explications visuelles (Grad-CAM)
+Les cartes de caractéristiques de la passe d'inférence sont conservées : une
+explication demandée ne réexécute que la tête de classification. Le modèle
+combiné et les explications sont calculés en arrière-plan et mis en cache
+par empreinte de contenu et version du modèle
+"""
+
+import io
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+from admission import AdmissionController
+from medical_ai import MedicalAIModel
+from thumbnails import THUMBNAIL_QUALITY
+
+logger = logging.getLogger(__name__)
+
+# Opacité maximale de la carte superposée à l'aperçu
+OVERLAY_ALPHA = 0.5
+
+def colorize(heatmap: np.ndarray) -> np.ndarray:
+    """Palette bleu → vert → rouge d'une carte dans [0, 1], en RGB uint8"""
+    x = heatmap[..., np.newaxis]
+    rgb = np.clip(1.5 - np.abs(4 * x - np.array([3.0, 2.0, 1.0])), 0, 1)
+    return (rgb * 255).astype(np.uint8)
+
+def overlay_heatmap(thumbnail: bytes, heatmap: np.ndarray,
+                    alpha: float = OVERLAY_ALPHA) -> bytes:
+    """Superpose la carte à l'aperçu JPEG ; les zones peu activées restent visibles"""
+    image = Image.open(io.BytesIO(thumbnail)).convert('RGB')
+    heat = Image.fromarray((heatmap * 255).astype(np.uint8)).resize(image.size, Image.Resampling.BILINEAR)
+    heat = np.asarray(heat, dtype=np.float32) / 255.0
+    weight = (alpha * heat)[..., np.newaxis]
+    blended = np.asarray(image, dtype=np.float32) * (1 - weight) + colorize(heat) * weight
+
+    buffer = io.BytesIO()
+    Image.fromarray(blended.astype(np.uint8)).save(buffer, 'JPEG', quality=THUMBNAIL_QUALITY,
+                                                   optimize=True, progressive=True)
+    return buffer.getvalue()
+
+class ExplanationManager:
+    """Calcul en arrière-plan et cache des cartes Grad-CAM
+
+    Les cartes de caractéristiques et les cartes Grad-CAM sont indexées par
+    (empreinte du contenu, version du modèle) dans des caches LRU bornés.
+    Sans carte de caractéristiques en cache, l'image repasse dans le modèle
+    via le contrôleur d'admission, comme une analyse spéculative.
+    """
+
+    def __init__(self, model: MedicalAIModel, admission: AdmissionController = None,
+                 max_features: int = 32, max_results: int = 64):
+        self.model = model
+        self.admission = admission or AdmissionController()
+        self.max_features = max_features
+        self.max_results = max_results
+        self._features: "OrderedDict[tuple[str, str], np.ndarray]" = OrderedDict()
+        self._results: "OrderedDict[tuple[str, str], Future]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='explanation')
+        # Version pour laquelle la construction du modèle combiné a été demandée
+        self._prepared_version: Optional[str] = None
+        self.computed = 0
+        self.full_passes = 0
+
+    @property
+    def available(self) -> bool:
+        """Explications possibles uniquement avec un modèle chargé compatible
+
+        La première consultation pour une version du modèle lance la
+        construction du modèle combiné sur le thread des explications : ni la
+        réexécution du script ni une analyse ne l'attendent.
+        """
+        if not self.model.explainable:
+            return False
+        version = self.model.version
+        with self._lock:
+            if self._prepared_version != version:
+                self._prepared_version = version
+                self._executor.submit(self.model.prepare_explainer)
+        return True
+
+    def remember(self, key: str, features: Optional[np.ndarray], version: str):
+        """Conserve la carte de caractéristiques de la passe d'inférence (version des poids utilisés)"""
+        if features is None:
+            return
+        with self._lock:
+            self._features[(key, version)] = features
+            self._features.move_to_end((key, version))
+            while len(self._features) > self.max_features:
+                self._features.popitem(last=False)
+
+    def request(self, key: str, data: bytes, diagnosis: str, thumbnail: bytes) -> Future:
+        """Explication d'une image (aperçu superposé), calculée une seule fois"""
+        cache_key = (key, self.model.version)
+        with self._lock:
+            future = self._results.get(cache_key)
+            if future is not None and not (future.done() and future.exception() is not None):
+                self._results.move_to_end(cache_key)
+                return future
+            features = self._features.get(cache_key)
+            future = self._executor.submit(self._compute, data, diagnosis, thumbnail, features)
+            self._results[cache_key] = future
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return future
+
+    def _compute(self, data: bytes, diagnosis: str, thumbnail: bytes,
+                 features: Optional[np.ndarray]) -> Dict[str, Any]:
+        if features is not None:
+            heatmap = self.model.explain(diagnosis, features=features)
+        else:
+            # Passe complète : partage la capacité du service avec les analyses
+            ticket = self.admission.enter(max_depth=self.admission.max_queue // 2)
+            self.admission.wait(ticket)
+            try:
+                heatmap = self.model.explain(diagnosis, image=Image.open(io.BytesIO(data)))
+            finally:
+                self.admission.leave(ticket)
+            self.full_passes += 1
+        self.computed += 1
+        return {'heatmap': heatmap, 'overlay': overlay_heatmap(thumbnail, heatmap),
+                'diagnosis': diagnosis}
+
+    def poll(self, key: str) -> Dict[str, Any]:
+        """État d'une explication : 'pending', 'done', 'error' ou 'unknown'"""
+        with self._lock:
+            future = self._results.get((key, self.model.version))
+        if future is None:
+            return {'status': 'unknown', 'result': None, 'error': None}
+        if not future.done():
+            return {'status': 'pending', 'result': None, 'error': None}
+        if future.exception() is not None:
+            logger.error(f"Explanation {key[:12]} failed: {future.exception()}")
+            return {'status': 'error', 'result': None,
+                    'error': "Explication indisponible pour cette image"}
+        return {'status': 'done', 'result': future.result(), 'error': None}
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,222 @@
+"""
+Module de l'historique des analyses
+Enregistrements compacts (__slots__) conservés dans une file bornée par
+session, consultés par pages avec filtres sur le diagnostic et la date, et
+agrégats de l'équipe en cours (compteurs, histogrammes, débit horaire) tenus
+à jour à chaque ajout
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximal d'analyses conservées par session (les plus anciennes sont oubliées)
+HISTORY_MAX_ENTRIES = int(os.environ.get('MEDICAL_HISTORY_MAX_ENTRIES', '500'))
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Heures locales de prise de poste : les agrégats repartent de zéro à chacune
+# (vide : aucune relève, agrégats depuis le démarrage ou la dernière remise à zéro)
+SHIFT_START_HOURS = tuple(sorted({
+    int(hour) % 24 for hour in os.environ.get('MEDICAL_SHIFT_HOURS', '7,19').split(',')
+    if hour.strip()
+}))
+
+def shift_bounds(when: float, start_hours: Tuple[int, ...]) -> Tuple[float, float]:
+    """Début et fin de l'équipe en cours à l'instant when"""
+    moment = datetime.fromtimestamp(when)
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    starts = [midnight + timedelta(days=offset, hours=hour)
+              for offset in (-1, 0, 1) for hour in start_hours]
+    start = max(start for start in starts if start <= moment)
+    end = min(start for start in starts if start > moment)
+    return start.timestamp(), end.timestamp()
+
+class HistoryRecord:
+    """Résultat d'une analyse, sans dictionnaire par instance"""
+
+    __slots__ = ('number', 'timestamp', 'diagnosis', 'confidence', 'image_name', 'thumbnail_key')
+
+    def __init__(self, number: int, timestamp: str, diagnosis: str, confidence: float,
+                 image_name: str, thumbnail_key: str = ''):
+        self.number = number
+        self.timestamp = timestamp
+        self.diagnosis = diagnosis
+        self.confidence = confidence
+        self.image_name = image_name
+        self.thumbnail_key = thumbnail_key
+
+    @property
+    def day(self) -> str:
+        """Date de l'analyse (AAAA-MM-JJ)"""
+        return self.timestamp[:10]
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class AnalysisHistory:
+    """Historique borné d'une session, du plus ancien au plus récent"""
+
+    def __init__(self, max_entries: int = HISTORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._records: "deque[HistoryRecord]" = deque(maxlen=max_entries)
+        # Numérotation continue, y compris après éviction des plus anciennes
+        self._count = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[HistoryRecord]:
+        return iter(self._records)
+
+    @property
+    def evicted(self) -> int:
+        """Nombre d'analyses oubliées faute de place"""
+        return self._count - len(self._records)
+
+    def append(self, diagnosis: str, confidence: float, image_name: str,
+               thumbnail_key: str = '', timestamp: Optional[str] = None) -> HistoryRecord:
+        """Ajoute une analyse ; la plus ancienne est oubliée si la limite est atteinte"""
+        self._count += 1
+        record = HistoryRecord(
+            self._count,
+            timestamp or datetime.now().strftime(TIMESTAMP_FORMAT),
+            diagnosis, float(confidence), image_name, thumbnail_key
+        )
+        self._records.append(record)
+        return record
+
+    def clear(self):
+        self._records.clear()
+        self._count = 0
+
+    def diagnoses(self) -> List[str]:
+        """Diagnostics présents dans l'historique"""
+        return sorted({record.diagnosis for record in self._records})
+
+    def date_range(self) -> Optional[Tuple[date, date]]:
+        """Dates de la première et de la dernière analyse conservées"""
+        if not self._records:
+            return None
+        return (date.fromisoformat(self._records[0].day),
+                date.fromisoformat(self._records[-1].day))
+
+    def query(self, diagnosis: Optional[str] = None, start: Optional[date] = None,
+              end: Optional[date] = None, page: int = 1,
+              page_size: int = 10) -> Tuple[List[HistoryRecord], int]:
+        """Page d'analyses filtrées, de la plus récente à la plus ancienne
+
+        Retourne les enregistrements de la page et le nombre total d'analyses
+        correspondant aux filtres
+        """
+        start_day = start.isoformat() if start else None
+        end_day = end.isoformat() if end else None
+        first = (max(page, 1) - 1) * page_size
+        matches = []
+        total = 0
+        for record in reversed(self._records):
+            if diagnosis is not None and record.diagnosis != diagnosis:
+                continue
+            if start_day is not None and record.day < start_day:
+                continue
+            if end_day is not None and record.day > end_day:
+                continue
+            if first <= total < first + page_size:
+                matches.append(record)
+            total += 1
+        return matches, total
+
+class HistoryAggregates:
+    """Agrégats des analyses de l'équipe en cours, mis à jour à chaque ajout
+
+    Compteurs et sommes par diagnostic, histogramme de confiance à classes
+    fixes et compteurs horaires sur une fenêtre glissante circulaire : la
+    taille ne dépend pas du nombre d'analyses et la lecture est en O(1).
+    Les agrégats repartent de zéro à la prise de poste suivante
+    (shift_hours) ou sur remise à zéro explicite (reset).
+    """
+
+    def __init__(self, bins: int = 10, hours: int = 24,
+                 shift_hours: Tuple[int, ...] = SHIFT_START_HOURS):
+        self.bins = bins
+        self.hours = hours
+        self.shift_hours = tuple(shift_hours)
+        self._lock = threading.Lock()
+        self._start(time.time())
+
+    def _start(self, started_at: float):
+        """Nouvelle période d'agrégation à partir de started_at (verrou détenu ou construction)"""
+        self.started_at = started_at
+        # Prochaine prise de poste : les agrégats repartent de zéro à cet instant
+        self.ends_at = (shift_bounds(started_at, self.shift_hours)[1]
+                        if self.shift_hours else float('inf'))
+        self.total = 0
+        self._counts: Dict[str, int] = {}
+        self._confidence_sums: Dict[str, float] = {}
+        self._histograms: Dict[str, List[int]] = {}
+        # Heure (epoch // 3600) et nombre d'analyses de chaque case de la fenêtre
+        self._hour_keys = [-1] * self.hours
+        self._hour_counts = [0] * self.hours
+
+    def _roll(self, now: float):
+        """Passe à l'équipe en cours si une prise de poste a eu lieu (verrou détenu)"""
+        if now >= self.ends_at:
+            self._start(shift_bounds(now, self.shift_hours)[0])
+
+    def reset(self, when: float = None):
+        """Remise à zéro par le superviseur : nouvelle période à partir de maintenant"""
+        with self._lock:
+            self._start(when or time.time())
+
+    def add(self, diagnosis: str, confidence: float, when: float = None):
+        """Prend en compte une analyse (confiance en %)"""
+        when = when or time.time()
+        hour = int(when // 3600)
+        slot = hour % self.hours
+        index = min(int(confidence * self.bins / 100), self.bins - 1)
+        with self._lock:
+            self._roll(when)
+            # Analyse antérieure à la période en cours (équipe précédente)
+            if when < self.started_at:
+                return
+            self.total += 1
+            self._counts[diagnosis] = self._counts.get(diagnosis, 0) + 1
+            self._confidence_sums[diagnosis] = self._confidence_sums.get(diagnosis, 0.0) + confidence
+            self._histograms.setdefault(diagnosis, [0] * self.bins)[index] += 1
+            # Une case réutilisée repart de zéro ; une heure déjà sortie de la fenêtre est ignorée
+            if self._hour_keys[slot] < hour:
+                self._hour_keys[slot] = hour
+                self._hour_counts[slot] = 0
+            if self._hour_keys[slot] == hour:
+                self._hour_counts[slot] += 1
+
+    def snapshot(self, now: float = None) -> dict:
+        """Copie des agrégats de l'équipe : total, compteurs, confiance moyenne,
+        histogrammes et débit horaire depuis le début de la période"""
+        now = now or time.time()
+        current = int(now // 3600)
+        with self._lock:
+            self._roll(now)
+            first = max(current - self.hours + 1, int(self.started_at // 3600))
+            hourly = []
+            for hour in range(first, current + 1):
+                slot = hour % self.hours
+                count = self._hour_counts[slot] if self._hour_keys[slot] == hour else 0
+                hourly.append((hour * 3600, count))
+            return {
+                'started_at': self.started_at,
+                'ends_at': self.ends_at,
+                'total': self.total,
+                'counts': dict(self._counts),
+                'mean_confidence': {diagnosis: self._confidence_sums[diagnosis] / count
+                                    for diagnosis, count in self._counts.items()},
+                'histograms': {diagnosis: list(counts)
+                               for diagnosis, counts in self._histograms.items()},
+                'hourly': hourly
+            }
@@ -0,0 +1,367 @@
+"""
+Module de persistance de l'historique des analyses
+Base SQLite locale indexée (date, diagnostic, empreinte d'image), écritures
+par lots, champs sensibles chiffrés par SecurityManager et purge selon la
+durée de conservation
+Activé par la variable d'environnement MEDICAL_HISTORY_DB
+"""
+
+import os
+import json
+import time
+import base64
+import atexit
+import socket
+import sqlite3
+import secrets
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from history import HistoryRecord, TIMESTAMP_FORMAT
+from security import SecurityError, SecurityManager
+
+logger = logging.getLogger(__name__)
+
+# Durée de conservation des analyses, en jours
+HISTORY_RETENTION_DAYS = int(os.environ.get('MEDICAL_HISTORY_RETENTION_DAYS', '30'))
+
+# Intervalle minimal entre deux purges, en secondes
+PURGE_INTERVAL = 3600
+
+# Propriétaire des analyses : identifiant du poste ou du technicien, stable
+# d'une session et d'un redémarrage à l'autre (nom d'hôte par défaut)
+HISTORY_OWNER = os.environ.get('MEDICAL_HISTORY_OWNER') or socket.gethostname() or 'poste'
+
+# Nom affiché pour une image dont le nom ne peut pas être déchiffré (clé changée)
+UNREADABLE_NAME = "(nom illisible)"
+
+def load_history_key(path: str) -> bytes:
+    """Clé de chiffrement de la base : MEDICAL_HISTORY_KEY ou fichier de clé local
+
+    Le fichier est créé au premier lancement, lisible par le seul propriétaire.
+    """
+    key = os.environ.get('MEDICAL_HISTORY_KEY')
+    if key:
+        return base64.urlsafe_b64decode(key)
+
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, 'rb') as f:
+            return f.read()
+    key = secrets.token_bytes(32)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    logger.info(f"History key created: {path}")
+    return key
+
+class HistoryStore:
+    """Historique persistant des analyses (SQLite embarqué)
+
+    Le nom de l'image et les probabilités sont chiffrés champ par champ ;
+    la date, le diagnostic et l'empreinte restent en clair pour être indexés.
+    Les ajouts sont mis en tampon et écrits par lots dans une seule
+    transaction par un thread dédié ; les lectures écrivent d'abord le tampon.
+    Chaque analyse appartient à un propriétaire (poste ou technicien,
+    MEDICAL_HISTORY_OWNER) : la consultation et l'effacement passent par
+    view(owner). Seule la réutilisation d'une prédiction par empreinte
+    (lookup) est commune, sans nom d'image.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS analyses (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            diagnosis TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            image_hash TEXT,
+            model_version TEXT,
+            image_name BLOB,
+            probabilities BLOB,
+            owner TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_analyses_ts ON analyses (ts);
+        CREATE INDEX IF NOT EXISTS idx_analyses_diagnosis_ts ON analyses (diagnosis, ts);
+        CREATE INDEX IF NOT EXISTS idx_analyses_image_hash ON analyses (image_hash, model_version);
+    """
+
+    def __init__(self, path: str, security: SecurityManager = None,
+                 retention_days: int = HISTORY_RETENTION_DAYS,
+                 batch_size: int = 64, flush_interval: float = 1.0,
+                 default_owner: str = HISTORY_OWNER):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+        self.security = security or SecurityManager(session_key=load_history_key(path + '.key'))
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.default_owner = default_owner
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._pending: List[tuple] = []
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._last_purge = 0.0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(analyses)')}
+        if 'owner' not in columns:
+            self._conn.execute('ALTER TABLE analyses ADD COLUMN owner TEXT')
+        with self._conn:
+            # Analyses enregistrées avant les propriétaires : rattachées au propriétaire par défaut
+            migrated = self._conn.execute(
+                'UPDATE analyses SET owner = ? WHERE owner IS NULL', (default_owner,)
+            ).rowcount
+        if migrated:
+            logger.info(f"History migration: {migrated} analyses assigned to {default_owner}")
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_analyses_owner_ts ON analyses (owner, ts)'
+        )
+        self.purge()
+
+        self.written = 0
+        self.batches = 0
+
+    def _encrypt(self, value: Any) -> bytes:
+        return self.security.encrypt_data(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+
+    def _decrypt(self, token: Optional[bytes], default: Any = None) -> Any:
+        """Valeur déchiffrée ; default si le champ est illisible (clé perdue ou changée)"""
+        if token is None:
+            return None
+        try:
+            return json.loads(self.security.decrypt_data(token))
+        except SecurityError:
+            return default
+
+    def add(self, prediction: Dict[str, Any], image_name: str, image_hash: str = None,
+            model_version: str = None, timestamp: datetime = None, owner: str = None):
+        """Dépose une analyse dans le tampon d'écriture (aucune E/S)"""
+        row = (
+            (timestamp or datetime.now()).timestamp(),
+            prediction['diagnosis'],
+            float(prediction['confidence']),
+            image_hash,
+            model_version,
+            self._encrypt(image_name),
+            self._encrypt(prediction.get('probabilities')),
+            owner or self.default_owner
+        )
+        with self._cond:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        if self._thread is None:
+            self.start()
+
+    def start(self):
+        """Démarre le thread d'écriture"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or len(self._pending) >= self.batch_size,
+                    timeout=self.flush_interval
+                )
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def flush(self) -> int:
+        """Écrit le tampon dans une seule transaction"""
+        with self._lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if batch:
+                with self._conn:
+                    self._conn.executemany(
+                        'INSERT INTO analyses (ts, diagnosis, confidence, image_hash, '
+                        'model_version, image_name, probabilities, owner) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        batch
+                    )
+                self.written += len(batch)
+                self.batches += 1
+        if time.monotonic() - self._last_purge >= PURGE_INTERVAL:
+            self.purge()
+        return len(batch)
+
+    def purge(self) -> int:
+        """Supprime les analyses plus anciennes que la durée de conservation"""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).timestamp()
+        with self._lock, self._conn:
+            deleted = self._conn.execute('DELETE FROM analyses WHERE ts < ?', (cutoff,)).rowcount
+        self._last_purge = time.monotonic()
+        if deleted:
+            logger.info(f"History purge: {deleted} analyses older than {self.retention_days} days")
+        return deleted
+
+    def clear(self, owner: str):
+        """Supprime les analyses enregistrées d'un propriétaire"""
+        with self._cond:
+            self._pending = [row for row in self._pending if row[7] != owner]
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM analyses WHERE owner = ?', (owner,))
+
+    def lookup(self, image_hash: str, model_version: str) -> Optional[Dict[str, Any]]:
+        """Dernière prédiction enregistrée pour ce contenu et ces poids, ou None"""
+        with self._cond:
+            for row in reversed(self._pending):
+                if row[3] == image_hash and row[4] == model_version:
+                    return self._prediction(row[1], row[2], row[6], model_version)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT diagnosis, confidence, probabilities FROM analyses '
+                'WHERE image_hash = ? AND model_version = ? AND ts >= ? '
+                'ORDER BY ts DESC LIMIT 1',
+                (image_hash, model_version, self._cutoff())
+            ).fetchone()
+        return self._prediction(*row, model_version) if row else None
+
+    def _prediction(self, diagnosis: str, confidence: float, probabilities: Optional[bytes],
+                    model_version: str) -> Optional[Dict[str, Any]]:
+        probabilities = self._decrypt(probabilities)
+        if probabilities is None:
+            return None
+        return {'probabilities': probabilities, 'diagnosis': diagnosis, 'confidence': confidence,
+                'model_version': model_version}
+
+    def _cutoff(self) -> float:
+        return (datetime.now() - timedelta(days=self.retention_days)).timestamp()
+
+    @staticmethod
+    def _filters(owner: str, diagnosis: Optional[str], start: Optional[date],
+                 end: Optional[date], cutoff: float) -> Tuple[str, list]:
+        """Clause WHERE sur les colonnes indexées ; [start, end] en jours inclus"""
+        clauses, params = ['owner = ?', 'ts >= ?'], [owner, cutoff]
+        if diagnosis is not None:
+            clauses.append('diagnosis = ?')
+            params.append(diagnosis)
+        if start is not None:
+            clauses.append('ts >= ?')
+            params.append(datetime.combine(start, datetime.min.time()).timestamp())
+        if end is not None:
+            clauses.append('ts < ?')
+            params.append(datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp())
+        return ' WHERE ' + ' AND '.join(clauses), params
+
+    def count(self, owner: str) -> int:
+        """Nombre d'analyses conservées d'un propriétaire"""
+        self.flush()
+        where, params = self._filters(owner, None, None, None, self._cutoff())
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM analyses{where}', params).fetchone()[0]
+
+    def diagnoses(self, owner: str) -> List[str]:
+        """Diagnostics présents dans l'historique d'un propriétaire"""
+        self.flush()
+        where, params = self._filters(owner, None, None, None, self._cutoff())
+        with self._lock:
+            rows = self._conn.execute(f'SELECT DISTINCT diagnosis FROM analyses{where}',
+                                      params).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def query(self, owner: str, diagnosis: Optional[str] = None, start: Optional[date] = None,
+              end: Optional[date] = None, page: int = 1,
+              page_size: int = 10) -> Tuple[List[HistoryRecord], int]:
+        """Page d'analyses filtrées d'un propriétaire, de la plus récente à la plus ancienne
+
+        Seuls les enregistrements de la page sont déchiffrés.
+        """
+        self.flush()
+        where, params = self._filters(owner, diagnosis, start, end, self._cutoff())
+        with self._lock:
+            total = self._conn.execute(f'SELECT COUNT(*) FROM analyses{where}', params).fetchone()[0]
+            rows = self._conn.execute(
+                f'SELECT id, ts, diagnosis, confidence, image_name, image_hash FROM analyses{where} '
+                'ORDER BY ts DESC LIMIT ? OFFSET ?',
+                params + [page_size, (max(page, 1) - 1) * page_size]
+            ).fetchall()
+        records = [
+            HistoryRecord(row_id, datetime.fromtimestamp(ts).strftime(TIMESTAMP_FORMAT),
+                          diagnosis, confidence, self._decrypt(image_name, UNREADABLE_NAME),
+                          image_hash or '')
+            for row_id, ts, diagnosis, confidence, image_name, image_hash in rows
+        ]
+        return records, total
+
+    def view(self, owner: str = None) -> 'OwnerHistory':
+        """Historique d'un propriétaire (par défaut celui du poste), avec l'interface d'AnalysisHistory"""
+        return OwnerHistory(self, owner or self.default_owner)
+
+    def close(self):
+        """Écrit le tampon et arrête le thread d'écriture"""
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout=10)
+        with self._cond:
+            self._thread = None
+        self.flush()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._pending)
+        return {'pending': pending, 'written': self.written, 'batches': self.batches,
+                'retention_days': self.retention_days}
+
+class OwnerHistory:
+    """Analyses persistantes d'un seul propriétaire (même interface qu'AnalysisHistory)"""
+
+    def __init__(self, store: HistoryStore, owner: str):
+        self.store = store
+        self.owner = owner
+
+    @property
+    def retention_days(self) -> int:
+        return self.store.retention_days
+
+    def __len__(self) -> int:
+        return self.store.count(self.owner)
+
+    def add(self, prediction: Dict[str, Any], image_name: str, image_hash: str = None,
+            model_version: str = None, timestamp: datetime = None):
+        self.store.add(prediction, image_name, image_hash=image_hash,
+                       model_version=model_version, timestamp=timestamp, owner=self.owner)
+
+    def diagnoses(self) -> List[str]:
+        return self.store.diagnoses(self.owner)
+
+    def query(self, diagnosis: Optional[str] = None, start: Optional[date] = None,
+              end: Optional[date] = None, page: int = 1,
+              page_size: int = 10) -> Tuple[List[HistoryRecord], int]:
+        return self.store.query(self.owner, diagnosis, start, end, page, page_size)
+
+    def clear(self):
+        self.store.clear(self.owner)
+
+_default_store: Optional[HistoryStore] = None
+_default_store_lock = threading.Lock()
+
+def get_history_store() -> Optional[HistoryStore]:
+    """Historique persistant partagé par le processus, ou None s'il n'est pas activé"""
+    global _default_store
+    path = os.environ.get('MEDICAL_HISTORY_DB')
+    if not path:
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = HistoryStore(path)
+        return _default_store
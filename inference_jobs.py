@@ -0,0 +1,239 @@
+"""
+Module des tâches d'inférence en arrière-plan
+Les analyses sont identifiées par l'empreinte du contenu de l'image : une même
+image n'est analysée qu'une fois, quelle que soit la session qui la soumet
+"""
+
+import io
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set
+
+import numpy as np
+from PIL import Image
+
+from admission import AdmissionController, Ticket
+from medical_ai import MedicalAIModel
+
+if TYPE_CHECKING:
+    from explanations import ExplanationManager
+    from history_store import HistoryStore
+
+logger = logging.getLogger(__name__)
+
+def content_key(data: bytes) -> str:
+    """Empreinte SHA-256 du contenu d'une image"""
+    return hashlib.sha256(data).hexdigest()
+
+class InferenceJob:
+    """Analyse d'une image, partagée entre les sessions qui l'ont demandée"""
+
+    def __init__(self, key: str, owner: str):
+        self.key = key
+        self.future: Optional[Future] = None
+        self.ticket: Optional[Ticket] = None
+        self.owners: Set[str] = {owner}
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancelled = False
+
+    @property
+    def job_id(self) -> str:
+        """Identifiant de la tâche (empreinte du contenu)"""
+        return self.key
+
+    @property
+    def status(self) -> str:
+        """'queued', 'running', 'done', 'error' ou 'cancelled'"""
+        if self.cancelled or self.future.cancelled():
+            return 'cancelled'
+        if not self.future.done():
+            return 'queued' if self.started_at is None else 'running'
+        return 'error' if self.future.exception() is not None else 'done'
+
+    @property
+    def elapsed(self) -> float:
+        """Secondes écoulées depuis la soumission (jusqu'à la fin du calcul)"""
+        return (self.finished_at or time.monotonic()) - self.submitted_at
+
+    def result(self, timeout: float = None) -> Dict[str, Any]:
+        """Résultat de l'analyse (attend la fin du calcul si nécessaire)"""
+        if self.cancelled:
+            raise CancelledError()
+        return self.future.result(timeout)
+
+class InferenceJobManager:
+    """Exécute les analyses dans un pool de threads, indexées par contenu
+
+    Les analyses terminées restent disponibles dans un cache LRU borné.
+    Une analyse est annulée lorsque plus aucune session n'en attend le
+    résultat : retirée de la file si elle n'a pas commencé, ignorée sinon.
+    Chaque analyse passe par le contrôleur d'admission partagé avec les
+    traitements par lot ; une analyse spéculative n'utilise que la moitié
+    de la file pour ne jamais évincer une demande explicite.
+    Si un historique persistant est fourni, une image déjà analysée avec les
+    mêmes poids (lors d'une session précédente) n'est pas réanalysée.
+    Avec un gestionnaire d'explications, la carte de caractéristiques de la
+    passe d'inférence lui est transmise pour les cartes Grad-CAM.
+    """
+
+    def __init__(self, model: MedicalAIModel, max_jobs: int = 256,
+                 admission: AdmissionController = None, store: 'HistoryStore' = None,
+                 explanations: 'ExplanationManager' = None):
+        self.model = model
+        self.max_jobs = max_jobs
+        self.admission = admission or AdmissionController()
+        self.store = store
+        self.explanations = explanations
+        self._executor = ThreadPoolExecutor(max_workers=self.admission.max_concurrency,
+                                            thread_name_prefix='inference')
+        self._jobs: "OrderedDict[str, InferenceJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.restored = 0
+        self.cancelled = 0
+
+    def _analyze(self, job: InferenceJob, data: bytes) -> Optional[Dict[str, Any]]:
+        """Attend son tour, décode l'image et exécute le modèle"""
+        if not self.admission.wait(job.ticket):
+            return None
+        job.started_at = time.monotonic()
+        try:
+            if job.cancelled:
+                return None
+            image = Image.open(io.BytesIO(data))
+            # Même passe avant : la carte de caractéristiques est conservée pour Grad-CAM
+            with_features = self.explanations is not None and self.explanations.available
+            probabilities, classes, features, version = self.model.predict_versioned(
+                image, with_features=with_features
+            )
+            if features is not None:
+                self.explanations.remember(job.key, features, version)
+            max_prob_idx = int(np.argmax(probabilities))
+            return {
+                'probabilities': [float(p) for p in probabilities],
+                'diagnosis': classes[max_prob_idx],
+                'confidence': float(probabilities[max_prob_idx]) * 100,
+                'model_version': version
+            }
+        finally:
+            job.finished_at = time.monotonic()
+            self.admission.leave(job.ticket)
+
+    def submit(self, data: bytes, owner: str, key: str = None,
+               speculative: bool = False) -> InferenceJob:
+        """Soumet une image ; réutilise l'analyse existante du même contenu
+
+        Lève AdmissionRejected si la file d'attente est pleine.
+        """
+        key = key or content_key(data)
+        with self._lock:
+            job = self._reuse(key, owner)
+            if job is not None:
+                return job
+
+        # Résultat enregistré par une session précédente (hors verrou : lecture SQLite)
+        stored = self.store.lookup(key, self.model.version) if self.store is not None else None
+
+        with self._lock:
+            job = self._reuse(key, owner)
+            if job is not None:
+                return job
+
+            job = InferenceJob(key, owner)
+            if stored is not None:
+                job.future = Future()
+                job.future.set_result(stored)
+                job.started_at = job.finished_at = job.submitted_at
+                self._jobs[key] = job
+                self._evict()
+                self.restored += 1
+                logger.debug(f"Inference result restored from history: {key[:12]}")
+                return job
+
+            max_depth = self.admission.max_queue // 2 if speculative else None
+            job.ticket = self.admission.enter(max_depth=max_depth)
+            job.future = self._executor.submit(self._analyze, job, data)
+            self._jobs[key] = job
+            self._evict()
+        logger.debug(f"Inference job submitted: {key[:12]}")
+        return job
+
+    def _reuse(self, key: str, owner: str) -> Optional[InferenceJob]:
+        """Analyse en cours ou terminée du même contenu (appelé sous verrou)
+
+        Un résultat obtenu avec d'autres poids que la version courante du
+        modèle n'est pas réutilisé.
+        """
+        job = self._jobs.get(key)
+        if job is None or job.status in ('cancelled', 'error'):
+            return None
+        if job.status == 'done' and job.future.result().get('model_version') != self.model.version:
+            return None
+        job.owners.add(owner)
+        self._jobs.move_to_end(key)
+        self.reused += 1
+        return job
+
+    def _evict(self):
+        """Retire les analyses terminées les plus anciennes au-delà de la limite"""
+        excess = len(self._jobs) - self.max_jobs
+        for key in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[key].future.done():
+                del self._jobs[key]
+                excess -= 1
+
+    def get(self, key: str) -> Optional[InferenceJob]:
+        """Analyse associée à une empreinte, si elle est connue"""
+        with self._lock:
+            return self._jobs.get(key)
+
+    def poll(self, job_id: str) -> Dict[str, Any]:
+        """État d'une tâche : statut, durée écoulée, résultat ou erreur"""
+        job = self.get(job_id)
+        if job is None:
+            return {'job_id': job_id, 'status': 'unknown', 'elapsed': 0.0,
+                    'result': None, 'error': "Analyse introuvable"}
+
+        status = job.status
+        state = {'job_id': job_id, 'status': status, 'elapsed': job.elapsed,
+                 'result': None, 'error': None, 'position': 0, 'eta': 0.0}
+        if status in ('queued', 'running'):
+            state['position'] = self.admission.position(job.ticket)
+            state['eta'] = self.admission.eta(job.ticket)
+        elif status == 'done':
+            state['result'] = job.future.result()
+        elif status == 'error':
+            logger.error(f"Inference job {job_id[:12]} failed: {job.future.exception()}")
+            state['error'] = "Erreur lors de l'analyse de l'image"
+        elif status == 'cancelled':
+            state['error'] = "Analyse annulée"
+        return state
+
+    def cancel(self, key: str, owner: str) -> bool:
+        """Retire l'intérêt d'une session ; annule l'analyse si elle n'en a plus"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                return False
+            job.owners.discard(owner)
+            if job.owners or job.future.done():
+                return False
+            job.cancelled = True
+            job.future.cancel()
+            self.admission.abandon(job.ticket)
+            del self._jobs[key]
+            self.cancelled += 1
+        logger.debug(f"Inference job cancelled: {key[:12]}")
+        return True
+
+    def shutdown(self, wait: bool = True):
+        """Arrête le pool de threads"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
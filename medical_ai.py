@@ -0,0 +1,440 @@
+"""
+Module du modèle de prédiction pour l'application médicale
+Chargement du modèle, prétraitement des images et inférence (sans Streamlit)
+"""
+
+import os
+import gc
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from model_format import is_fast_model_current, load_fast_model
+
+# Configuration de sécurité
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+logger = logging.getLogger(__name__)
+
+# Chargement depuis le format rapide (model_format.py) lorsqu'il est à jour
+FAST_LOAD = os.environ.get('MEDICAL_MODEL_FAST_LOAD', '1') != '0'
+
+# Résolution d'entrée du modèle
+INPUT_SIZE = (224, 224)
+
+# Sorties du modèle (7 classes) regroupées par diagnostic, comme dans map_probabilities
+DIAGNOSIS_OUTPUTS = ([0], [1, 2], [3, 4, 5, 6])
+
+def image_to_array(image: Image.Image) -> np.ndarray:
+    """Redimensionne l'image et la convertit en tableau RGB uint8 (224, 224, 3)"""
+    # Redimensionne l'image à 224x224
+    image = image.resize(INPUT_SIZE)
+
+    # Convertit en RGB si nécessaire
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    return np.asarray(image, dtype=np.uint8)
+
+def normalize_arrays(arrays: np.ndarray) -> np.ndarray:
+    """Normalise un lot de tableaux uint8 en valeurs [0, 1]"""
+    return arrays.astype(np.float32) / 255.0
+
+def file_stamp(path: str) -> Tuple[int, int]:
+    """Date de modification (ns) et taille d'un fichier, pour détecter un remplacement"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def file_digest(path: str) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_explainer(model):
+    """Modèle combiné (carte de caractéristiques + prédictions) et tête de classification
+
+    La carte de caractéristiques est la sortie de la dernière couche 4D.
+    Si les couches suivantes ne forment pas une chaîne simple (la tête
+    reconstruite ne redonne pas les prédictions du modèle), la tête vaut
+    None et l'explication refait une passe complète. Retourne None si le
+    modèle ne permet pas d'explication.
+    """
+    from tensorflow import keras
+
+    layers = model.layers
+    try:
+        if isinstance(model, keras.Sequential):
+            # Modèle séquentiel rechargé : graphe reconstruit couche par couche
+            inputs = outputs = keras.Input(model.input_shape[1:])
+            feature_output, index = None, -1
+            for i, layer in enumerate(layers):
+                outputs = layer(outputs)
+                if len(outputs.shape) == 4:
+                    feature_output, index = outputs, i
+        else:
+            index = max(i for i, layer in enumerate(layers) if len(layer.output.shape) == 4)
+            inputs, feature_output, outputs = model.input, layers[index].output, model.output
+        combined = keras.Model(inputs, [feature_output, outputs])
+    except Exception as e:
+        logger.warning(f"Grad-CAM unavailable for this model: {e}")
+        return None
+    head_layers = layers[index + 1:]
+
+    def head(features):
+        for layer in head_layers:
+            features = layer(features, training=False)
+        return features
+
+    probe = np.random.default_rng(0).random((1, *INPUT_SIZE, 3), dtype=np.float32)
+    features, predictions = combined(probe, training=False)
+    try:
+        valid = np.allclose(head(features), predictions, atol=1e-4)
+    except Exception:
+        valid = False
+    if not valid:
+        logger.warning("Grad-CAM head is not a simple chain, using full passes")
+    logger.info(f"Grad-CAM feature layer: {layers[index].name}")
+    return combined, head if valid else None
+
+class ModelVersion:
+    """Poids chargés d'une version du modèle et prédictions en cours sur ces poids"""
+
+    def __init__(self, model, version: str, stamp: Tuple[int, int]):
+        self.model = model
+        self.version = version
+        self.stamp = stamp
+        self.active = 0
+        # Modèle combiné pour Grad-CAM, construit hors du chemin des analyses
+        # (None : pas encore construit, False : modèle incompatible)
+        self._explainer = None
+        self._explainer_lock = threading.Lock()
+
+    def explainer(self):
+        """Modèle combiné et tête, construits au premier appel (None si incompatible)"""
+        with self._explainer_lock:
+            if self._explainer is None:
+                self._explainer = build_explainer(self.model) or False
+            return self._explainer or None
+
+    @property
+    def built_explainer(self):
+        """Modèle combiné s'il est déjà construit, sans jamais le construire"""
+        return self._explainer or None
+
+    @property
+    def may_explain(self) -> bool:
+        """Explication possible ou pas encore évaluée"""
+        return self._explainer is not False
+
+    def release(self):
+        """Libère les poids (plus aucune prédiction en cours)"""
+        self.model = None
+        self._explainer = None
+        gc.collect()
+        logger.info(f"Model version released: {self.version}")
+
+# Classe pour le modèle de prédiction
+class MedicalAIModel:
+    """Modèle de prédiction avec remplacement à chaud des poids
+
+    Une nouvelle version du fichier est chargée et préchauffée en
+    arrière-plan, puis remplace l'ancienne d'un seul coup : les nouvelles
+    prédictions utilisent la nouvelle version, celles en cours se terminent
+    sur l'ancienne, dont les poids sont libérés ensuite.
+    """
+
+    def __init__(self, model_path: str = "R50_Herlev_7class.keras"):
+        self.classes = ["Normal", "Précancéreux", "Cancéreux"]
+        self.model_path = model_path
+        self.status = 'demo'
+        self.status_message = ""
+        self.swaps = 0
+        self._current: Optional[ModelVersion] = None
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._pending_stamp: Optional[Tuple[int, int]] = None
+        self._failed_stamp: Optional[Tuple[int, int]] = None
+        self.load_model()
+
+    @property
+    def model(self):
+        """Modèle Keras de la version courante (None en mode démonstration)"""
+        current = self._current
+        return current.model if current is not None else None
+
+    @property
+    def version(self) -> str:
+        """Identifiant des poids utilisés : les résultats d'autres poids ne sont pas réutilisés"""
+        current = self._current
+        return current.version if current is not None else self.status
+
+    def _load_version(self, stamp: Tuple[int, int]) -> ModelVersion:
+        """Charge et préchauffe le fichier du modèle (sans toucher à la version courante)
+
+        La version est l'empreinte du contenu : deux fichiers différents ne
+        partagent jamais un identifiant, même remplacés dans la même seconde.
+        Le fichier ne doit pas changer pendant le chargement.
+        """
+        from tensorflow import keras
+
+        digest = file_digest(self.model_path)
+        model = None
+        if FAST_LOAD and is_fast_model_current(self.model_path):
+            try:
+                model = load_fast_model(self.model_path)
+                logger.info("Model weights memory-mapped from the fast format")
+            except Exception as e:
+                logger.warning(f"Fast model format unusable, loading {self.model_path}: {e}")
+        if model is None:
+            model = keras.models.load_model(self.model_path)
+        # Première prédiction (traçage du graphe) hors du chemin des utilisateurs
+        model.predict(np.zeros((1, *INPUT_SIZE, 3), dtype=np.float32), verbose=0)
+        if file_stamp(self.model_path) != stamp:
+            raise RuntimeError("Model file changed while loading")
+        return ModelVersion(model, f"{os.path.basename(self.model_path)}@{digest[:16]}", stamp)
+
+    def _install(self, loaded: ModelVersion):
+        """Bascule atomique vers une version chargée"""
+        with self._lock:
+            previous, self._current = self._current, loaded
+            release = previous is not None and previous.active == 0
+        self.status = 'loaded'
+        self.status_message = "✅ Modèle IA chargé avec succès"
+        if release:
+            previous.release()
+
+    def load_model(self):
+        """Charge le modèle de prédiction"""
+        try:
+            if os.path.exists(self.model_path):
+                self._install(self._load_version(file_stamp(self.model_path)))
+                logger.info(f"Model loaded from {self.model_path}")
+            else:
+                self.status = 'demo'
+                self.status_message = "⚠️ Modèle non trouvé, utilisation du mode démonstration"
+                logger.warning(f"Model not found at {self.model_path}, demo mode")
+        except Exception as e:
+            self.status = 'error'
+            self.status_message = f"❌ Erreur lors du chargement du modèle: {e}"
+            logger.error(f"Model loading error: {e}")
+
+    def reload(self) -> bool:
+        """Charge la version actuelle du fichier puis bascule ; l'ancienne reste en cas d'échec"""
+        previous = self.version
+        try:
+            stamp = file_stamp(self.model_path)
+        except OSError as e:
+            logger.error(f"Model reload failed, keeping {previous}: {e}")
+            return False
+        try:
+            loaded = self._load_version(stamp)
+        except Exception as e:
+            # Seul le fichier tenté est écarté : un fichier remplacé entre-temps sera chargé
+            self._failed_stamp = stamp
+            logger.error(f"Model reload failed, keeping {previous}: {e}")
+            return False
+        self._install(loaded)
+        self.swaps += 1
+        logger.info(f"Model hot-swapped: {previous} -> {loaded.version}")
+        return True
+
+    def check_for_update(self) -> bool:
+        """Recharge le modèle si le fichier a changé et que son écriture est terminée
+
+        Une nouvelle date de modification et taille doivent être observées
+        deux fois de suite avant le chargement.
+        """
+        try:
+            stamp = file_stamp(self.model_path)
+        except OSError:
+            return False
+        current = self._current
+        if (current is not None and stamp == current.stamp) or stamp == self._failed_stamp:
+            self._pending_stamp = None
+            return False
+        if stamp != self._pending_stamp:
+            self._pending_stamp = stamp
+            return False
+        self._pending_stamp = None
+        return self.reload()
+
+    def start_watcher(self, interval: float = 30.0):
+        """Surveille le fichier du modèle dans un thread d'arrière-plan"""
+        if self._watcher is not None or interval <= 0:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch_loop, args=(interval,), name='model-watcher', daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def _watch_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                logger.error(f"Model watcher error: {e}")
+
+    @contextmanager
+    def acquire(self) -> Iterator[Optional[ModelVersion]]:
+        """Version courante, conservée jusqu'à la fin de la prédiction (None en démonstration)"""
+        with self._lock:
+            loaded = self._current
+            if loaded is not None:
+                loaded.active += 1
+        try:
+            yield loaded
+        finally:
+            if loaded is not None:
+                with self._lock:
+                    loaded.active -= 1
+                    release = loaded.active == 0 and loaded is not self._current
+                if release:
+                    loaded.release()
+
+    def preprocess_image(self, image):
+        """Prétraite l'image pour le modèle"""
+        # Normalise les valeurs des pixels et ajoute une dimension batch
+        return normalize_arrays(image_to_array(image)[np.newaxis, ...])
+
+    def map_probabilities(self, probabilities):
+        """Regroupe les 7 classes du modèle en 3 classes simplifiées"""
+        # Supposons que les classes sont: [Normal, ASCUS, LSIL, HSIL, SCC, AGC, AIS]
+        normal_prob = probabilities[0]  # Normal
+        precancer_prob = probabilities[1] + probabilities[2]  # ASCUS + LSIL
+        cancer_prob = probabilities[3] + probabilities[4] + probabilities[5] + probabilities[6]  # HSIL + SCC + AGC + AIS
+
+        # Normalisation
+        total = normal_prob + precancer_prob + cancer_prob
+        if total > 0:
+            return [normal_prob/total, precancer_prob/total, cancer_prob/total]
+        return [0.33, 0.33, 0.34]
+
+    def predict(self, image):
+        """Fait une prédiction sur l'image"""
+        probabilities, classes, _, _ = self.predict_versioned(image)
+        return probabilities, classes
+
+    def predict_versioned(self, image, with_features: bool = False
+                          ) -> Tuple[List, List[str], Optional[np.ndarray], str]:
+        """Prédiction, version des poids utilisés et, sur demande, carte de
+        caractéristiques de la même passe avant
+
+        La carte vaut None sans modèle (mode démonstration) ou lorsque
+        l'explication ne peut pas partir de la carte seule. Une erreur
+        d'inférence est propagée.
+        """
+        try:
+            processed_image = self.preprocess_image(image)
+
+            with self.acquire() as loaded:
+                if loaded is None:
+                    # Mode démonstration avec prédictions aléatoires
+                    time.sleep(2)  # Simule le temps de traitement
+                    return np.random.dirichlet([2, 1, 1]), self.classes, None, self.status  # Biais vers normal
+
+                # Le modèle combiné n'est jamais construit ici (voir prepare_explainer)
+                explainer = loaded.built_explainer if with_features else None
+                if explainer is not None:
+                    combined, head = explainer
+                    features, predictions = combined.predict(processed_image, verbose=0)
+                    # Sans tête réutilisable, la carte ne servirait pas à l'explication
+                    features = features[0] if head is not None else None
+                else:
+                    # Prédiction réelle avec le modèle
+                    predictions = loaded.model.predict(processed_image, verbose=0)
+                    features = None
+                return self.map_probabilities(predictions[0]), self.classes, features, loaded.version
+
+        except Exception as e:
+            # Aucun diagnostic par défaut : l'appelant signale l'échec à l'utilisateur
+            logger.error(f"Prediction error: {e}")
+            raise
+        finally:
+            # Nettoyage mémoire
+            gc.collect()
+
+    @property
+    def explainable(self) -> bool:
+        """Explications Grad-CAM possibles avec le modèle chargé (sans construire le modèle combiné)"""
+        current = self._current
+        return current is not None and current.may_explain
+
+    def prepare_explainer(self) -> bool:
+        """Construit le modèle combiné de la version courante (appel en arrière-plan)"""
+        with self.acquire() as loaded:
+            return loaded is not None and loaded.explainer() is not None
+
+    def explain(self, diagnosis: str, features: np.ndarray = None, image=None) -> np.ndarray:
+        """Carte Grad-CAM (h, w) dans [0, 1] pour un diagnostic
+
+        À partir d'une carte de caractéristiques en cache, seule la tête de
+        classification est réexécutée ; sinon l'image repasse dans le modèle.
+        """
+        import tensorflow as tf
+
+        with self.acquire() as loaded:
+            combined, head = loaded.explainer()
+            outputs = DIAGNOSIS_OUTPUTS[self.classes.index(diagnosis)]
+
+            with tf.GradientTape() as tape:
+                if features is not None and head is not None:
+                    feature_map = tf.convert_to_tensor(features[np.newaxis])
+                    tape.watch(feature_map)
+                    predictions = head(feature_map)
+                else:
+                    feature_map, predictions = combined(self.preprocess_image(image), training=False)
+                score = tf.reduce_sum(tf.gather(predictions[0], outputs))
+
+            gradients = tape.gradient(score, feature_map)[0]
+        weights = tf.reduce_mean(gradients, axis=(0, 1))
+        cam = tf.nn.relu(tf.reduce_sum(feature_map[0] * weights, axis=-1)).numpy()
+        peak = cam.max()
+        return cam / peak if peak > 0 else cam
+
+    def predict_batch(self, images):
+        """Fait une prédiction sur un lot d'images en un seul appel au modèle"""
+        if not images:
+            return [], self.classes
+
+        return self.predict_arrays(np.stack([image_to_array(image) for image in images]))
+
+    def predict_arrays(self, arrays: np.ndarray) -> Tuple[List, List[str]]:
+        """Prédiction sur un lot de tableaux uint8 (N, 224, 224, 3)"""
+        probabilities, classes, _ = self.predict_arrays_versioned(arrays)
+        return probabilities, classes
+
+    def predict_arrays_versioned(self, arrays: np.ndarray) -> Tuple[List, List[str], str]:
+        """Prédiction sur un lot de tableaux uint8 et version des poids utilisés"""
+        if len(arrays) == 0:
+            return [], self.classes, self.version
+
+        with self.acquire() as loaded:
+            if loaded is not None:
+                predictions = loaded.model.predict(normalize_arrays(arrays), verbose=0,
+                                                   batch_size=len(arrays))
+                final_probs = [self.map_probabilities(p) for p in predictions]
+                version = loaded.version
+            else:
+                # Mode démonstration avec prédictions aléatoires
+                time.sleep(0.1 * len(arrays))  # Simule le temps de traitement
+                final_probs = list(np.random.dirichlet([2, 1, 1], size=len(arrays)))
+                version = self.status
+
+        return final_probs, self.classes, version
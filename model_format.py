@@ -0,0 +1,159 @@
+"""
+Module du format de chargement rapide du modèle
+Conversion unique d'un fichier .keras en un répertoire contenant
+l'architecture (JSON), un fichier de poids brut non compressé et un
+manifeste. Au chargement, les poids sont lus par projection mémoire
+(np.memmap) directement dans les variables du modèle, sans décompression
+de l'archive ni désérialisation HDF5
+Usage : python model_format.py [modele.keras]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Répertoire converti, à côté du fichier d'origine
+FAST_SUFFIX = '.fast'
+
+# Alignement des tableaux dans le fichier de poids, en octets
+ALIGNMENT = 64
+
+CONFIG_FILE = 'config.json'
+WEIGHTS_FILE = 'weights.bin'
+MANIFEST_FILE = 'manifest.json'
+
+def fast_model_path(model_path: str) -> str:
+    """Répertoire du format rapide associé à un fichier .keras"""
+    return model_path + FAST_SUFFIX
+
+def _source_stamp(model_path: str) -> dict:
+    stat = os.stat(model_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def _read_manifest(fast_path: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(fast_path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def is_fast_model_current(model_path: str) -> bool:
+    """Le format rapide existe et correspond au fichier .keras actuel"""
+    manifest = _read_manifest(fast_model_path(model_path))
+    if manifest is None or manifest.get('format') != FORMAT_VERSION:
+        return False
+    try:
+        return manifest.get('source') == _source_stamp(model_path)
+    except OSError:
+        return False
+
+def convert_model(model_path: str, model=None) -> str:
+    """Convertit un fichier .keras au format rapide ; retourne le répertoire créé
+
+    Le répertoire est écrit à côté puis renommé : un processus qui charge le
+    modèle pendant la conversion ne voit jamais de fichiers incomplets.
+    """
+    from tensorflow import keras
+
+    source = _source_stamp(model_path)
+    if model is None:
+        model = keras.models.load_model(model_path, compile=False)
+
+    fast_path = fast_model_path(model_path)
+    tmp_path = f"{fast_path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    entries = []
+    offset = 0
+    with open(os.path.join(tmp_path, WEIGHTS_FILE), 'wb') as f:
+        for variable in model.weights:
+            array = np.ascontiguousarray(variable.numpy())
+            padding = -offset % ALIGNMENT
+            f.write(b'\0' * padding)
+            offset += padding
+            f.write(array.tobytes())
+            entries.append({'name': variable.path, 'dtype': array.dtype.str,
+                            'shape': list(array.shape), 'offset': offset})
+            offset += array.nbytes
+
+    with open(os.path.join(tmp_path, CONFIG_FILE), 'w', encoding='utf-8') as f:
+        f.write(model.to_json())
+    with open(os.path.join(tmp_path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'format': FORMAT_VERSION, 'source': source, 'weights': entries}, f)
+
+    shutil.rmtree(fast_path, ignore_errors=True)
+    os.replace(tmp_path, fast_path)
+    logger.info(f"Model converted: {fast_path} ({len(entries)} arrays, {offset} bytes)")
+    return fast_path
+
+def load_fast_model(model_path: str):
+    """Construit le modèle depuis l'architecture et affecte les poids projetés en mémoire
+
+    Lève ValueError si le manifeste ne correspond pas aux variables du
+    modèle (nom, forme ou taille) ; l'appelant charge alors le fichier .keras.
+    """
+    from tensorflow import keras
+
+    fast_path = fast_model_path(model_path)
+    manifest = _read_manifest(fast_path)
+    if manifest is None or manifest.get('format') != FORMAT_VERSION:
+        raise ValueError(f"Manifeste absent ou illisible : {fast_path}")
+    with open(os.path.join(fast_path, CONFIG_FILE), 'r', encoding='utf-8') as f:
+        model = keras.models.model_from_json(f.read())
+
+    variables = model.weights
+    entries = manifest['weights']
+    if len(variables) != len(entries):
+        raise ValueError(f"{len(entries)} poids enregistrés pour {len(variables)} variables")
+
+    # Chaque tableau doit correspondre exactement à sa variable : des poids
+    # affectés à la mauvaise couche donneraient des prédictions fausses
+    # sans aucune erreur
+    weights = np.memmap(os.path.join(fast_path, WEIGHTS_FILE), dtype=np.uint8, mode='r')
+    for variable, entry in zip(variables, entries):
+        if entry['name'] != variable.path:
+            raise ValueError(f"Poids {entry['name']} enregistré pour la variable {variable.path}")
+        if tuple(entry['shape']) != tuple(variable.shape):
+            raise ValueError(f"Forme {tuple(entry['shape'])} enregistrée pour {variable.path} "
+                             f"de forme {tuple(variable.shape)}")
+        dtype = np.dtype(entry['dtype'])
+        count = int(np.prod(entry['shape'], dtype=np.int64))
+        end = entry['offset'] + count * dtype.itemsize
+        if end > len(weights):
+            raise ValueError(f"Fichier de poids tronqué ({variable.path})")
+        array = weights[entry['offset']:end]
+        variable.assign(array.view(dtype).reshape(entry['shape']))
+    del weights
+    return model
+
+def main(argv: List[str] = None) -> int:
+    """Conversion en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Conversion du modèle au format de chargement rapide")
+    parser.add_argument('model', nargs='?', default="R50_Herlev_7class.keras", help="Fichier .keras")
+    parser.add_argument('--force', action='store_true', help="Convertir même si le format rapide est à jour")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.force and is_fast_model_current(args.model):
+        print(f"{fast_model_path(args.model)} est à jour")
+        return 0
+
+    start = time.perf_counter()
+    fast_path = convert_model(args.model)
+    print(f"{fast_path} créé en {time.perf_counter() - start:.1f} s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+"""
+Module de pipeline d'inférence par lot
+Étapes lecture → décodage → prétraitement → lot → inférence → post-traitement
+reliées par des files bornées, pour que le modèle n'attende jamais les E/S
+"""
+
+import io
+import os
+import time
+import queue
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from admission import AdmissionController
+from medical_ai import MedicalAIModel, image_to_array
+
+logger = logging.getLogger(__name__)
+
+# Marqueur de fin de flux entre deux étapes
+_END = object()
+
+STAGES = ('read', 'decode', 'preprocess', 'batch', 'infer', 'postprocess')
+
+class PipelineError(Exception):
+    """Rejet d'un élément avec un message destiné à l'utilisateur"""
+    pass
+
+class PipelineItem:
+    """Élément circulant dans le pipeline"""
+
+    __slots__ = ('key', 'value', 'error', 'model_version')
+
+    def __init__(self, key: Any, value: Any = None, error: str = None):
+        self.key = key
+        self.value = value
+        self.error = error
+        # Version des poids ayant produit la prédiction
+        self.model_version: Optional[str] = None
+
+class StageStats:
+    """Mesures d'activité d'une étape"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0     # temps passé à traiter
+        self.starved_seconds = 0.0  # temps passé à attendre l'étape précédente
+        self.blocked_seconds = 0.0  # temps passé à attendre l'étape suivante
+        self._lock = threading.Lock()
+
+    def add(self, items: int, busy: float, starved: float, blocked: float):
+        with self._lock:
+            self.items += items
+            self.busy_seconds += busy
+            self.starved_seconds += starved
+            self.blocked_seconds += blocked
+
+    def as_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        capacity = max(wall_seconds * self.workers, 1e-9)
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'utilization': self.busy_seconds / capacity,
+            'starved': self.starved_seconds / capacity,
+            'blocked': self.blocked_seconds / capacity
+        }
+
+def read_bytes(payload: Any) -> bytes:
+    """Lecture par défaut : chemin de fichier ou données déjà en mémoire"""
+    if isinstance(payload, (bytes, bytearray)):
+        return bytes(payload)
+    with open(payload, 'rb') as f:
+        return f.read()
+
+def decode_image(data: bytes) -> Image.Image:
+    """Décode entièrement une image (exécutable dans un processus séparé)"""
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+class InferencePipeline:
+    """Pipeline d'inférence à étapes concurrentes et files bornées
+
+    Chaque étape dispose de son propre nombre de threads ; le décodage peut
+    être confié à un pool de processus. Les résultats sont produits dans
+    l'ordre de fin de traitement, sous forme de dictionnaires contenant la
+    clé de l'élément, les probabilités et la version du modèle qui les a
+    produites, ou l'erreur rencontrée. Avec un contrôleur d'admission,
+    chaque lot attend son tour avant l'inférence.
+    """
+
+    def __init__(self, model: MedicalAIModel, batch_size: int = 32,
+                 read_workers: int = 2, decode_workers: int = None,
+                 preprocess_workers: int = 2, postprocess_workers: int = 1,
+                 decode_processes: bool = False, queue_size: int = 64,
+                 max_batch_delay: float = 0.05,
+                 reader: Callable[[Any], bytes] = read_bytes,
+                 admission: Optional[AdmissionController] = None):
+        self.model = model
+        self.batch_size = batch_size
+        self.read_workers = read_workers
+        self.decode_workers = decode_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.preprocess_workers = preprocess_workers
+        self.postprocess_workers = postprocess_workers
+        self.decode_processes = decode_processes
+        self.queue_size = queue_size
+        self.max_batch_delay = max_batch_delay
+        self.reader = reader
+        self.admission = admission
+
+        self.stats: Dict[str, StageStats] = {}
+        self.wall_seconds = 0.0
+        self._stop = threading.Event()
+
+    # Transfert entre files avec arrêt possible
+
+    def _put(self, q: queue.Queue, item) -> float:
+        """Dépose un élément ; retourne le temps passé bloqué"""
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        return time.perf_counter() - start
+
+    def _get(self, q: queue.Queue, timeout: float = None):
+        """Retire un élément ; retourne (élément, temps d'attente)"""
+        start = time.perf_counter()
+        deadline = None if timeout is None else start + timeout
+        while not self._stop.is_set():
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.perf_counter())
+            if wait <= 0:
+                raise queue.Empty
+            try:
+                item = q.get(timeout=wait)
+                return item, time.perf_counter() - start
+            except queue.Empty:
+                continue
+        return _END, time.perf_counter() - start
+
+    # Étapes
+
+    def _run_stage(self, name: str, func: Callable, workers: int,
+                   inbox: queue.Queue, outbox: queue.Queue, downstream: int,
+                   error_message: str):
+        """Lance `workers` threads appliquant func aux éléments sans erreur"""
+        stats = self.stats[name] = StageStats(name, workers)
+        remaining = [workers]
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                while True:
+                    item, starved = self._get(inbox)
+                    if item is _END:
+                        break
+                    busy = 0.0
+                    if item.error is None:
+                        start = time.perf_counter()
+                        try:
+                            item.value = func(item.value)
+                        except PipelineError as e:
+                            item.value, item.error = None, str(e)
+                        except Exception as e:
+                            logger.debug(f"Stage {name} failed for {item.key}: {e}")
+                            item.value, item.error = None, error_message
+                        busy = time.perf_counter() - start
+                    blocked = self._put(outbox, item)
+                    stats.add(1, busy, starved, blocked)
+            finally:
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    for _ in range(downstream):
+                        self._put(outbox, _END)
+
+        return [threading.Thread(target=worker, name=f'pipeline-{name}-{i}', daemon=True)
+                for i in range(workers)]
+
+    def _batch_stage(self, inbox: queue.Queue, outbox: queue.Queue):
+        """Regroupe les éléments en lots (taille maximale ou délai écoulé)"""
+        stats = self.stats['batch'] = StageStats('batch', 1)
+        batch: List[PipelineItem] = []
+        first_at = None
+
+        def emit():
+            nonlocal batch, first_at
+            if batch:
+                stats.add(len(batch), 0.0, 0.0, self._put(outbox, batch))
+                batch, first_at = [], None
+
+        while True:
+            timeout = None
+            if batch:
+                timeout = max(0.0, first_at + self.max_batch_delay - time.perf_counter())
+            try:
+                item, starved = self._get(inbox, timeout=timeout)
+            except queue.Empty:
+                emit()
+                continue
+            stats.add(0, 0.0, starved, 0.0)
+            if item is _END:
+                break
+            if item.error is not None:
+                # Les erreurs ne font pas attendre le lot en cours
+                stats.add(0, 0.0, 0.0, self._put(outbox, [item]))
+                continue
+            if not batch:
+                first_at = time.perf_counter()
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                emit()
+        emit()
+        self._put(outbox, _END)
+
+    def _infer_stage(self, inbox: queue.Queue, outbox: queue.Queue, downstream: int):
+        """Inférence groupée ; le modèle reçoit un tableau (N, 224, 224, 3)"""
+        stats = self.stats['infer'] = StageStats('infer', 1)
+        while True:
+            batch, starved = self._get(inbox)
+            if batch is _END:
+                break
+            ready = [item for item in batch if item.error is None]
+            busy = queued = 0.0
+            if ready:
+                ticket = None
+                if self.admission is not None:
+                    # Attente du tour dans la file partagée (comptée comme blocage)
+                    wait_start = time.perf_counter()
+                    ticket = self.admission.enter(block=True)
+                    self.admission.wait(ticket)
+                    queued = time.perf_counter() - wait_start
+                start = time.perf_counter()
+                try:
+                    if self._stop.is_set():
+                        break
+                    probabilities, _, version = self.model.predict_arrays_versioned(
+                        np.stack([item.value for item in ready])
+                    )
+                    for item, probs in zip(ready, probabilities):
+                        item.value, item.model_version = probs, version
+                except Exception as e:
+                    logger.error(f"Batch inference error: {e}")
+                    for item in ready:
+                        item.value, item.error = None, "Erreur lors de la prédiction"
+                finally:
+                    if ticket is not None:
+                        self.admission.leave(ticket)
+                busy = time.perf_counter() - start
+            blocked = self._put(outbox, PipelineItem(None, batch))
+            stats.add(len(batch), busy, starved, blocked + queued)
+        for _ in range(downstream):
+            self._put(outbox, _END)
+
+    def _postprocess(self, batch: List[PipelineItem]) -> List[Dict[str, Any]]:
+        """Convertit un lot inféré en résultats individuels"""
+        results = []
+        for item in batch:
+            if item.error is not None:
+                results.append({'key': item.key, 'error': item.error})
+                continue
+            max_prob_idx = int(np.argmax(item.value))
+            results.append({
+                'key': item.key,
+                'error': None,
+                'probabilities': [float(p) for p in item.value],
+                'diagnosis': self.model.classes[max_prob_idx],
+                'confidence': float(item.value[max_prob_idx]) * 100,
+                'model_version': item.model_version
+            })
+        return results
+
+    def run(self, sources: Iterable) -> Iterator[Dict[str, Any]]:
+        """Traite les sources et produit les résultats au fil de l'eau
+
+        Chaque source est soit une clé passée au lecteur (chemin de fichier),
+        soit un couple (clé, données) ; une source (clé, None, erreur) est
+        transmise directement comme résultat en erreur.
+        """
+        self._stop.clear()
+        size = self.queue_size
+        q_read, q_decode, q_pre, q_batch, q_infer, q_post, q_out = (
+            queue.Queue(size) for _ in range(7)
+        )
+
+        def read(payload):
+            return self.reader(payload)
+
+        process_pool = None
+        decode = decode_image
+        if self.decode_processes:
+            process_pool = ProcessPoolExecutor(max_workers=self.decode_workers)
+            decode = lambda data: process_pool.submit(decode_image, data).result()
+
+        threads = []
+        threads += self._run_stage('read', read, self.read_workers,
+                                   q_read, q_decode, self.decode_workers,
+                                   "Fichier illisible")
+        threads += self._run_stage('decode', decode, self.decode_workers,
+                                   q_decode, q_pre, self.preprocess_workers,
+                                   "Image illisible ou corrompue")
+        threads += self._run_stage('preprocess', image_to_array, self.preprocess_workers,
+                                   q_pre, q_batch, 1,
+                                   "Erreur de prétraitement")
+        threads.append(threading.Thread(target=self._batch_stage, args=(q_batch, q_infer),
+                                        name='pipeline-batch', daemon=True))
+        threads.append(threading.Thread(target=self._infer_stage,
+                                        args=(q_infer, q_post, self.postprocess_workers),
+                                        name='pipeline-infer', daemon=True))
+        threads += self._run_stage('postprocess', self._postprocess, self.postprocess_workers,
+                                   q_post, q_out, 1, "Erreur de post-traitement")
+
+        def feed():
+            try:
+                for source in sources:
+                    if self._stop.is_set():
+                        break
+                    if isinstance(source, tuple) and len(source) == 3 and source[2]:
+                        item = PipelineItem(source[0], error=source[2])
+                    elif isinstance(source, tuple):
+                        item = PipelineItem(source[0], source[1])
+                    else:
+                        item = PipelineItem(source, source)
+                    self._put(q_read, item)
+            except Exception as e:
+                logger.error(f"Pipeline source error: {e}")
+            finally:
+                for _ in range(self.read_workers):
+                    self._put(q_read, _END)
+
+        threads.append(threading.Thread(target=feed, name='pipeline-feed', daemon=True))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item, _ = self._get(q_out)
+                if item is _END:
+                    break
+                yield from item.value or []
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join(timeout=1)
+            if process_pool is not None:
+                process_pool.shutdown(wait=False, cancel_futures=True)
+            self.wall_seconds = time.perf_counter() - start
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Utilisation de chaque étape (fractions du temps total des workers)"""
+        return {name: self.stats[name].as_dict(self.wall_seconds)
+                for name in STAGES if name in self.stats}
+
+    def format_report(self) -> str:
+        """Rapport d'utilisation lisible par étape"""
+        lines = [f"{'étape':<12}{'workers':>8}{'éléments':>10}{'occupé':>9}{'attente':>9}{'bloqué':>9}"]
+        for name, stats in self.report().items():
+            lines.append(
+                f"{name:<12}{stats['workers']:>8}{stats['items']:>10}"
+                f"{stats['utilization']:>9.0%}{stats['starved']:>9.0%}{stats['blocked']:>9.0%}"
+            )
+        return '\n'.join(lines)
@@ -3,374 +3,252 @@ Module d'intégration PWA pour l'application médicale Streamlit
 Gestion du manifest, service worker et fonctionnalités hors ligne
 """
 
-import streamlit as st
-import json
+import io
 import os
+import re
+import gzip
+import json
+import struct
+import hashlib
+import logging
 from pathlib import Path
+from typing import Dict, List, Optional
+
+import streamlit as st
+import streamlit.components.v1 as components
+from PIL import Image
+
+from static_assets import APP_FONT, STATIC_DIR, STATIC_URL_PREFIX, write_if_changed
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Fichiers générés par build_pwa_assets(), relatifs à static/
+BUILD_DIR = "build"
+BUILD_PATH = STATIC_DIR / BUILD_DIR
+
+# Fichiers PWA fingerprintés par l'empreinte de leur contenu (le manifest,
+# qui référence les icônes, est traité en dernier)
+PWA_ASSETS = [
+    *sorted(f"icons/{path.name}" for path in (STATIC_DIR / "icons").glob("*.png")),
+    "js/pwa.js",
+    "js/pwa-status.js",
+    "offline.html",
+]
+
+# Fichiers mis en cache par le service worker dès son installation
+PRECACHE_ASSETS = [
+    "manifest.json",
+    "icons/icon-192x192.png",
+    "icons/icon-512x512.png",
+    "js/pwa.js",
+    "offline.html",
+]
+
+# Fichiers de static/ précachés sous leur URL d'origine : référencés par les
+# feuilles de style, ils ne sont pas fingerprintés ; leur empreinte entre dans
+# la version du build
+PRECACHE_STATIC_FILES = [
+    APP_FONT,
+]
+
+# Extensions précompressées (les PNG sont déjà compressés)
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.html', '.json', '.svg')
+
+# Fichiers référencés par la page de Streamlit (bundle, feuille de style, police)
+STREAMLIT_INDEX = Path(st.__file__).parent / "static" / "index.html"
+SHELL_REFERENCE_PATTERN = re.compile(r'(?:src|href)="\./([^"]+)"')
+
+ICON_SIZE_PATTERN = re.compile(r"icon-(\d+)x(\d+)\.png$")
+
+# URL du service worker : il doit être servi à la racine du site pour
+# contrôler l'application (server.py) ; vide, aucun service worker n'est enregistré
+SERVICE_WORKER_URL = os.environ.get('MEDICAL_SERVICE_WORKER_URL', '')
+
+def _fingerprint(relative_path: str, data: bytes) -> str:
+    """Nom de fichier versionné : icons/icon-72x72.png -> icons/icon-72x72.<empreinte>.png"""
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    stem, ext = os.path.splitext(relative_path)
+    return f"{stem}.{digest}{ext}"
+
+def _render_icon(relative_path: str, data: bytes) -> bytes:
+    """Icône redimensionnée à la taille indiquée par son nom (icon-72x72.png)"""
+    match = ICON_SIZE_PATTERN.search(relative_path)
+    if match is None:
+        return data
+    size = (int(match.group(1)), int(match.group(2)))
+    image = Image.open(io.BytesIO(data))
+    if image.size == size:
+        return data
+    buffer = io.BytesIO()
+    image.resize(size, Image.Resampling.LANCZOS).save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+def _write_build_file(relative_path: str, data: bytes) -> Dict[str, int]:
+    """Écrit un fichier de build et ses variantes gzip/brotli ; retourne leurs tailles"""
+    write_if_changed(f"{BUILD_DIR}/{relative_path}", data)
+    sizes = {'identity': len(data)}
+    if relative_path.endswith(COMPRESSIBLE_EXTENSIONS):
+        # mtime fixe : même contenu, même fichier compressé
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        write_if_changed(f"{BUILD_DIR}/{relative_path}.gz", compressed)
+        sizes['gzip'] = len(compressed)
+        if BROTLI_AVAILABLE:
+            compressed = brotli.compress(data, quality=11)
+            write_if_changed(f"{BUILD_DIR}/{relative_path}.br", compressed)
+            sizes['br'] = len(compressed)
+    return sizes
+
+def _render_manifest(assets: Dict[str, str]) -> bytes:
+    """Manifest de l'application référençant les icônes fingerprintées"""
+    manifest = json.loads((STATIC_DIR / "manifest.json").read_text(encoding='utf-8'))
+    for icon in manifest.get('icons', []):
+        logical = icon['src'].split('/static/', 1)[-1]
+        if logical in assets:
+            # Relatif au manifest, lui-même servi depuis static/build/
+            icon['src'] = assets[logical]
+    return json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+
+def streamlit_app_shell() -> List[str]:
+    """Fichiers chargés par la page de Streamlit, relatifs à la racine du site
+
+    Leurs noms sont versionnés par Streamlit : le service worker peut les
+    précacher et les servir depuis le cache sans les revalider.
+    """
+    try:
+        index = STREAMLIT_INDEX.read_text(encoding='utf-8')
+    except OSError as e:
+        logger.warning(f"Streamlit index not found, app shell not precached: {e}")
+        return []
+    return sorted(set(SHELL_REFERENCE_PATTERN.findall(index)))
+
+def _render_service_worker(version: str, assets: Dict[str, str], shell: List[str],
+                           static_files: List[str]) -> bytes:
+    """Service worker (static/sw.js) avec la version et les listes de précache du build"""
+    template = (STATIC_DIR / "sw.js").read_text(encoding='utf-8')
+    template = re.sub(r"^const BUILD_VERSION = .*;$",
+                      f"const BUILD_VERSION = '{version}';", template, count=1, flags=re.M)
+    template = re.sub(r"^const PRECACHE_MANIFEST = .*;$",
+                      f"const PRECACHE_MANIFEST = {json.dumps(assets, sort_keys=True)};",
+                      template, count=1, flags=re.M)
+    template = re.sub(r"^const APP_SHELL_MANIFEST = .*;$",
+                      f"const APP_SHELL_MANIFEST = {json.dumps(shell)};",
+                      template, count=1, flags=re.M)
+    template = re.sub(r"^const STATIC_ASSET_MANIFEST = .*;$",
+                      f"const STATIC_ASSET_MANIFEST = {json.dumps(static_files)};",
+                      template, count=1, flags=re.M)
+    return template.encode('utf-8')
+
+def _prune_build(keep):
+    """Supprime les fichiers des builds précédents"""
+    for path in BUILD_PATH.rglob('*'):
+        if path.is_file() and path.relative_to(BUILD_PATH).as_posix() not in keep:
+            path.unlink()
+
+def _load_asset_manifest() -> Dict:
+    """Manifest du build précédent (vide s'il n'existe pas)"""
+    try:
+        manifest = json.loads((BUILD_PATH / "asset-manifest.json").read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        manifest = {}
+    return {'assets': manifest.get('assets', {}), 'sources': manifest.get('sources', {})}
+
+def build_pwa_assets() -> Dict:
+    """Génère les fichiers PWA fingerprintés dans static/build/
+
+    Chaque fichier est copié sous un nom contenant l'empreinte de son
+    contenu, avec ses variantes précompressées : il peut être servi avec un
+    cache immuable. Les icônes sont ramenées à leur taille nominale (une
+    seule fois par version de l'icône source). La version du build et le nom des caches du service
+    worker dérivent de ces empreintes, si bien qu'un client ne retélécharge
+    que les fichiers modifiés. Retourne le manifest des fichiers générés.
+    """
+    previous = _load_asset_manifest()
+    assets: Dict[str, str] = {}
+    sources: Dict[str, str] = {}
+    written = {}
+    for relative_path in PWA_ASSETS:
+        data = (STATIC_DIR / relative_path).read_bytes()
+        sources[relative_path] = hashlib.sha256(data).hexdigest()[:12]
+        if relative_path.startswith("icons/"):
+            built = BUILD_PATH / previous['assets'].get(relative_path, relative_path)
+            if previous['sources'].get(relative_path) == sources[relative_path] and built.is_file():
+                data = built.read_bytes()
+            else:
+                data = _render_icon(relative_path, data)
+        assets[relative_path] = _fingerprint(relative_path, data)
+        written[assets[relative_path]] = _write_build_file(assets[relative_path], data)
+
+    manifest = _render_manifest(assets)
+    assets["manifest.json"] = _fingerprint("manifest.json", manifest)
+    written[assets["manifest.json"]] = _write_build_file(assets["manifest.json"], manifest)
+
+    for relative_path in PRECACHE_STATIC_FILES:
+        sources[relative_path] = hashlib.sha256((STATIC_DIR / relative_path).read_bytes()).hexdigest()[:12]
+
+    # Une mise à jour de Streamlit change aussi la version (nouvelle interface)
+    shell = streamlit_app_shell()
+    static_sources = {name: sources[name] for name in PRECACHE_STATIC_FILES}
+    version = hashlib.sha256(
+        json.dumps([assets, shell, static_sources], sort_keys=True).encode('utf-8')
+    ).hexdigest()[:12]
+    precache = {name: assets[name] for name in PRECACHE_ASSETS}
+    written["sw.js"] = _write_build_file(
+        "sw.js", _render_service_worker(version, precache, shell, PRECACHE_STATIC_FILES)
+    )
+
+    asset_manifest = {'version': version, 'assets': assets, 'sources': sources}
+    write_if_changed(f"{BUILD_DIR}/asset-manifest.json",
+                     json.dumps(asset_manifest, indent=2, sort_keys=True))
+
+    keep = {"asset-manifest.json"}
+    for name, sizes in written.items():
+        keep.add(name)
+        keep.update(f"{name}.{suffix}" for suffix, encoding in (('gz', 'gzip'), ('br', 'br'))
+                    if encoding in sizes)
+    _prune_build(keep)
+
+    total = sum(sizes['identity'] for sizes in written.values())
+    compressed = sum(min(sizes.values()) for sizes in written.values())
+    logger.info(f"PWA assets built (version {version}): {len(written)} files, "
+                f"{total} bytes, {compressed} bytes compressed")
+    return asset_manifest
+
+@st.cache_resource
+def prepare_pwa_assets() -> Dict:
+    """Construit les fichiers PWA une seule fois par processus"""
+    return build_pwa_assets()
+
+def asset_url(relative_path: str) -> str:
+    """URL fingerprintée d'un fichier PWA (servie avec un cache immuable)"""
+    assets = prepare_pwa_assets()['assets']
+    return f"{STATIC_URL_PREFIX}{BUILD_DIR}/{assets[relative_path]}"
+
+def _script_loader(relative_path: str, **data) -> str:
+    """Balise de chargement d'un script statique (mis en cache par le navigateur)"""
+    attributes = ''.join(f' data-{name}="{value}"' for name, value in data.items())
+    return f'<script src="{asset_url(relative_path)}"{attributes}></script>'
 
 def inject_pwa_components():
     """Injecte les composants PWA dans l'application Streamlit"""
     
-    # Chemin vers les fichiers statiques
-    static_dir = Path(__file__).parent / "static"
-    
-    # HTML pour l'intégration PWA
-    pwa_html = f"""
-    <script>
-        // Configuration PWA
-        const PWA_CONFIG = {{
-            manifestPath: '/static/manifest.json',
-            swPath: '/static/sw.js',
-            enableNotifications: false,
-            enableBackgroundSync: false
-        }};
-        
-        // Vérification du support PWA
-        function checkPWASupport() {{
-            const support = {{
-                serviceWorker: 'serviceWorker' in navigator,
-                manifest: 'manifest' in document.createElement('link'),
-                notifications: 'Notification' in window,
-                pushManager: 'PushManager' in window
-            }};
-            
-            console.log('Support PWA:', support);
-            return support;
-        }}
-        
-        // Installation du Service Worker
-        async function installServiceWorker() {{
-            if (!('serviceWorker' in navigator)) {{
-                console.warn('Service Worker non supporté');
-                return false;
-            }}
-            
-            try {{
-                const registration = await navigator.serviceWorker.register(PWA_CONFIG.swPath);
-                console.log('Service Worker enregistré:', registration);
-                
-                // Écouter les mises à jour
-                registration.addEventListener('updatefound', () => {{
-                    console.log('Mise à jour du Service Worker disponible');
-                    const newWorker = registration.installing;
-                    
-                    newWorker.addEventListener('statechange', () => {{
-                        if (newWorker.state === 'installed' && navigator.serviceWorker.controller) {{
-                            showUpdateNotification();
-                        }}
-                    }});
-                }});
-                
-                return true;
-            }} catch (error) {{
-                console.error('Erreur lors de l\'enregistrement du Service Worker:', error);
-                return false;
-            }}
-        }}
-        
-        // Afficher notification de mise à jour
-        function showUpdateNotification() {{
-            const notification = document.createElement('div');
-            notification.innerHTML = `
-                <div style="
-                    position: fixed;
-                    top: 20px;
-                    right: 20px;
-                    background: #4F46E5;
-                    color: white;
-                    padding: 1rem;
-                    border-radius: 8px;
-                    box-shadow: 0 4px 12px rgba(0,0,0,0.2);
-                    z-index: 10000;
-                    max-width: 300px;
-                ">
-                    <div style="font-weight: 600; margin-bottom: 0.5rem;">
-                        🔄 Mise à jour disponible
-                    </div>
-                    <div style="font-size: 0.9rem; margin-bottom: 1rem;">
-                        Une nouvelle version de l'application est disponible.
-                    </div>
-                    <button onclick="updateApp()" style="
-                        background: white;
-                        color: #4F46E5;
-                        border: none;
-                        padding: 0.5rem 1rem;
-                        border-radius: 4px;
-                        font-weight: 600;
-                        cursor: pointer;
-                        margin-right: 0.5rem;
-                    ">
-                        Mettre à jour
-                    </button>
-                    <button onclick="this.parentElement.parentElement.remove()" style="
-                        background: transparent;
-                        color: white;
-                        border: 1px solid white;
-                        padding: 0.5rem 1rem;
-                        border-radius: 4px;
-                        cursor: pointer;
-                    ">
-                        Plus tard
-                    </button>
-                </div>
-            `;
-            document.body.appendChild(notification);
-        }}
-        
-        // Mettre à jour l'application
-        function updateApp() {{
-            if ('serviceWorker' in navigator) {{
-                navigator.serviceWorker.getRegistration().then(registration => {{
-                    if (registration && registration.waiting) {{
-                        registration.waiting.postMessage({{ type: 'SKIP_WAITING' }});
-                        window.location.reload();
-                    }}
-                }});
-            }}
-        }}
-        
-        // Gestion de l'installation PWA
-        let deferredPrompt;
-        
-        window.addEventListener('beforeinstallprompt', (e) => {{
-            console.log('Événement beforeinstallprompt déclenché');
-            e.preventDefault();
-            deferredPrompt = e;
-            showInstallButton();
-        }});
-        
-        function showInstallButton() {{
-            // Vérifier si déjà installé
-            if (window.matchMedia('(display-mode: standalone)').matches) {{
-                console.log('Application déjà installée');
-                return;
-            }}
-            
-            const installButton = document.createElement('div');
-            installButton.innerHTML = `
-                <div id="pwa-install-banner" style="
-                    position: fixed;
-                    bottom: 20px;
-                    left: 50%;
-                    transform: translateX(-50%);
-                    background: linear-gradient(135deg, #4F46E5, #7C3AED);
-                    color: white;
-                    padding: 1rem 1.5rem;
-                    border-radius: 12px;
-                    box-shadow: 0 8px 25px rgba(79, 70, 229, 0.3);
-                    z-index: 10000;
-                    display: flex;
-                    align-items: center;
-                    gap: 1rem;
-                    max-width: 90vw;
-                    animation: slideUp 0.3s ease-out;
-                ">
-                    <div style="font-size: 1.5rem;">📱</div>
-                    <div>
-                        <div style="font-weight: 600; margin-bottom: 0.25rem;">
-                            Installer l'application
-                        </div>
-                        <div style="font-size: 0.9rem; opacity: 0.9;">
-                            Accès rapide depuis votre écran d'accueil
-                        </div>
-                    </div>
-                    <button onclick="installPWA()" style="
-                        background: white;
-                        color: #4F46E5;
-                        border: none;
-                        padding: 0.75rem 1.5rem;
-                        border-radius: 8px;
-                        font-weight: 600;
-                        cursor: pointer;
-                        transition: transform 0.2s ease;
-                    " onmouseover="this.style.transform='scale(1.05)'" onmouseout="this.style.transform='scale(1)'">
-                        Installer
-                    </button>
-                    <button onclick="document.getElementById('pwa-install-banner').remove()" style="
-                        background: transparent;
-                        color: white;
-                        border: none;
-                        padding: 0.5rem;
-                        cursor: pointer;
-                        font-size: 1.2rem;
-                    ">
-                        ✕
-                    </button>
-                </div>
-                <style>
-                    @keyframes slideUp {{
-                        from {{ transform: translateX(-50%) translateY(100%); opacity: 0; }}
-                        to {{ transform: translateX(-50%) translateY(0); opacity: 1; }}
-                    }}
-                </style>
-            `;
-            document.body.appendChild(installButton);
-        }}
-        
-        async function installPWA() {{
-            if (!deferredPrompt) {{
-                console.log('Prompt d\'installation non disponible');
-                return;
-            }}
-            
-            try {{
-                deferredPrompt.prompt();
-                const {{ outcome }} = await deferredPrompt.userChoice;
-                
-                if (outcome === 'accepted') {{
-                    console.log('Installation acceptée');
-                    document.getElementById('pwa-install-banner')?.remove();
-                }} else {{
-                    console.log('Installation refusée');
-                }}
-                
-                deferredPrompt = null;
-            }} catch (error) {{
-                console.error('Erreur lors de l\'installation:', error);
-            }}
-        }}
-        
-        // Gestion du mode hors ligne
-        function handleOnlineStatus() {{
-            const updateOnlineStatus = () => {{
-                const status = navigator.onLine ? 'en ligne' : 'hors ligne';
-                console.log('Statut réseau:', status);
-                
-                if (!navigator.onLine) {{
-                    showOfflineNotification();
-                }} else {{
-                    hideOfflineNotification();
-                }}
-            }};
-            
-            window.addEventListener('online', updateOnlineStatus);
-            window.addEventListener('offline', updateOnlineStatus);
-            updateOnlineStatus();
-        }}
-        
-        function showOfflineNotification() {{
-            if (document.getElementById('offline-notification')) return;
-            
-            const notification = document.createElement('div');
-            notification.id = 'offline-notification';
-            notification.innerHTML = `
-                <div style="
-                    position: fixed;
-                    top: 0;
-                    left: 0;
-                    right: 0;
-                    background: #F59E0B;
-                    color: white;
-                    padding: 0.75rem;
-                    text-align: center;
-                    z-index: 10001;
-                    font-weight: 600;
-                ">
-                    📡 Mode hors ligne - Fonctionnalités limitées
-                </div>
-            `;
-            document.body.appendChild(notification);
-            
-            // Ajuster le padding du body
-            document.body.style.paddingTop = '50px';
-        }}
-        
-        function hideOfflineNotification() {{
-            const notification = document.getElementById('offline-notification');
-            if (notification) {{
-                notification.remove();
-                document.body.style.paddingTop = '0';
-            }}
-        }}
-        
-        // Initialisation PWA
-        function initPWA() {{
-            console.log('Initialisation PWA...');
-            
-            const support = checkPWASupport();
-            
-            if (support.serviceWorker) {{
-                installServiceWorker();
-            }}
-            
-            handleOnlineStatus();
-            
-            // Ajouter les meta tags pour PWA si manquants
-            addPWAMetaTags();
-            
-            console.log('PWA initialisée');
-        }}
-        
-        function addPWAMetaTags() {{
-            const metaTags = [
-                {{ name: 'mobile-web-app-capable', content: 'yes' }},
-                {{ name: 'apple-mobile-web-app-capable', content: 'yes' }},
-                {{ name: 'apple-mobile-web-app-status-bar-style', content: 'default' }},
-                {{ name: 'apple-mobile-web-app-title', content: 'Medical AI' }},
-                {{ name: 'application-name', content: 'Medical AI' }},
-                {{ name: 'msapplication-TileColor', content: '#4F46E5' }},
-                {{ name: 'theme-color', content: '#4F46E5' }}
-            ];
-            
-            metaTags.forEach(tag => {{
-                if (!document.querySelector(`meta[name="${{tag.name}}"]`)) {{
-                    const meta = document.createElement('meta');
-                    meta.name = tag.name;
-                    meta.content = tag.content;
-                    document.head.appendChild(meta);
-                }}
-            }});
-            
-            // Ajouter le lien vers le manifest si manquant
-            if (!document.querySelector('link[rel="manifest"]')) {{
-                const link = document.createElement('link');
-                link.rel = 'manifest';
-                link.href = PWA_CONFIG.manifestPath;
-                document.head.appendChild(link);
-            }}
-        }}
-        
-        // Démarrer l'initialisation quand le DOM est prêt
-        if (document.readyState === 'loading') {{
-            document.addEventListener('DOMContentLoaded', initPWA);
-        }} else {{
-            initPWA();
-        }}
-        
-        // Fonctions utilitaires pour Streamlit
-        window.PWA = {{
-            isInstalled: () => window.matchMedia('(display-mode: standalone)').matches,
-            isOnline: () => navigator.onLine,
-            clearCache: () => {{
-                if ('serviceWorker' in navigator) {{
-                    navigator.serviceWorker.getRegistration().then(registration => {{
-                        if (registration && registration.active) {{
-                            registration.active.postMessage({{ type: 'CLEAR_CACHE' }});
-                        }}
-                    }});
-                }}
-            }},
-            checkForUpdates: () => {{
-                if ('serviceWorker' in navigator) {{
-                    navigator.serviceWorker.getRegistration().then(registration => {{
-                        if (registration) {{
-                            registration.update();
-                        }}
-                    }});
-                }}
-            }}
-        }};
-    </script>
-    """
-    
-    # Injecter le HTML dans Streamlit
-    st.components.v1.html(pwa_html, height=0)
+    # Le script (static/js/pwa.js) n'est téléchargé qu'une fois ; seule la
+    # balise de chargement est renvoyée à chaque réexécution
+    st.components.v1.html(
+        _script_loader("js/pwa.js", manifest=asset_url("manifest.json"), sw=SERVICE_WORKER_URL),
+        height=0
+    )
 
 def add_pwa_meta_tags():
     """Ajoute les meta tags PWA à l'application"""
     
-    pwa_meta = """
-    <link rel="manifest" href="/static/manifest.json">
+    pwa_meta = f"""
+    <link rel="manifest" href="{asset_url('manifest.json')}">
     <meta name="mobile-web-app-capable" content="yes">
     <meta name="apple-mobile-web-app-capable" content="yes">
     <meta name="apple-mobile-web-app-status-bar-style" content="default">
@@ -380,16 +258,16 @@ def add_pwa_meta_tags():
     <meta name="theme-color" content="#4F46E5">
     
     <!-- Icônes Apple -->
-    <link rel="apple-touch-icon" sizes="152x152" href="/static/icons/icon-152x152.png">
-    <link rel="apple-touch-icon" sizes="192x192" href="/static/icons/icon-192x192.png">
+    <link rel="apple-touch-icon" sizes="152x152" href="{asset_url('icons/icon-152x152.png')}">
+    <link rel="apple-touch-icon" sizes="192x192" href="{asset_url('icons/icon-192x192.png')}">
     
     <!-- Icônes Android -->
-    <link rel="icon" type="image/png" sizes="192x192" href="/static/icons/icon-192x192.png">
-    <link rel="icon" type="image/png" sizes="512x512" href="/static/icons/icon-512x512.png">
+    <link rel="icon" type="image/png" sizes="192x192" href="{asset_url('icons/icon-192x192.png')}">
+    <link rel="icon" type="image/png" sizes="512x512" href="{asset_url('icons/icon-512x512.png')}">
     
     <!-- Splash screens iOS -->
     <meta name="apple-mobile-web-app-status-bar-style" content="black-translucent">
-    <link rel="apple-touch-startup-image" href="/static/icons/icon-512x512.png">
+    <link rel="apple-touch-startup-image" href="{asset_url('icons/icon-512x512.png')}">
     """
     
     st.markdown(pwa_meta, unsafe_allow_html=True)
@@ -397,166 +275,65 @@ def add_pwa_meta_tags():
 def show_pwa_status():
     """Affiche le statut PWA dans l'interface"""
     
-    status_html = """
-    <div id="pwa-status" style="
-        position: fixed;
-        bottom: 20px;
-        right: 20px;
-        background: rgba(255, 255, 255, 0.9);
-        backdrop-filter: blur(10px);
-        border: 1px solid #E2E8F0;
-        border-radius: 8px;
-        padding: 0.75rem;
-        font-size: 0.8rem;
-        color: #64748B;
-        z-index: 1000;
-        display: none;
-    ">
-        <div id="pwa-online-status">🟢 En ligne</div>
-        <div id="pwa-install-status">📱 PWA prête</div>
-    </div>
-    
-    <script>
-        // Afficher le statut PWA en mode développement
-        if (window.location.hostname === 'localhost' || window.location.hostname === '127.0.0.1') {
-            document.getElementById('pwa-status').style.display = 'block';
-            
-            // Mettre à jour le statut en temps réel
-            setInterval(() => {
-                const onlineStatus = document.getElementById('pwa-online-status');
-                const installStatus = document.getElementById('pwa-install-status');
-                
-                if (onlineStatus) {
-                    onlineStatus.textContent = navigator.onLine ? '🟢 En ligne' : '🔴 Hors ligne';
-                }
-                
-                if (installStatus && window.PWA) {
-                    installStatus.textContent = window.PWA.isInstalled() ? '📱 Installée' : '📱 PWA prête';
-                }
-            }, 1000);
-        }
-    </script>
-    """
-    
-    st.components.v1.html(status_html, height=0)
+    # Affichage en mode développement uniquement (static/js/pwa-status.js)
+    st.components.v1.html(_script_loader("js/pwa-status.js"), height=0)
 
-def create_offline_fallback():
-    """Crée une page de fallback pour le mode hors ligne"""
-    
-    offline_html = """
-    <!DOCTYPE html>
-    <html lang="fr">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Medical Center - Mode Hors Ligne</title>
-        <style>
-            body {
-                font-family: 'Inter', sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                margin: 0;
-                padding: 20px;
-                min-height: 100vh;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-            }
-            .container {
-                background: white;
-                border-radius: 16px;
-                padding: 3rem;
-                text-align: center;
-                box-shadow: 0 10px 25px -5px rgba(0, 0, 0, 0.1);
-                max-width: 500px;
-            }
-            .icon {
-                font-size: 4rem;
-                margin-bottom: 1rem;
-            }
-            .title {
-                font-size: 2rem;
-                font-weight: 700;
-                color: #4F46E5;
-                margin-bottom: 1rem;
-            }
-            .message {
-                color: #64748B;
-                line-height: 1.6;
-                margin-bottom: 2rem;
-            }
-            .button {
-                background: #4F46E5;
-                color: white;
-                padding: 12px 24px;
-                border: none;
-                border-radius: 8px;
-                font-weight: 600;
-                cursor: pointer;
-                transition: background 0.3s ease;
-                margin: 0.5rem;
-            }
-            .button:hover {
-                background: #3730A3;
-            }
-            .features {
-                text-align: left;
-                margin-top: 2rem;
-                padding: 1rem;
-                background: #F8FAFC;
-                border-radius: 8px;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="icon">📱</div>
-            <h1 class="title">Mode Hors Ligne</h1>
-            <p class="message">
-                Vous utilisez actuellement l'application en mode hors ligne. 
-                Certaines fonctionnalités sont limitées pour garantir la sécurité des données médicales.
-            </p>
-            
-            <div class="features">
-                <h3 style="color: #4F46E5; margin-top: 0;">Fonctionnalités disponibles hors ligne:</h3>
-                <ul style="color: #64748B;">
-                    <li>✅ Consultation des informations générales</li>
-                    <li>✅ Lecture de la documentation</li>
-                    <li>✅ Accès aux pages d'aide</li>
-                </ul>
-                
-                <h3 style="color: #F59E0B;">Nécessite une connexion:</h3>
-                <ul style="color: #64748B;">
-                    <li>🔒 Analyse d'images médicales</li>
-                    <li>🔒 Génération de rapports PDF</li>
-                    <li>🔒 Envoi de formulaires de contact</li>
-                </ul>
-            </div>
-            
-            <button class="button" onclick="window.location.reload()">
-                🔄 Vérifier la connexion
-            </button>
-            
-            <button class="button" onclick="history.back()">
-                ← Retour
-            </button>
-        </div>
-        
-        <script>
-            // Vérifier périodiquement la connexion
-            setInterval(() => {
-                if (navigator.onLine) {
-                    window.location.reload();
-                }
-            }, 5000);
-        </script>
-    </body>
-    </html>
+# Composant de chargement d'image réduisant l'image dans le navigateur
+_image_upload_component = components.declare_component(
+    "image_upload", path=str(STATIC_DIR / "components" / "image_upload")
+)
+
+class ClientUpload(io.BytesIO):
+    """Image reçue du composant de chargement (interface d'un UploadedFile)"""
+
+    def __init__(self, data: bytes, header: dict):
+        super().__init__(data)
+        self.file_id = header['id']
+        self.name = header['name']
+        self.type = header.get('type', '')
+        self.size = len(data)
+        self.original_name = header.get('original_name', self.name)
+        self.original_size = int(header.get('original_size', self.size))
+
+    @property
+    def saved_bytes(self) -> int:
+        """Octets économisés par la réduction dans le navigateur"""
+        return max(0, self.original_size - self.size)
+
+def parse_client_upload(value: bytes) -> ClientUpload:
+    """Décode la valeur du composant : longueur d'en-tête, en-tête JSON, image"""
+    if len(value) < 4:
+        raise ValueError("Valeur de chargement tronquée")
+    (header_length,) = struct.unpack_from('>I', value)
+    header = json.loads(bytes(value[4:4 + header_length]).decode('utf-8'))
+    return ClientUpload(bytes(value[4 + header_length:]), header)
+
+def image_uploader(label: str, max_side: int = 1024, quality: float = 0.9,
+                   extensions=('.png', '.jpg', '.jpeg', '.bmp'), help: str = None,
+                   key: str = None) -> Optional[ClientUpload]:
+    """Chargement d'une image réduite à `max_side` pixels avant l'envoi
+
+    Le navigateur réencode l'image en JPEG lorsque cela réduit sa taille ;
+    sinon le fichier d'origine est envoyé tel quel. Le fichier reçu doit
+    toujours être validé côté serveur.
     """
-    
-    # Sauvegarder la page de fallback
-    offline_path = Path(__file__).parent / "static" / "offline.html"
-    with open(offline_path, 'w', encoding='utf-8') as f:
-        f.write(offline_html)
+    value = _image_upload_component(
+        label=label, max_side=max_side, quality=quality, extensions=sorted(extensions),
+        help=help, key=key, default=None
+    )
+    if not value:
+        return None
+
+    try:
+        upload = parse_client_upload(value)
+    except (ValueError, KeyError, struct.error) as e:
+        logger.warning(f"Invalid client upload: {e}")
+        return None
+
+    if upload.saved_bytes:
+        logger.info(f"Client-side downscaling saved {upload.saved_bytes} bytes "
+                    f"({upload.original_size} -> {upload.size})")
+    return upload
 
 def get_pwa_installation_guide():
     """Retourne le guide d'installation PWA"""
@@ -593,8 +370,8 @@ def get_pwa_installation_guide():
 def setup_pwa():
     """Configure tous les composants PWA"""
     
-    # Créer la page de fallback hors ligne
-    create_offline_fallback()
+    # Construire les fichiers fingerprintés (au premier appel seulement)
+    prepare_pwa_assets()
     
     # Ajouter les meta tags PWA
     add_pwa_meta_tags()
@@ -605,3 +382,6 @@ def setup_pwa():
     # Afficher le statut en mode développement
     show_pwa_status()
 
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(build_pwa_assets(), indent=2))
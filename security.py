@@ -9,14 +9,17 @@ import hashlib
 import hmac
 import secrets
 import time
+import threading
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 import shutil
 from typing import Tuple, Optional, Dict, Any
 import logging
+from audit import AuditLogWriter, get_audit_writer
 
 # Configuration du logging sécurisé
 logging.basicConfig(
@@ -28,30 +31,46 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Paramètres de hachage PBKDF2 (valeur historique, minimum accepté)
+HASH_ALGORITHM = 'pbkdf2_sha256'
+DEFAULT_HASH_ITERATIONS = 100000
+
+# Latence visée par hachage, en millisecondes : le nombre d'itérations du
+# service de hachage est calibré au démarrage (0 : DEFAULT_HASH_ITERATIONS)
+HASH_TARGET_MS = float(os.environ.get('MEDICAL_HASH_TARGET_MS', '50'))
+
+# Dérivation de la clé de chiffrement de session
+CIPHER_SALT = b'medical_app_salt_2024'
+
 class SecurityManager:
     """Gestionnaire de sécurité principal"""
     
-    def __init__(self):
-        self.session_key = self._generate_session_key()
-        self.cipher_suite = self._create_cipher()
+    def __init__(self, audit_writer: AuditLogWriter = None, access_log_size: int = 1000,
+                 session_key: bytes = None, hashing: 'HashingService' = None):
+        # Une clé fournie permet de relire des données chiffrées lors d'une session précédente
+        self.session_key = session_key or self._generate_session_key()
+        # PBKDF2 calculé par le service de hachage ; attendu au premier chiffrement
+        self._cipher_key = (hashing or get_hashing_service()).submit_derive(
+            self.session_key, CIPHER_SALT, DEFAULT_HASH_ITERATIONS
+        )
+        self._cipher_suite: Optional[Fernet] = None
         self.temp_dirs = set()
         self.file_hashes = {}
-        self.access_log = []
-        
+        # Entrées récentes uniquement ; l'historique complet est dans le journal d'audit
+        self.access_log = deque(maxlen=access_log_size)
+        self.audit = audit_writer or get_audit_writer()
+        self._audit_session_id = hashlib.sha256(self.session_key).hexdigest()[:16]
+    
     def _generate_session_key(self) -> bytes:
         """Génère une clé de session unique"""
         return secrets.token_bytes(32)
     
-    def _create_cipher(self) -> Fernet:
-        """Crée un chiffreur Fernet pour la session"""
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=b'medical_app_salt_2024',
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(self.session_key))
-        return Fernet(key)
+    @property
+    def cipher_suite(self) -> Fernet:
+        """Chiffreur Fernet de la session"""
+        if self._cipher_suite is None:
+            self._cipher_suite = Fernet(base64.urlsafe_b64encode(self._cipher_key.result()))
+        return self._cipher_suite
     
     def log_access(self, action: str, details: Dict[str, Any] = None):
         """Enregistre les accès pour audit"""
@@ -59,10 +78,10 @@ class SecurityManager:
             'timestamp': datetime.now().isoformat(),
             'action': action,
             'details': details or {},
-            'session_id': hashlib.sha256(self.session_key).hexdigest()[:16]
+            'session_id': self._audit_session_id
         }
         self.access_log.append(log_entry)
-        logger.info(f"Security log: {action}")
+        self.audit.enqueue(log_entry)
     
     def encrypt_data(self, data: bytes) -> bytes:
         """Chiffre des données en mémoire"""
@@ -278,12 +297,26 @@ class SecureFileManager:
             logger.warning(f"Secure delete failed for {file_path}: {e}")
 
 class SessionManager:
-    """Gestionnaire de sessions sécurisées"""
+    """Gestionnaire de sessions sécurisées
+
+    Les sessions sont rangées par dernier accès dans un OrderedDict : le délai
+    d'expiration étant le même pour toutes, la session en tête est toujours la
+    prochaine à expirer. Accès, expiration et éviction sont donc en O(1).
+    """
     
-    def __init__(self, security_manager: SecurityManager):
+    def __init__(self, security_manager: SecurityManager,
+                 session_timeout: timedelta = timedelta(hours=2),
+                 max_sessions: int = 10000,
+                 sweep_interval: float = 60.0):
         self.security = security_manager
-        self.sessions = {}
-        self.session_timeout = timedelta(hours=2)
+        self.sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self.session_timeout = session_timeout
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self._timeout_seconds = session_timeout.total_seconds()
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
     
     def create_session(self, user_id: str = None) -> str:
         """Crée une nouvelle session"""
@@ -291,12 +324,20 @@ class SessionManager:
         session_data = {
             'id': session_id,
             'created': datetime.now(),
-            'last_access': datetime.now(),
+            'last_access': time.monotonic(),
             'user_id': user_id or 'anonymous',
             'file_manager': None
         }
         
-        self.sessions[session_id] = session_data
+        evicted = []
+        with self._lock:
+            # Limite de capacité : éviction des sessions les moins récentes
+            while len(self.sessions) >= self.max_sessions:
+                evicted.append(self.sessions.popitem(last=False))
+            self.sessions[session_id] = session_data
+        
+        for evicted_id, evicted_session in evicted:
+            self._release_session(evicted_id, evicted_session, 'session_evicted')
         
         self.security.log_access('session_created', {
             'session_id': session_id[:16],
@@ -307,45 +348,87 @@ class SessionManager:
     
     def get_session(self, session_id: str) -> Optional[Dict]:
         """Récupère une session active"""
-        if session_id not in self.sessions:
-            return None
-        
-        session = self.sessions[session_id]
+        with self._lock:
+            # Heure lue sous le verrou : un accès ou un balayage concurrent ne peut pas s'intercaler
+            now = time.monotonic()
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            
+            # Vérifier l'expiration
+            if now - session['last_access'] > self._timeout_seconds:
+                del self.sessions[session_id]
+                expired = True
+            else:
+                # Mettre à jour le dernier accès
+                session['last_access'] = now
+                self.sessions.move_to_end(session_id)
+                expired = False
         
-        # Vérifier l'expiration
-        if datetime.now() - session['last_access'] > self.session_timeout:
-            self.cleanup_session(session_id)
+        if expired:
+            self._release_session(session_id, session, 'session_cleaned')
             return None
-        
-        # Mettre à jour le dernier accès
-        session['last_access'] = datetime.now()
         return session
     
     def cleanup_session(self, session_id: str):
         """Nettoie une session"""
-        if session_id in self.sessions:
-            session = self.sessions[session_id]
-            
-            # Nettoyer le gestionnaire de fichiers associé
-            if session.get('file_manager'):
-                session['file_manager'].cleanup()
-            
-            del self.sessions[session_id]
-            
-            self.security.log_access('session_cleaned', {
-                'session_id': session_id[:16]
-            })
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+        
+        if session is not None:
+            self._release_session(session_id, session, 'session_cleaned')
+    
+    def _release_session(self, session_id: str, session: Dict, action: str):
+        """Libère les ressources d'une session retirée de l'index"""
+        # Nettoyer le gestionnaire de fichiers associé
+        if session.get('file_manager'):
+            session['file_manager'].cleanup()
+        
+        self.security.log_access(action, {
+            'session_id': session_id[:16]
+        })
     
-    def cleanup_expired_sessions(self):
+    def cleanup_expired_sessions(self) -> int:
         """Nettoie toutes les sessions expirées"""
-        now = datetime.now()
-        expired_sessions = [
-            sid for sid, session in self.sessions.items()
-            if now - session['last_access'] > self.session_timeout
-        ]
+        expired = []
+        with self._lock:
+            deadline = time.monotonic() - self._timeout_seconds
+            # Seule la tête de l'index peut être expirée
+            while self.sessions:
+                session_id, session = next(iter(self.sessions.items()))
+                if session['last_access'] >= deadline:
+                    break
+                self.sessions.popitem(last=False)
+                expired.append((session_id, session))
+        
+        for session_id, session in expired:
+            self._release_session(session_id, session, 'session_cleaned')
         
-        for session_id in expired_sessions:
-            self.cleanup_session(session_id)
+        return len(expired)
+    
+    def start_sweeper(self):
+        """Démarre le nettoyage périodique des sessions expirées"""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop_event.clear()
+        self._sweeper = threading.Thread(
+            target=self._sweep_loop, name='session-sweeper', daemon=True
+        )
+        self._sweeper.start()
+    
+    def stop_sweeper(self):
+        """Arrête le nettoyage périodique"""
+        self._stop_event.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=self.sweep_interval)
+            self._sweeper = None
+    
+    def _sweep_loop(self):
+        while not self._stop_event.wait(self.sweep_interval):
+            try:
+                self.cleanup_expired_sessions()
+            except Exception as e:
+                logger.error(f"Session sweep error: {e}")
 
 class SecurityError(Exception):
     """Exception personnalisée pour les erreurs de sécurité"""
@@ -399,17 +482,149 @@ def generate_secure_token(length: int = 32) -> str:
     """Génère un token sécurisé"""
     return secrets.token_urlsafe(length)
 
-def hash_data(data: bytes, salt: bytes = None) -> str:
-    """Hash sécurisé des données"""
+def calibrate_iterations(target_seconds: float = HASH_TARGET_MS / 1000,
+                         minimum: int = DEFAULT_HASH_ITERATIONS,
+                         sample_iterations: int = 20000, samples: int = 3) -> int:
+    """Nombre d'itérations PBKDF2 atteignant la latence cible sur cette machine
+
+    La mesure la plus rapide est retenue (moins sensible à la charge du moment).
+    """
+    salt = secrets.token_bytes(16)
+    elapsed = float('inf')
+    for _ in range(samples):
+        start = time.perf_counter()
+        hashlib.pbkdf2_hmac('sha256', b'calibration', salt, sample_iterations)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    elapsed = max(elapsed, 1e-6)
+    
+    iterations = int(sample_iterations * target_seconds / elapsed)
+    iterations = (iterations // 1000) * 1000
+    return max(minimum, iterations)
+
+def hash_data(data: bytes, salt: bytes = None, iterations: int = None) -> str:
+    """Hash sécurisé des données
+
+    Le résultat encode ses paramètres : pbkdf2_sha256$<itérations>$<sel>$<hash>
+    """
     if salt is None:
         salt = secrets.token_bytes(16)
+    iterations = iterations or DEFAULT_HASH_ITERATIONS
+    
+    digest = hashlib.pbkdf2_hmac('sha256', data, salt, iterations).hex()
+    return f"{HASH_ALGORITHM}${iterations}${salt.hex()}${digest}"
+
+def _parse_hash(hash_value: str) -> Optional[Tuple[int, bytes, str]]:
+    """Décode un hash encodé en (itérations, sel, hash)"""
+    parts = hash_value.split('$')
+    if len(parts) != 4 or parts[0] != HASH_ALGORITHM:
+        return None
+    try:
+        return int(parts[1]), bytes.fromhex(parts[2]), parts[3]
+    except ValueError:
+        return None
+
+def verify_hash(data: bytes, hash_value: str, salt: bytes = None) -> bool:
+    """Vérifie un hash (format encodé ou ancien format hexadécimal)"""
+    parsed = _parse_hash(hash_value)
+    if parsed is not None:
+        iterations, salt, expected = parsed
+    elif salt is not None:
+        # Ancien format : hash hexadécimal seul, sel fourni séparément
+        iterations, expected = DEFAULT_HASH_ITERATIONS, hash_value
+    else:
+        return False
+    
+    computed = hashlib.pbkdf2_hmac('sha256', data, salt, iterations).hex()
+    return hmac.compare_digest(computed, expected)
+
+def needs_rehash(hash_value: str, iterations: int = DEFAULT_HASH_ITERATIONS) -> bool:
+    """Indique si un hash doit être recalculé avec les paramètres actuels"""
+    parsed = _parse_hash(hash_value)
+    return parsed is None or parsed[0] < iterations
+
+class HashingService:
+    """Service de hachage exécuté dans un pool de threads dédié
+
+    PBKDF2 libère le GIL pendant le calcul : les hachages s'exécutent hors
+    du thread de la session Streamlit. Le nombre de threads et de demandes
+    en attente est borné pour qu'une rafale de vérifications ne prive pas
+    l'inférence du processeur ; au-delà, les demandes sont refusées.
+    """
+    
+    def __init__(self, max_workers: int = None, max_pending: int = 64,
+                 iterations: int = None, target_seconds: float = None):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 4)
+        self.max_pending = max_pending
+        if iterations is None:
+            iterations = (calibrate_iterations(target_seconds)
+                          if target_seconds else DEFAULT_HASH_ITERATIONS)
+        self.iterations = iterations
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix='hashing'
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._stats_lock = threading.Lock()
+        self.rejected = 0
+    
+    def _submit(self, func, *args, block: bool = False) -> Future:
+        """Soumet un calcul si une place est disponible (ou attend une place)"""
+        if not self._slots.acquire(blocking=block):
+            with self._stats_lock:
+                self.rejected += 1
+            raise SecurityError("Service de hachage saturé, veuillez réessayer")
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+    
+    def submit_hash(self, data: bytes, salt: bytes = None) -> Future:
+        """Hache des données en arrière-plan"""
+        return self._submit(hash_data, data, salt, self.iterations)
+    
+    def submit_verify(self, data: bytes, hash_value: str, salt: bytes = None) -> Future:
+        """Vérifie un hash en arrière-plan"""
+        return self._submit(verify_hash, data, hash_value, salt)
+    
+    def submit_derive(self, secret: bytes, salt: bytes, iterations: int,
+                      length: int = 32) -> Future:
+        """Dérive une clé (PBKDF2-HMAC-SHA256) en arrière-plan
+
+        Une session ne peut pas fonctionner sans sa clé : la demande attend
+        une place au lieu d'être refusée.
+        """
+        return self._submit(hashlib.pbkdf2_hmac, 'sha256', secret, salt, iterations, length,
+                            block=True)
+    
+    async def hash(self, data: bytes, salt: bytes = None) -> str:
+        """Version awaitable de submit_hash"""
+        return await asyncio.wrap_future(self.submit_hash(data, salt))
+    
+    async def verify(self, data: bytes, hash_value: str, salt: bytes = None) -> bool:
+        """Version awaitable de submit_verify"""
+        return await asyncio.wrap_future(self.submit_verify(data, hash_value, salt))
+    
+    def needs_rehash(self, hash_value: str) -> bool:
+        """Indique si un hash a été calculé avec un coût inférieur à l'actuel"""
+        return needs_rehash(hash_value, self.iterations)
     
-    return hashlib.pbkdf2_hmac('sha256', data, salt, 100000).hex()
+    def shutdown(self, wait: bool = True):
+        """Arrête le pool de threads"""
+        self._executor.shutdown(wait=wait)
 
-def verify_hash(data: bytes, hash_value: str, salt: bytes) -> bool:
-    """Vérifie un hash"""
-    return hmac.compare_digest(
-        hash_data(data, salt),
-        hash_value
-    )
+_default_hashing: Optional[HashingService] = None
+_default_hashing_lock = threading.Lock()
 
+def get_hashing_service() -> HashingService:
+    """Retourne le service de hachage partagé par le processus"""
+    global _default_hashing
+    with _default_hashing_lock:
+        if _default_hashing is None:
+            _default_hashing = HashingService(
+                target_seconds=HASH_TARGET_MS / 1000 if HASH_TARGET_MS > 0 else None
+            )
+            logger.info(f"Hashing service: {_default_hashing.iterations} PBKDF2 iterations "
+                        f"(target {HASH_TARGET_MS:g} ms)")
+        return _default_hashing
@@ -0,0 +1,111 @@
+"""
+Point d'entrée de l'application avec le serveur ASGI de Streamlit (st.App)
+Sert les fichiers PWA fingerprintés avec un cache immuable et leurs variantes
+précompressées, le service worker à la racine du site, et annonce la police de
+l'application dès la réponse HTML (en-tête Link)
+Usage : streamlit run server.py
+"""
+
+import os
+import mimetypes
+
+# Le service worker est servi à la racine : app.py peut l'enregistrer
+os.environ.setdefault('MEDICAL_SERVICE_WORKER_URL', '/sw.js')
+
+import streamlit as st
+
+# st.App (et Starlette) n'existent que dans les versions récentes de Streamlit ;
+# requirements.txt n'impose que le minimum nécessaire à app.py
+if not hasattr(st, "App"):
+    raise ImportError(
+        f"server.py nécessite une version de Streamlit fournissant st.App "
+        f"(version installée : {st.__version__}). Mettre Streamlit à jour "
+        f"ou lancer directement : streamlit run app.py"
+    )
+
+from starlette.datastructures import MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.responses import FileResponse
+from starlette.routing import Route
+
+from pwa_integration import BUILD_PATH, build_pwa_assets
+from static_assets import APP_FONT, STATIC_URL_PREFIX
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Fichiers du build dont le nom ne contient pas d'empreinte
+UNVERSIONED_FILES = {"sw.js", "asset-manifest.json"}
+
+# Variantes précompressées, par ordre de préférence
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Préchargement de la police : l'index de Streamlit ne peut pas recevoir de
+# <link rel="preload">, l'en-tête équivalent part avec la page
+FONT_PRELOAD_LINK = (f'<{STATIC_URL_PREFIX}{APP_FONT}>; rel=preload; as=font; '
+                     f'type="font/woff2"; crossorigin')
+
+async def build_asset(request):
+    """Fichier de static/build/, précompressé selon Accept-Encoding"""
+    relative_path = request.path_params["path"]
+    path = (BUILD_PATH / relative_path).resolve()
+    if BUILD_PATH.resolve() not in path.parents or not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    if path.suffix in (".gz", ".br"):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    headers = {
+        "Cache-Control": ("no-cache" if relative_path in UNVERSIONED_FILES
+                          else IMMUTABLE_CACHE_CONTROL),
+        "Vary": "Accept-Encoding",
+        "X-Content-Type-Options": "nosniff",
+    }
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    accepted = request.headers.get("accept-encoding", "")
+    for encoding, suffix in ENCODINGS:
+        compressed = path.with_name(path.name + suffix)
+        if encoding in accepted and compressed.is_file():
+            headers["Content-Encoding"] = encoding
+            return FileResponse(compressed, media_type=media_type, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+async def service_worker(request):
+    """Service worker du build, servi à la racine pour contrôler toute l'application"""
+    return FileResponse(
+        BUILD_PATH / "sw.js",
+        media_type="text/javascript",
+        headers={"Cache-Control": "no-cache", "Service-Worker-Allowed": "/"},
+    )
+
+class FontPreloadMiddleware:
+    """Ajoute l'en-tête Link de préchargement de la police aux réponses HTML"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_preload(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if headers.get("content-type", "").startswith("text/html"):
+                    headers.append("Link", FONT_PRELOAD_LINK)
+            await send(message)
+
+        await self.app(scope, receive, send_with_preload)
+
+# Le build doit exister avant le premier chargement de page
+build_pwa_assets()
+
+app = st.App(
+    "app.py",
+    routes=[
+        Route("/sw.js", service_worker),
+        # Prioritaire sur le service statique de Streamlit (sans en-têtes de cache)
+        Route("/app/static/build/{path:path}", build_asset),
+    ],
+    middleware=[Middleware(FontPreloadMiddleware)],
+)
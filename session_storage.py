@@ -0,0 +1,278 @@
+"""
+Module de gestion du stockage temporaire par session
+Zones de stockage à compteur de références, nettoyage en arrière-plan
+et validation des fichiers uploadés
+"""
+
+import os
+import hashlib
+import shutil
+import tempfile
+import secrets
+import threading
+import time
+import atexit
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+class StorageArea:
+    """Zone de stockage temporaire propre à une session"""
+
+    def __init__(self, session_id: str, path: str):
+        self.session_id = session_id
+        self.path = path
+        self.refcount = 0
+        self.bytes_used = 0
+        self.last_access = time.monotonic()
+        self.materialized = False
+        self.discarded = False
+
+class SessionStorageManager:
+    """Gestionnaire du cycle de vie des zones de stockage des sessions
+
+    Chaque session Streamlit obtient sa propre zone, créée sur disque
+    uniquement lors de la première écriture. Les zones utilisées par une
+    opération en cours (compteur de références > 0) ne sont jamais
+    supprimées ; les autres sont récupérées par un thread de nettoyage
+    selon leur durée d'inactivité et le budget disque global.
+    """
+
+    def __init__(self, root: str = None, ttl_seconds: float = 30 * 60,
+                 max_total_bytes: int = 512 * 1024 * 1024,
+                 janitor_interval: float = 60.0):
+        self.root = root or tempfile.mkdtemp(prefix='medical_sessions_')
+        self.ttl_seconds = ttl_seconds
+        self.max_total_bytes = max_total_bytes
+        self.janitor_interval = janitor_interval
+        self._areas: Dict[str, StorageArea] = {}
+        self._retired: List[StorageArea] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._janitor: Optional[threading.Thread] = None
+        self.reclaimed_areas = 0
+        self.reclaimed_bytes = 0
+
+    def _get_area(self, session_id: str) -> StorageArea:
+        """Retourne la zone active de la session (appel sous verrou)"""
+        area = self._areas.get(session_id)
+        if area is None or area.discarded:
+            if area is not None:
+                self._retired.append(area)
+            path = os.path.join(self.root, f"{session_id[:16]}_{secrets.token_hex(4)}")
+            area = StorageArea(session_id, path)
+            self._areas[session_id] = area
+        return area
+
+    def touch(self, session_id: str) -> StorageArea:
+        """Marque la session comme active (aucun accès disque)"""
+        with self._lock:
+            area = self._get_area(session_id)
+            area.last_access = time.monotonic()
+            return area
+
+    def acquire(self, session_id: str) -> StorageArea:
+        """Prend une référence sur la zone de la session"""
+        with self._lock:
+            area = self._get_area(session_id)
+            area.refcount += 1
+            area.last_access = time.monotonic()
+            return area
+
+    def release(self, area: StorageArea):
+        """Libère une référence prise avec acquire()"""
+        with self._lock:
+            area.refcount = max(0, area.refcount - 1)
+            area.last_access = time.monotonic()
+
+    @contextmanager
+    def lease(self, session_id: str) -> Iterator[StorageArea]:
+        """Donne accès à la zone de la session, créée sur disque si besoin"""
+        area = self.acquire(session_id)
+        try:
+            if not area.materialized:
+                os.makedirs(area.path, mode=0o700, exist_ok=True)
+                area.materialized = True
+            yield area
+        finally:
+            self.release(area)
+
+    def record_write(self, area: StorageArea, size: int):
+        """Comptabilise les octets écrits dans une zone"""
+        with self._lock:
+            area.bytes_used += size
+
+    def discard(self, session_id: str):
+        """Demande la suppression de la zone dès qu'elle n'est plus utilisée"""
+        with self._lock:
+            area = self._areas.get(session_id)
+            if area is not None:
+                area.discarded = True
+
+    def reclaim(self) -> int:
+        """Supprime les zones expirées ou excédant le budget disque"""
+        now = time.monotonic()
+        victims: List[StorageArea] = []
+
+        with self._lock:
+            # Zones remplacées après un discard() et plus référencées
+            victims.extend(a for a in self._retired if a.refcount == 0)
+            self._retired = [a for a in self._retired if a.refcount]
+
+            # Zones abandonnées ou inactives depuis trop longtemps
+            idle = [a for a in self._areas.values() if a.refcount == 0]
+            for area in idle:
+                if area.discarded or now - area.last_access > self.ttl_seconds:
+                    victims.append(area)
+
+            # Budget disque : éviction des zones les moins récemment utilisées
+            chosen = {id(a) for a in victims}
+            total = sum(a.bytes_used for a in self._areas.values() if id(a) not in chosen)
+            total += sum(a.bytes_used for a in self._retired)
+            if total > self.max_total_bytes:
+                candidates = sorted(
+                    (a for a in idle if id(a) not in chosen and a.bytes_used),
+                    key=lambda a: a.last_access
+                )
+                for area in candidates:
+                    if total <= self.max_total_bytes:
+                        break
+                    victims.append(area)
+                    total -= area.bytes_used
+
+            for area in victims:
+                if self._areas.get(area.session_id) is area:
+                    del self._areas[area.session_id]
+
+        # Suppression sur disque hors du verrou
+        for area in victims:
+            if area.materialized:
+                self._delete_area(area)
+            self.reclaimed_areas += 1
+            self.reclaimed_bytes += area.bytes_used
+
+        return len(victims)
+
+    def _delete_area(self, area: StorageArea):
+        """Suppression sécurisée du contenu d'une zone"""
+        try:
+            for root, dirs, files in os.walk(area.path):
+                for file in files:
+                    self._secure_delete(os.path.join(root, file))
+            shutil.rmtree(area.path, ignore_errors=True)
+            logger.info(f"Storage area reclaimed: {area.path}")
+        except Exception as e:
+            logger.error(f"Storage reclaim error for {area.path}: {e}")
+
+    def _secure_delete(self, file_path: str):
+        """Écrase puis supprime un fichier"""
+        try:
+            file_size = os.path.getsize(file_path)
+            with open(file_path, 'r+b') as f:
+                f.write(secrets.token_bytes(file_size))
+                f.flush()
+                os.fsync(f.fileno())
+            os.remove(file_path)
+        except Exception as e:
+            logger.warning(f"Secure delete failed for {file_path}: {e}")
+
+    def start_janitor(self):
+        """Démarre le thread de nettoyage en arrière-plan"""
+        if self._janitor is not None and self._janitor.is_alive():
+            return
+        self._stop_event.clear()
+        self._janitor = threading.Thread(
+            target=self._janitor_loop, name='storage-janitor', daemon=True
+        )
+        self._janitor.start()
+        atexit.register(self.shutdown)
+
+    def _janitor_loop(self):
+        while not self._stop_event.wait(self.janitor_interval):
+            try:
+                self.reclaim()
+            except Exception as e:
+                logger.error(f"Storage janitor error: {e}")
+
+    def shutdown(self):
+        """Arrête le nettoyage et supprime toutes les zones"""
+        self._stop_event.set()
+        with self._lock:
+            areas = list(self._areas.values()) + self._retired
+            self._areas.clear()
+            self._retired = []
+        for area in areas:
+            if area.materialized:
+                self._delete_area(area)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques d'utilisation du stockage"""
+        with self._lock:
+            return {
+                'areas': len(self._areas),
+                'in_use': sum(1 for a in self._areas.values() if a.refcount),
+                'bytes_used': sum(a.bytes_used for a in self._areas.values()),
+                'reclaimed_areas': self.reclaimed_areas,
+                'reclaimed_bytes': self.reclaimed_bytes
+            }
+
+class SecureFileManager:
+    """Validation des uploads et fichiers temporaires d'une session
+
+    Sans gestionnaire de stockage, seule la validation est disponible
+    (utilisation hors interface, par exemple en ligne de commande).
+    """
+
+    def __init__(self, storage: SessionStorageManager = None, session_id: str = None):
+        self.storage = storage
+        self.session_id = session_id
+        self.allowed_extensions = {'.png', '.jpg', '.jpeg', '.bmp'}
+        self.max_file_size = 10 * 1024 * 1024  # 10MB
+
+    @property
+    def temp_dir(self) -> str:
+        """Répertoire temporaire propre à la session"""
+        return self.storage.touch(self.session_id).path
+
+    def validate_file(self, uploaded_file) -> Tuple[bool, str]:
+        """Valide le fichier uploadé"""
+        if uploaded_file is None:
+            return False, "Aucun fichier sélectionné"
+
+        return self.validate_bytes(uploaded_file.name, len(uploaded_file.getvalue()))
+
+    def validate_bytes(self, name: str, size: int) -> Tuple[bool, str]:
+        """Valide un fichier d'après son nom et sa taille"""
+        # Vérifier l'extension
+        file_ext = os.path.splitext(name)[1].lower()
+        if file_ext not in self.allowed_extensions:
+            return False, f"Extension non autorisée. Extensions acceptées: {', '.join(self.allowed_extensions)}"
+
+        # Vérifier la taille
+        if size > self.max_file_size:
+            return False, f"Fichier trop volumineux. Taille maximale: {self.max_file_size // (1024*1024)}MB"
+
+        return True, "Fichier valide"
+
+    def save_temp_file(self, uploaded_file) -> str:
+        """Sauvegarde temporaire sécurisée"""
+        file_data = uploaded_file.getvalue()
+        file_hash = hashlib.md5(file_data).hexdigest()
+        file_ext = os.path.splitext(uploaded_file.name)[1].lower()
+        temp_filename = f"{file_hash}{file_ext}"
+
+        # La zone reste référencée pendant l'écriture
+        with self.storage.lease(self.session_id) as area:
+            temp_path = os.path.join(area.path, temp_filename)
+            with open(temp_path, 'wb') as f:
+                f.write(file_data)
+            self.storage.record_write(area, len(file_data))
+
+        return temp_path
+
+    def cleanup(self):
+        """Libère la zone temporaire de la session"""
+        self.storage.discard(self.session_id)
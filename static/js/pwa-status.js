@@ -0,0 +1,43 @@
+/*
+ * Indicateur de statut PWA (affiché uniquement en développement local)
+ */
+
+if (window.location.hostname === 'localhost' || window.location.hostname === '127.0.0.1') {
+    let status = document.getElementById('pwa-status');
+    if (!status) {
+        status = document.createElement('div');
+        status.id = 'pwa-status';
+        status.style.cssText = `
+            position: fixed;
+            bottom: 20px;
+            right: 20px;
+            background: rgba(255, 255, 255, 0.9);
+            backdrop-filter: blur(10px);
+            border: 1px solid #E2E8F0;
+            border-radius: 8px;
+            padding: 0.75rem;
+            font-size: 0.8rem;
+            color: #64748B;
+            z-index: 1000;
+        `;
+        status.innerHTML = `
+            <div id="pwa-online-status">🟢 En ligne</div>
+            <div id="pwa-install-status">📱 PWA prête</div>
+        `;
+        document.body.appendChild(status);
+    }
+
+    // Mettre à jour le statut en temps réel
+    setInterval(() => {
+        const onlineStatus = document.getElementById('pwa-online-status');
+        const installStatus = document.getElementById('pwa-install-status');
+
+        if (onlineStatus) {
+            onlineStatus.textContent = navigator.onLine ? '🟢 En ligne' : '🔴 Hors ligne';
+        }
+
+        if (installStatus && window.PWA) {
+            installStatus.textContent = window.PWA.isInstalled() ? '📱 Installée' : '📱 PWA prête';
+        }
+    }, 1000);
+}
@@ -0,0 +1,366 @@
+/*
+ * Intégration PWA de l'application médicale
+ * Chargé une seule fois par le navigateur puis servi depuis son cache
+ */
+
+// Configuration PWA : URLs fingerprintées fournies par la balise de chargement
+// (pwa_integration.py) ; sans URL de service worker, aucun n'est enregistré
+const PWA_SCRIPT_DATA = document.currentScript ? document.currentScript.dataset : {};
+const PWA_CONFIG = {
+    manifestPath: PWA_SCRIPT_DATA.manifest || '/static/manifest.json',
+    swPath: PWA_SCRIPT_DATA.sw || '',
+    enableNotifications: false,
+    enableBackgroundSync: false
+};
+
+// Vérification du support PWA
+function checkPWASupport() {
+    const support = {
+        serviceWorker: 'serviceWorker' in navigator,
+        manifest: 'manifest' in document.createElement('link'),
+        notifications: 'Notification' in window,
+        pushManager: 'PushManager' in window
+    };
+
+    console.log('Support PWA:', support);
+    return support;
+}
+
+// Installation du Service Worker
+async function installServiceWorker() {
+    if (!('serviceWorker' in navigator)) {
+        console.warn('Service Worker non supporté');
+        return false;
+    }
+
+    if (!PWA_CONFIG.swPath) {
+        console.log('Service Worker désactivé (non servi à la racine du site)');
+        return false;
+    }
+
+    try {
+        const registration = await navigator.serviceWorker.register(PWA_CONFIG.swPath, { scope: '/' });
+        console.log('Service Worker enregistré:', registration);
+
+        // Écouter les mises à jour
+        registration.addEventListener('updatefound', () => {
+            console.log('Mise à jour du Service Worker disponible');
+            const newWorker = registration.installing;
+
+            newWorker.addEventListener('statechange', () => {
+                if (newWorker.state === 'installed' && navigator.serviceWorker.controller) {
+                    showUpdateNotification();
+                }
+            });
+        });
+
+        return true;
+    } catch (error) {
+        console.error('Erreur lors de l\'enregistrement du Service Worker:', error);
+        return false;
+    }
+}
+
+// Afficher notification de mise à jour
+function showUpdateNotification() {
+    const notification = document.createElement('div');
+    notification.innerHTML = `
+        <div style="
+            position: fixed;
+            top: 20px;
+            right: 20px;
+            background: #4F46E5;
+            color: white;
+            padding: 1rem;
+            border-radius: 8px;
+            box-shadow: 0 4px 12px rgba(0,0,0,0.2);
+            z-index: 10000;
+            max-width: 300px;
+        ">
+            <div style="font-weight: 600; margin-bottom: 0.5rem;">
+                🔄 Mise à jour disponible
+            </div>
+            <div style="font-size: 0.9rem; margin-bottom: 1rem;">
+                Une nouvelle version de l'application est disponible.
+            </div>
+            <button onclick="updateApp()" style="
+                background: white;
+                color: #4F46E5;
+                border: none;
+                padding: 0.5rem 1rem;
+                border-radius: 4px;
+                font-weight: 600;
+                cursor: pointer;
+                margin-right: 0.5rem;
+            ">
+                Mettre à jour
+            </button>
+            <button onclick="this.parentElement.parentElement.remove()" style="
+                background: transparent;
+                color: white;
+                border: 1px solid white;
+                padding: 0.5rem 1rem;
+                border-radius: 4px;
+                cursor: pointer;
+            ">
+                Plus tard
+            </button>
+        </div>
+    `;
+    document.body.appendChild(notification);
+}
+
+// Mettre à jour l'application
+function updateApp() {
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.getRegistration().then(registration => {
+            if (registration && registration.waiting) {
+                registration.waiting.postMessage({ type: 'SKIP_WAITING' });
+                window.location.reload();
+            }
+        });
+    }
+}
+
+// Gestion de l'installation PWA
+let deferredPrompt;
+
+window.addEventListener('beforeinstallprompt', (e) => {
+    console.log('Événement beforeinstallprompt déclenché');
+    e.preventDefault();
+    deferredPrompt = e;
+    showInstallButton();
+});
+
+function showInstallButton() {
+    // Vérifier si déjà installé
+    if (window.matchMedia('(display-mode: standalone)').matches) {
+        console.log('Application déjà installée');
+        return;
+    }
+
+    const installButton = document.createElement('div');
+    installButton.innerHTML = `
+        <div id="pwa-install-banner" style="
+            position: fixed;
+            bottom: 20px;
+            left: 50%;
+            transform: translateX(-50%);
+            background: linear-gradient(135deg, #4F46E5, #7C3AED);
+            color: white;
+            padding: 1rem 1.5rem;
+            border-radius: 12px;
+            box-shadow: 0 8px 25px rgba(79, 70, 229, 0.3);
+            z-index: 10000;
+            display: flex;
+            align-items: center;
+            gap: 1rem;
+            max-width: 90vw;
+            animation: slideUp 0.3s ease-out;
+        ">
+            <div style="font-size: 1.5rem;">📱</div>
+            <div>
+                <div style="font-weight: 600; margin-bottom: 0.25rem;">
+                    Installer l'application
+                </div>
+                <div style="font-size: 0.9rem; opacity: 0.9;">
+                    Accès rapide depuis votre écran d'accueil
+                </div>
+            </div>
+            <button onclick="installPWA()" style="
+                background: white;
+                color: #4F46E5;
+                border: none;
+                padding: 0.75rem 1.5rem;
+                border-radius: 8px;
+                font-weight: 600;
+                cursor: pointer;
+                transition: transform 0.2s ease;
+            " onmouseover="this.style.transform='scale(1.05)'" onmouseout="this.style.transform='scale(1)'">
+                Installer
+            </button>
+            <button onclick="document.getElementById('pwa-install-banner').remove()" style="
+                background: transparent;
+                color: white;
+                border: none;
+                padding: 0.5rem;
+                cursor: pointer;
+                font-size: 1.2rem;
+            ">
+                ✕
+            </button>
+        </div>
+        <style>
+            @keyframes slideUp {
+                from { transform: translateX(-50%) translateY(100%); opacity: 0; }
+                to { transform: translateX(-50%) translateY(0); opacity: 1; }
+            }
+        </style>
+    `;
+    document.body.appendChild(installButton);
+}
+
+async function installPWA() {
+    if (!deferredPrompt) {
+        console.log('Prompt d\'installation non disponible');
+        return;
+    }
+
+    try {
+        deferredPrompt.prompt();
+        const { outcome } = await deferredPrompt.userChoice;
+
+        if (outcome === 'accepted') {
+            console.log('Installation acceptée');
+            document.getElementById('pwa-install-banner')?.remove();
+        } else {
+            console.log('Installation refusée');
+        }
+
+        deferredPrompt = null;
+    } catch (error) {
+        console.error('Erreur lors de l\'installation:', error);
+    }
+}
+
+// Gestion du mode hors ligne
+function handleOnlineStatus() {
+    const updateOnlineStatus = () => {
+        const status = navigator.onLine ? 'en ligne' : 'hors ligne';
+        console.log('Statut réseau:', status);
+
+        if (!navigator.onLine) {
+            showOfflineNotification();
+        } else {
+            hideOfflineNotification();
+        }
+    };
+
+    window.addEventListener('online', updateOnlineStatus);
+    window.addEventListener('offline', updateOnlineStatus);
+    updateOnlineStatus();
+}
+
+function showOfflineNotification() {
+    if (document.getElementById('offline-notification')) return;
+
+    const notification = document.createElement('div');
+    notification.id = 'offline-notification';
+    notification.innerHTML = `
+        <div style="
+            position: fixed;
+            top: 0;
+            left: 0;
+            right: 0;
+            background: #F59E0B;
+            color: white;
+            padding: 0.75rem;
+            text-align: center;
+            z-index: 10001;
+            font-weight: 600;
+        ">
+            📡 Mode hors ligne - Fonctionnalités limitées
+        </div>
+    `;
+    document.body.appendChild(notification);
+
+    // Ajuster le padding du body
+    document.body.style.paddingTop = '50px';
+}
+
+function hideOfflineNotification() {
+    const notification = document.getElementById('offline-notification');
+    if (notification) {
+        notification.remove();
+        document.body.style.paddingTop = '0';
+    }
+}
+
+// Initialisation PWA
+function initPWA() {
+    console.log('Initialisation PWA...');
+
+    const support = checkPWASupport();
+
+    if (support.serviceWorker) {
+        installServiceWorker();
+    }
+
+    handleOnlineStatus();
+
+    // Ajouter les meta tags pour PWA si manquants
+    addPWAMetaTags();
+
+    console.log('PWA initialisée');
+}
+
+function addPWAMetaTags() {
+    const metaTags = [
+        { name: 'mobile-web-app-capable', content: 'yes' },
+        { name: 'apple-mobile-web-app-capable', content: 'yes' },
+        { name: 'apple-mobile-web-app-status-bar-style', content: 'default' },
+        { name: 'apple-mobile-web-app-title', content: 'Medical AI' },
+        { name: 'application-name', content: 'Medical AI' },
+        { name: 'msapplication-TileColor', content: '#4F46E5' },
+        { name: 'theme-color', content: '#4F46E5' }
+    ];
+
+    metaTags.forEach(tag => {
+        if (!document.querySelector(`meta[name="${tag.name}"]`)) {
+            const meta = document.createElement('meta');
+            meta.name = tag.name;
+            meta.content = tag.content;
+            document.head.appendChild(meta);
+        }
+    });
+
+    // Ajouter le lien vers le manifest si manquant
+    if (!document.querySelector('link[rel="manifest"]')) {
+        const link = document.createElement('link');
+        link.rel = 'manifest';
+        link.href = PWA_CONFIG.manifestPath;
+        document.head.appendChild(link);
+    }
+}
+
+// Démarrer l'initialisation quand le DOM est prêt
+if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', initPWA);
+} else {
+    initPWA();
+}
+
+// Fonctions utilitaires pour Streamlit
+window.PWA = {
+    isInstalled: () => window.matchMedia('(display-mode: standalone)').matches,
+    isOnline: () => navigator.onLine,
+    clearCache: () => {
+        if ('serviceWorker' in navigator) {
+            navigator.serviceWorker.getRegistration().then(registration => {
+                if (registration && registration.active) {
+                    registration.active.postMessage({ type: 'CLEAR_CACHE' });
+                }
+            });
+        }
+    },
+    // Statistiques des caches du service worker (nombre d'entrées, octets, évictions)
+    getCacheStats: () => {
+        if (!('serviceWorker' in navigator) || !navigator.serviceWorker.controller) {
+            return Promise.resolve(null);
+        }
+        return new Promise(resolve => {
+            const channel = new MessageChannel();
+            channel.port1.onmessage = event => resolve(event.data.stats);
+            navigator.serviceWorker.controller.postMessage({ type: 'GET_CACHE_STATS' }, [channel.port2]);
+        });
+    },
+    checkForUpdates: () => {
+        if ('serviceWorker' in navigator) {
+            navigator.serviceWorker.getRegistration().then(registration => {
+                if (registration) {
+                    registration.update();
+                }
+            });
+        }
+    }
+};
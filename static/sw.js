@@ -1,24 +1,88 @@
 // Service Worker pour Medical Center - Diagnostic IA
-// Version 1.0.0
+// Modèle : build_pwa_assets() (pwa_integration.py) remplace la version et les
+// manifests de précache, puis écrit le résultat dans static/build/sw.js
 
-const CACHE_NAME = 'medical-ai-v1.0.0';
-const STATIC_CACHE_NAME = 'medical-ai-static-v1.0.0';
-const DYNAMIC_CACHE_NAME = 'medical-ai-dynamic-v1.0.0';
+// Empreinte du build et fichiers fingerprintés (nom logique -> nom versionné)
+const BUILD_VERSION = 'dev';
+const PRECACHE_MANIFEST = {};
+
+// Interface de Streamlit chargée par la page (fichiers versionnés par Streamlit)
+const APP_SHELL_MANIFEST = [];
+
+// Fichiers de static/ référencés par les feuilles de style (police), sous leur
+// URL d'origine : renouvelés avec le cache statique à chaque version du build
+const STATIC_ASSET_MANIFEST = [];
+
+// Les fichiers fingerprintés sont servis sous ce préfixe, relatif au scope
+const STATIC_BASE = new URL('app/static/', self.registration.scope).href;
+const ASSET_BASE = new URL('build/', STATIC_BASE).href;
+
+// Le nom du cache change avec le contenu des fichiers
+const STATIC_CACHE_NAME = 'medical-ai-static-' + BUILD_VERSION;
+const DYNAMIC_CACHE_NAME = 'medical-ai-dynamic';
+
+// Limites du cache dynamique (appareils à faible stockage) : au-delà, les
+// entrées les moins récemment utilisées sont supprimées. Le cache statique ne
+// contient que les fichiers précachés ; les autres fichiers statiques vont
+// dans le cache dynamique
+const MINUTE = 60 * 1000;
+const HOUR = 60 * MINUTE;
+const DAY = 24 * HOUR;
+const DYNAMIC_CACHE_MAX_ENTRIES = 60;
+const DYNAMIC_CACHE_MAX_BYTES = 10 * 1024 * 1024;
+
+// Durée de validité des réponses du cache dynamique, par route
+const DYNAMIC_CACHE_TTLS = [
+  { pattern: /^https:\/\/fonts\.(gstatic|googleapis)\.com\//, ttl: 30 * DAY },
+  { pattern: /\/component\//, ttl: DAY },
+  { pattern: /\/app\/static\//, ttl: DAY }
+];
+const DYNAMIC_CACHE_DEFAULT_TTL = HOUR;
+const DYNAMIC_CACHE_IMMUTABLE_TTL = 30 * DAY;
+
+// Métadonnées d'accès (taille, dates), conservées dans le cache lui-même
+const DYNAMIC_METADATA_URL = new URL('__medical-ai-cache-metadata__', self.registration.scope).href;
+
+// Document de l'application : toutes les navigations partagent cette entrée
+const APP_SHELL_URL = self.registration.scope;
 
 // Fichiers à mettre en cache pour le fonctionnement hors ligne
 const STATIC_FILES = [
-  '/',
-  '/static/manifest.json',
-  '/static/icons/icon-192x192.png',
-  '/static/icons/icon-512x512.png',
-  // Note: Les fichiers Streamlit seront ajoutés dynamiquement
+  APP_SHELL_URL,
+  ...APP_SHELL_MANIFEST.map(shellPath => new URL(shellPath, self.registration.scope).href),
+  ...STATIC_ASSET_MANIFEST.map(staticPath => STATIC_BASE + staticPath),
+  ...Object.values(PRECACHE_MANIFEST).map(assetPath => ASSET_BASE + assetPath)
 ];
 
+function assetUrl(logicalPath) {
+  return PRECACHE_MANIFEST[logicalPath] ? ASSET_BASE + PRECACHE_MANIFEST[logicalPath] : null;
+}
+
+// Fichier fingerprinté : son contenu ne change jamais pour une même URL
+// (fichiers du build et bundle de Streamlit sous /static/)
+function isImmutableAsset(url) {
+  if (url.href.startsWith(ASSET_BASE)) {
+    return !url.pathname.endsWith('/sw.js');
+  }
+  return url.href.startsWith(new URL('static/', self.registration.scope).href);
+}
+
+// Ressources de l'interface non versionnées : servies depuis le cache puis
+// revalidées en arrière-plan
+function isAppShellResource(request) {
+  const url = new URL(request.url);
+  return request.mode === 'navigate' ||
+         url.href === new URL('favicon.png', self.registration.scope).href ||
+         url.href === new URL('manifest.json', self.registration.scope).href;
+}
+
 // Fichiers à ne jamais mettre en cache (pour la sécurité)
 const NEVER_CACHE = [
   '/upload',
   '/api/predict',
   '/api/analyze',
+  '/_stcore/',  // État du serveur Streamlit (santé, configuration, téléversements)
+  '/media/',    // Images chargées et rapports générés
   // Toute URL contenant des données sensibles
 ];
 
@@ -30,7 +94,7 @@ self.addEventListener('install', event => {
     caches.open(STATIC_CACHE_NAME)
       .then(cache => {
         console.log('[SW] Mise en cache des fichiers statiques');
-        return cache.addAll(STATIC_FILES);
+        return precache(cache);
       })
       .then(() => {
         console.log('[SW] Installation terminée');
@@ -42,6 +106,23 @@ self.addEventListener('install', event => {
   );
 });
 
+// Précache : un fichier fingerprinté déjà présent dans le cache d'une version
+// précédente y est recopié, seuls les fichiers modifiés sont téléchargés
+async function precache(cache) {
+  let reused = 0;
+  await Promise.all(STATIC_FILES.map(async url => {
+    if (isImmutableAsset(new URL(url))) {
+      const previous = await caches.match(url);
+      if (previous) {
+        reused++;
+        return cache.put(url, previous);
+      }
+    }
+    return cache.add(url);
+  }));
+  console.log(`[SW] Précache ${BUILD_VERSION}: ${STATIC_FILES.length - reused} téléchargé(s), ${reused} réutilisé(s)`);
+}
+
 // Activation du Service Worker
 self.addEventListener('activate', event => {
   console.log('[SW] Activation en cours...');
@@ -61,6 +142,13 @@ self.addEventListener('activate', event => {
           })
         );
       })
+      .then(() => trimDynamicCache())
+      .then(() => {
+        // Le document est demandé au réseau pendant le démarrage du service worker
+        if (self.registration.navigationPreload) {
+          return self.registration.navigationPreload.enable();
+        }
+      })
       .then(() => {
         console.log('[SW] Activation terminée');
         return self.clients.claim();
@@ -83,7 +171,15 @@ self.addEventListener('fetch', event => {
     return;
   }
   
-  // Stratégie Cache First pour les fichiers statiques
+  // Stale-while-revalidate pour le document et l'interface : affichage
+  // immédiat depuis le cache, mise à jour pour le lancement suivant
+  if (isAppShellResource(request)) {
+    event.respondWith(staleWhileRevalidate(event));
+    return;
+  }
+  
+  // Stratégie Cache First pour les fichiers statiques (définitive pour les
+  // fichiers fingerprintés)
   if (isStaticFile(request)) {
     event.respondWith(cacheFirst(request));
     return;
@@ -109,18 +205,25 @@ function shouldNeverCache(request) {
 // Vérifier si c'est un fichier statique
 function isStaticFile(request) {
   const url = new URL(request.url);
-  return url.pathname.startsWith('/static/') || 
+  return isImmutableAsset(url) ||
+         url.pathname.startsWith('/static/') || 
          url.pathname.endsWith('.css') ||
          url.pathname.endsWith('.js') ||
          url.pathname.endsWith('.png') ||
          url.pathname.endsWith('.jpg') ||
-         url.pathname.endsWith('.ico');
+         url.pathname.endsWith('.ico') ||
+         url.pathname.endsWith('.woff2');
+}
+
+// Stratégie Cache First : fichiers précachés, puis cache dynamique borné
+async function matchStatic(request) {
+  const staticCache = await caches.open(STATIC_CACHE_NAME);
+  return await staticCache.match(request) || await matchDynamic(request);
 }
 
-// Stratégie Cache First
 async function cacheFirst(request) {
   try {
-    const cachedResponse = await caches.match(request);
+    const cachedResponse = await matchStatic(request);
     if (cachedResponse) {
       console.log('[SW] Réponse depuis le cache:', request.url);
       return cachedResponse;
@@ -128,10 +231,9 @@ async function cacheFirst(request) {
     
     const networkResponse = await fetch(request);
     
-    // Mettre en cache la réponse si elle est valide
+    // Mettre en cache la réponse si elle est valide (limites du cache dynamique)
     if (networkResponse.ok) {
-      const cache = await caches.open(STATIC_CACHE_NAME);
-      cache.put(request, networkResponse.clone());
+      putDynamic(request, networkResponse.clone());
       console.log('[SW] Fichier mis en cache:', request.url);
     }
     
@@ -140,22 +242,54 @@ async function cacheFirst(request) {
     console.error('[SW] Erreur Cache First:', error);
     
     // Retourner une réponse de fallback si disponible
-    const cachedResponse = await caches.match(request);
+    const cachedResponse = await matchStatic(request);
     if (cachedResponse) {
       return cachedResponse;
     }
     
     // Page d'erreur hors ligne
     if (request.destination === 'document') {
-      return new Response(getOfflinePage(), {
-        headers: { 'Content-Type': 'text/html' }
-      });
+      return offlineResponse();
     }
     
     throw error;
   }
 }
 
+// Stratégie Stale-While-Revalidate
+async function staleWhileRevalidate(event) {
+  const request = event.request;
+  const cacheKey = request.mode === 'navigate' ? APP_SHELL_URL : request;
+  const cache = await caches.open(STATIC_CACHE_NAME);
+  const cachedResponse = await cache.match(cacheKey);
+  
+  // Réponse préchargée pendant le démarrage du service worker, sinon réseau
+  const revalidation = Promise.resolve(event.preloadResponse)
+    .then(preloaded => preloaded || fetch(request))
+    .then(async networkResponse => {
+      if (networkResponse.ok) {
+        await cache.put(cacheKey, networkResponse.clone());
+      }
+      return networkResponse;
+    });
+  
+  if (cachedResponse) {
+    event.waitUntil(revalidation.catch(error => {
+      console.log('[SW] Revalidation impossible:', request.url, error);
+    }));
+    return cachedResponse;
+  }
+  
+  try {
+    return await revalidation;
+  } catch (error) {
+    if (request.mode === 'navigate') {
+      return offlineResponse();
+    }
+    throw error;
+  }
+}
+
 // Stratégie Network First
 async function networkFirst(request) {
   try {
@@ -163,31 +297,198 @@ async function networkFirst(request) {
     
     // Mettre en cache les réponses valides (sauf les sensibles)
     if (networkResponse.ok && !shouldNeverCache(request)) {
-      const cache = await caches.open(DYNAMIC_CACHE_NAME);
-      cache.put(request, networkResponse.clone());
-      console.log('[SW] Réponse mise en cache:', request.url);
+      putDynamic(request, networkResponse.clone());
     }
     
     return networkResponse;
   } catch (error) {
     console.log('[SW] Réseau indisponible, tentative depuis le cache:', request.url);
     
-    const cachedResponse = await caches.match(request);
+    const cachedResponse = await matchStatic(request);
     if (cachedResponse) {
       return cachedResponse;
     }
     
     // Page d'erreur hors ligne pour les documents
     if (request.destination === 'document') {
-      return new Response(getOfflinePage(), {
-        headers: { 'Content-Type': 'text/html' }
-      });
+      return offlineResponse();
     }
     
     throw error;
   }
 }
 
+// Cache dynamique borné : métadonnées { url: { size, storedAt, accessedAt, expiresAt } }
+let dynamicMetadata = null;
+let metadataWrite = Promise.resolve();
+const dynamicCounters = { hits: 0, misses: 0, expired: 0, evictions: 0, skipped: 0 };
+
+function dynamicTtl(url) {
+  if (isImmutableAsset(new URL(url))) {
+    return DYNAMIC_CACHE_IMMUTABLE_TTL;
+  }
+  const route = DYNAMIC_CACHE_TTLS.find(route => route.pattern.test(url));
+  return route ? route.ttl : DYNAMIC_CACHE_DEFAULT_TTL;
+}
+
+async function loadDynamicMetadata() {
+  if (dynamicMetadata === null) {
+    const cache = await caches.open(DYNAMIC_CACHE_NAME);
+    const stored = await cache.match(DYNAMIC_METADATA_URL);
+    const metadata = stored ? await stored.json().catch(() => ({})) : {};
+    // Un autre appel a pu charger les métadonnées pendant la lecture
+    if (dynamicMetadata === null) {
+      dynamicMetadata = metadata;
+    }
+  }
+  return dynamicMetadata;
+}
+
+// Les écritures sont sérialisées pour ne jamais écraser un état plus récent
+function saveDynamicMetadata() {
+  metadataWrite = metadataWrite
+    .then(async () => {
+      const cache = await caches.open(DYNAMIC_CACHE_NAME);
+      await cache.put(DYNAMIC_METADATA_URL, new Response(JSON.stringify(dynamicMetadata), {
+        headers: { 'Content-Type': 'application/json' }
+      }));
+    })
+    .catch(error => console.error('[SW] Erreur d\'écriture des métadonnées du cache:', error));
+  return metadataWrite;
+}
+
+async function putDynamic(request, response) {
+  // Une réponse opaque est comptée par le navigateur pour une taille
+  // arbitraire (plusieurs Mo) : elle n'est pas mise en cache
+  if (response.type === 'opaque') {
+    dynamicCounters.skipped++;
+    return;
+  }
+  try {
+    const size = (await response.clone().blob()).size;
+    if (size > DYNAMIC_CACHE_MAX_BYTES / 4) {
+      dynamicCounters.skipped++;
+      return;
+    }
+    const metadata = await loadDynamicMetadata();
+    const cache = await caches.open(DYNAMIC_CACHE_NAME);
+    // Métadonnées enregistrées avant la réponse : l'éviction ne voit jamais
+    // d'entrée sans métadonnées
+    const now = Date.now();
+    metadata[request.url] = { size, storedAt: now, accessedAt: now, expiresAt: now + dynamicTtl(request.url) };
+    try {
+      await cache.put(request, response);
+    } catch (error) {
+      delete metadata[request.url];
+      throw error;
+    }
+    await trimDynamicCache();
+  } catch (error) {
+    console.error('[SW] Erreur de mise en cache:', request.url, error);
+  }
+}
+
+async function matchDynamic(request) {
+  const metadata = await loadDynamicMetadata();
+  const entry = metadata[request.url];
+  const cache = await caches.open(DYNAMIC_CACHE_NAME);
+  if (!entry) {
+    dynamicCounters.misses++;
+    return undefined;
+  }
+  if (entry.expiresAt <= Date.now()) {
+    dynamicCounters.expired++;
+    delete metadata[request.url];
+    await cache.delete(request.url);
+    saveDynamicMetadata();
+    return undefined;
+  }
+  const cachedResponse = await cache.match(request.url);
+  if (!cachedResponse) {
+    dynamicCounters.misses++;
+    delete metadata[request.url];
+    saveDynamicMetadata();
+    return undefined;
+  }
+  dynamicCounters.hits++;
+  entry.accessedAt = Date.now();
+  saveDynamicMetadata();
+  return cachedResponse;
+}
+
+// Supprime les entrées expirées ou sans métadonnées, puis les moins
+// récemment utilisées jusqu'à respecter les limites
+async function trimDynamicCache() {
+  const metadata = await loadDynamicMetadata();
+  const cache = await caches.open(DYNAMIC_CACHE_NAME);
+  const now = Date.now();
+  
+  for (const request of await cache.keys()) {
+    if (request.url !== DYNAMIC_METADATA_URL && !metadata[request.url]) {
+      await cache.delete(request);
+    }
+  }
+  
+  const entries = Object.entries(metadata).sort((a, b) => a[1].accessedAt - b[1].accessedAt);
+  let bytes = entries.reduce((total, [, entry]) => total + entry.size, 0);
+  let count = entries.length;
+  for (const [url, entry] of entries) {
+    const expired = entry.expiresAt <= now;
+    if (!expired && count <= DYNAMIC_CACHE_MAX_ENTRIES && bytes <= DYNAMIC_CACHE_MAX_BYTES) {
+      continue;
+    }
+    if (expired) {
+      dynamicCounters.expired++;
+    } else {
+      dynamicCounters.evictions++;
+    }
+    delete metadata[url];
+    await cache.delete(url);
+    bytes -= entry.size;
+    count--;
+  }
+  return saveDynamicMetadata();
+}
+
+async function getCacheStats() {
+  const stats = { version: BUILD_VERSION, caches: {} };
+  for (const cacheName of await caches.keys()) {
+    if (!cacheName.startsWith('medical-ai-')) {
+      continue;
+    }
+    const cache = await caches.open(cacheName);
+    const requests = (await cache.keys()).filter(request => request.url !== DYNAMIC_METADATA_URL);
+    stats.caches[cacheName] = { entries: requests.length };
+  }
+  
+  const metadata = await loadDynamicMetadata();
+  const entries = Object.values(metadata);
+  stats.dynamic = Object.assign({
+    entries: entries.length,
+    bytes: entries.reduce((total, entry) => total + entry.size, 0),
+    maxEntries: DYNAMIC_CACHE_MAX_ENTRIES,
+    maxBytes: DYNAMIC_CACHE_MAX_BYTES
+  }, dynamicCounters);
+  
+  if (self.navigator && self.navigator.storage && self.navigator.storage.estimate) {
+    const { usage, quota } = await self.navigator.storage.estimate();
+    stats.storage = { usage, quota };
+  }
+  return stats;
+}
+
+// Page hors ligne précachée, ou page intégrée à défaut
+async function offlineResponse() {
+  const offlineUrl = assetUrl('offline.html');
+  const cached = offlineUrl && await caches.match(offlineUrl);
+  if (cached) {
+    return cached;
+  }
+  return new Response(getOfflinePage(), {
+    headers: { 'Content-Type': 'text/html' }
+  });
+}
+
 // Page d'erreur hors ligne
 function getOfflinePage() {
   return `
@@ -199,7 +500,7 @@ function getOfflinePage() {
         <title>Medical Center - Hors ligne</title>
         <style>
             body {
-                font-family: 'Inter', sans-serif;
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
                 background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
                 margin: 0;
                 padding: 20px;
@@ -274,12 +575,25 @@ self.addEventListener('message', event => {
   if (event.data && event.data.type === 'CLEAR_CACHE') {
     clearAllCaches();
   }
+  
+  // Réponse sur le port fourni (MessageChannel), sinon au client émetteur
+  if (event.data && event.data.type === 'GET_CACHE_STATS') {
+    event.waitUntil(getCacheStats().then(stats => {
+      const message = { type: 'CACHE_STATS', stats };
+      if (event.ports && event.ports[0]) {
+        event.ports[0].postMessage(message);
+      } else if (event.source) {
+        event.source.postMessage(message);
+      }
+    }));
+  }
 });
 
 // Nettoyer tous les caches
 async function clearAllCaches() {
   try {
     const cacheNames = await caches.keys();
+    dynamicMetadata = {};
     await Promise.all(
       cacheNames.map(cacheName => {
         if (cacheName.startsWith('medical-ai-')) {
@@ -0,0 +1,97 @@
+"""
+Module des fichiers statiques de l'application
+Les fichiers du dossier static/ sont servis par Streamlit sous /app/static/
+(option server.enableStaticServing) et mis en cache par le navigateur
+"""
+
+import re
+import hashlib
+import posixpath
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).parent / "static"
+
+# Préfixe relatif : reste valide derrière un server.baseUrlPath
+STATIC_URL_PREFIX = "app/static/"
+
+# Police de l'application (@font-face de css/critical.css), préchargée par
+# server.py et précachée par le service worker sous cette même URL
+APP_FONT = "fonts/inter-latin.woff2"
+
+# url() relative d'une feuille de style (ni absolue, ni data:)
+RELATIVE_URL_PATTERN = re.compile(r"""url\((['"]?)(?![a-z]+:|/)([^'")]+)\1\)""")
+
+@lru_cache(maxsize=None)
+def static_url(relative_path: str) -> str:
+    """URL d'un fichier statique, versionnée par l'empreinte de son contenu
+
+    L'empreinte est calculée une seule fois par processus ; une nouvelle
+    version du fichier change l'URL et contourne le cache du navigateur.
+    """
+    path = STATIC_DIR / relative_path
+    try:
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+    except OSError as e:
+        logger.warning(f"Static asset not found: {path} ({e})")
+        return STATIC_URL_PREFIX + relative_path
+    return f"{STATIC_URL_PREFIX}{relative_path}?v={digest}"
+
+def _minify_block(text: str, declarations: bool) -> str:
+    """Espaces superflus d'un sélecteur (ou prélude @) ou d'un bloc de déclarations
+
+    Dans un sélecteur, l'espace avant « : » est un combinateur descendant
+    (« .a :hover » n'est pas « .a:hover ») : il n'est retiré que dans les
+    déclarations.
+    """
+    pattern = r"\s*([:;,])\s*" if declarations else r"\s*([,>])\s*"
+    return re.sub(pattern, r"\1", text.strip())
+
+def _rebase_urls(css: str, relative_path: str) -> str:
+    """url() relatives au fichier réécrites relativement à la page
+
+    Elles désignent alors la même URL que dans le fichier chargé par @import
+    (une seule requête pour la police).
+    """
+    base = posixpath.dirname(relative_path)
+    return RELATIVE_URL_PATTERN.sub(
+        lambda m: f'url("{STATIC_URL_PREFIX}{posixpath.normpath(posixpath.join(base, m.group(2)))}")',
+        css
+    )
+
+@lru_cache(maxsize=None)
+def inline_css(relative_path: str) -> str:
+    """Feuille de style à injecter dans la page, sans commentaires ni espaces superflus"""
+    css = (STATIC_DIR / relative_path).read_text(encoding='utf-8')
+    css = _rebase_urls(css, relative_path)
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    # Un segment suivi de « { » est un sélecteur, sinon des déclarations
+    parts = re.split(r"([{}])", css)
+    for i in range(0, len(parts), 2):
+        declarations = i + 1 >= len(parts) or parts[i + 1] == '}'
+        parts[i] = _minify_block(parts[i], declarations)
+    return ''.join(parts).replace(";}", "}").strip()
+
+def write_if_changed(relative_path: str, content: Union[str, bytes]) -> bool:
+    """Écrit un fichier statique uniquement si son contenu a changé"""
+    path = STATIC_DIR / relative_path
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+    static_url.cache_clear()
+    inline_css.cache_clear()
+    logger.debug(f"Static asset written: {path}")
+    return True
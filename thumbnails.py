@@ -0,0 +1,84 @@
+"""
+Module des aperçus d'images
+Miniature de taille bornée encodée en JPEG une seule fois par image, mise en
+cache par empreinte de contenu et réutilisée pour l'affichage, l'historique
+et le rapport PDF
+"""
+
+import io
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Plus grand côté de la miniature, en pixels
+THUMBNAIL_SIZE = (640, 640)
+THUMBNAIL_QUALITY = 80
+
+def make_thumbnail(data: bytes, max_size: Tuple[int, int] = THUMBNAIL_SIZE,
+                   quality: int = THUMBNAIL_QUALITY) -> bytes:
+    """Réduit et réencode une image en JPEG progressif"""
+    image = Image.open(io.BytesIO(data))
+    # Décodage JPEG directement à une résolution réduite lorsque c'est possible
+    image.draft('RGB', (max_size[0] * 2, max_size[1] * 2))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+class ThumbnailCache:
+    """Cache LRU des miniatures, borné en octets"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Miniature en cache, ou None"""
+        with self._lock:
+            thumbnail = self._items.get(key)
+            if thumbnail is not None:
+                self._items.move_to_end(key)
+            return thumbnail
+
+    def get_or_create(self, key: str, data: bytes) -> bytes:
+        """Miniature d'une image, générée au premier appel pour ce contenu"""
+        thumbnail = self.get(key)
+        if thumbnail is not None:
+            self.hits += 1
+            return thumbnail
+
+        self.misses += 1
+        thumbnail = make_thumbnail(data)
+        logger.debug(f"Thumbnail created for {key[:12]}: {len(data)} -> {len(thumbnail)} bytes")
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = thumbnail
+                self._bytes += len(thumbnail)
+                while self._bytes > self.max_bytes and len(self._items) > 1:
+                    _, evicted = self._items.popitem(last=False)
+                    self._bytes -= len(evicted)
+        return thumbnail
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'items': len(self._items), 'bytes': self._bytes,
+                    'hits': self.hits, 'misses': self.misses}